@@ -0,0 +1,102 @@
+"""Time requests to routes of each access class, to measure what the `auth` dependency costs per class.
+
+The principal version and role grant lookups are in-process stubs delayed by `lookup latency` (eg: 0.2 for
+a Redis round trip on the same host), the numbers are framework plus authorization overhead, not I/O.
+`TOKEN (all lookups)` replays the token route with every lookup, as before routes were classified.
+
+    python -m benchmarks.auth_access [requests] [latency_ms]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src import deps
+from src.features.admin.security import (
+    API_WHITE_LISTS,
+    Principal,
+    RoleGrant,
+    RouteAccess,
+    create_jwt_token,
+    permission_index,
+    route_access,
+)
+
+LOGOUT = next(iter(API_WHITE_LISTS))
+PERMISSION = "benchmark-permission"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/public", operation_id="benchmark-public")
+    async def public() -> None:
+        pass
+
+    @app.get("/token", operation_id=LOGOUT, dependencies=[Depends(deps.auth)])
+    async def token() -> None:
+        pass
+
+    @app.get("/permission", operation_id=PERMISSION, dependencies=[Depends(deps.auth)])
+    async def permission() -> None:
+        pass
+
+    permission_index.build(app.routes)
+    route_access.build(app.routes, deps.auth)
+    return app
+
+
+def _lookup[T](value: T, latency: float) -> Callable[..., Coroutine[Any, Any, T]]:
+    async def lookup(*_: Any) -> T:
+        if latency:
+            await asyncio.sleep(latency)
+        return value
+
+    return lookup
+
+
+async def _time(client: AsyncClient, path: str, headers: dict[str, str], requests: int, rounds: int = 5) -> float:
+    """Best mean over `rounds` of `requests` requests, in us."""
+    for _ in range(requests // 10):
+        await client.get(path, headers=headers)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        best = min(best, (time.perf_counter() - start) / requests * 1_000_000)
+    return best
+
+
+async def main(requests: int, latency_ms: float) -> None:
+    app = _app()
+    deps.get_principal_version = _lookup(1, latency_ms / 1000)
+    deps.get_role_grant = _lookup(RoleGrant("member", permission_index.encode([PERMISSION])), latency_ms / 1000)
+    access_token, *_ = create_jwt_token(1, 3600, refresh=False, principal=Principal(1, 1, True, 1))
+    headers = {"Authorization": f"Bearer {access_token}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        timings = {
+            "PUBLIC": await _time(client, "/public", {}, requests),
+            "TOKEN": await _time(client, "/token", headers, requests),
+            "PERMISSION": await _time(client, "/permission", headers, requests),
+        }
+        route_access.access[LOGOUT] = RouteAccess.PERMISSION
+        deps.get_role_grant = _lookup(RoleGrant("member", permission_index.encode([LOGOUT])), latency_ms / 1000)
+        timings["TOKEN (all lookups)"] = await _time(client, "/token", headers, requests)
+    print(f"{requests} requests per class, lookup latency {latency_ms} ms")  # noqa: T201
+    for name, us in timings.items():
+        print(f"{name:<20} {us:8.1f} us/request  auth {us - timings['PUBLIC']:7.1f} us")  # noqa: T201
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("requests", type=int, nargs="?", default=2000)
+    parser.add_argument("latency_ms", type=float, nargs="?", default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency_ms))
@@ -0,0 +1,76 @@
+"""Time a login burst with bcrypt on the event loop and in the password hasher pool.
+
+Every login verifies one password while a heartbeat task ticks every millisecond, its worst delay is the
+latency every other request of the worker sees during the burst.
+
+    python -m benchmarks.password_hashing [logins] [rounds] [workers]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+import bcrypt
+
+from src.core.config import settings
+from src.features.admin.security import PasswordHasher, verify_password
+
+PASSWORD = "benchmark"  # noqa: S105
+HEARTBEAT = 0.001
+
+
+async def _heartbeat(lags: list[float]) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def _burst(verify: Callable[[str, str], Awaitable[bool]], hashed: str, logins: int) -> str:
+    lags: list[float] = []
+    heartbeat = asyncio.create_task(_heartbeat(lags))
+    await asyncio.sleep(0.01)
+
+    # the logins arrive together, their latency runs from the start of the burst
+    start = time.perf_counter()
+
+    async def login() -> float:
+        assert await verify(PASSWORD, hashed)  # noqa: S101
+        return time.perf_counter() - start
+
+    latencies = sorted(await asyncio.gather(*(login() for _ in range(logins))))
+    total = time.perf_counter() - start
+    # let the heartbeat record the delay it was in when the burst ended
+    await asyncio.sleep(HEARTBEAT * 2)
+    heartbeat.cancel()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (
+        f"burst {total * 1000:8.1f} ms  login p50 {statistics.median(latencies) * 1000:8.1f} ms  "
+        f"p95 {p95 * 1000:8.1f} ms  loop lag max {max(lags, default=0) * 1000:8.1f} ms"
+    )
+
+
+async def main(logins: int, rounds: int, workers: int) -> None:
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds)).decode()
+
+    async def on_loop(plain_password: str, hashed_password: str) -> bool:
+        return verify_password(plain_password, hashed_password)
+
+    hasher = PasswordHasher(max_workers=workers)
+    print(f"{logins} concurrent logins, bcrypt cost {rounds}, {workers} hasher workers")  # noqa: T201
+    try:
+        print(f"{'event loop':<16} {await _burst(on_loop, hashed, logins)}")  # noqa: T201
+        print(f"{'password hasher':<16} {await _burst(hasher.verify, hashed, logins)}")  # noqa: T201
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logins", type=int, nargs="?", default=32)
+    parser.add_argument("rounds", type=int, nargs="?", default=10)
+    parser.add_argument("workers", type=int, nargs="?", default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds, args.workers))
@@ -0,0 +1,127 @@
+"""Count the COMMIT round trips and time multi-write endpoints, per repository call commit vs unit of work.
+
+The endpoint bodies run against a sqlite file. `commit=True` replays the writes as they were before the
+request scoped unit of work, `uow` as they run now inside `get_uow`:
+
+- role update (`RoleAPI.update_role`): 8 of 20 permissions are swapped at every update.
+- permission sync (`PermissionCBV.sync_db_permission`): 5 permissions are deleted and 5 added at every sync.
+
+    python -m benchmarks.unit_of_work [requests]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable, Coroutine
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.core.models.base import Base
+from src.core.repositories import repository
+from src.features.admin import schemas, services
+from src.features.admin.models import Permission, Role
+from src.features.admin.services import PermissionRepo, RoleRepo
+
+type Endpoint = Callable[[AsyncSession, int, bool], Coroutine[Any, Any, None]]
+
+ROLE_PERMISSIONS = 20
+SYNCED_PERMISSIONS = 5
+
+
+async def _noop(*_: Any) -> None:
+    pass
+
+
+def _permission(pk: UUID, i: int) -> Permission:
+    return Permission(id=pk, name=f"p{i}", url=f"/p{i}", method="GET", tag="benchmark")
+
+
+def _role_update(permission_ids: list[UUID]) -> Endpoint:
+    repo = RoleRepo(Role)
+    # constraints are reflected from postgres
+    repo.check_nullable = repo.check_unique_constraints = False
+    # permission ids are uuids while `IdCreate` declares int ids, the payloads skip validation
+    payloads = [
+        schemas.RoleUpdate.model_construct(
+            slug="role", permission=[schemas.IdCreate.model_construct(id=pk) for pk in permission_ids[i::2][:8]]
+        )
+        for i in (0, 1)
+    ]
+
+    async def update_role(session: AsyncSession, i: int, uow: bool) -> None:
+        # `Role.menu` is joined eagerly, `get_one_or_404` does not unique the rows of a joined collection
+        db_role = await repo.get_one_or_404(session, 1, selectinload(Role.permission), selectinload(Role.menu))
+        await repo.update(session, db_role, payloads[i % 2], commit=not uow)
+
+    return update_role
+
+
+def _permission_sync(synced_ids: list[UUID]) -> Endpoint:
+    repo = PermissionRepo(Permission)
+
+    async def sync_permissions(session: AsyncSession, i: int, uow: bool) -> None:
+        removed, synced_ids[:] = synced_ids[:], [uuid4() for _ in range(SYNCED_PERMISSIONS)]
+        await repo.get_multi_and_delete(session, removed, commit=not uow)
+        added = [_permission(pk, i) for pk in synced_ids]
+        if uow:
+            await repo.batch_flush(session, added)
+        else:
+            await repo.batch_commit(session, added)
+
+    return sync_permissions
+
+
+async def _run(engine: AsyncEngine, requests: int) -> None:
+    counts: Counter[str] = Counter()
+    event.listen(engine.sync_engine, "commit", lambda _: counts.update(["commit"]))
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *_: counts.update(["statement"]))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    permission_ids = [uuid4() for _ in range(ROLE_PERMISSIONS)]
+    synced_ids = [uuid4() for _ in range(SYNCED_PERMISSIONS)]
+    async with sessions() as session:
+        session.add_all(_permission(pk, i) for i, pk in enumerate(permission_ids + synced_ids))
+        session.add(Role(id=1, name="role", slug="role", description=""))
+        await session.commit()
+    endpoints = {"role update": _role_update(permission_ids), "permission sync": _permission_sync(synced_ids)}
+    print(f"{requests} requests per endpoint")  # noqa: T201
+    for endpoint_name, endpoint in endpoints.items():
+        for name, uow in (("commit=True", False), ("uow", True)):
+            counts.clear()
+            start = time.perf_counter()
+            for i in range(requests):
+                async with sessions() as session:
+                    await endpoint(session, i, uow)
+                    if uow:
+                        await session.commit()
+            elapsed = (time.perf_counter() - start) / requests * 1000
+            print(  # noqa: T201
+                f"{endpoint_name:<16} {name:<12} {counts['commit'] / requests:.1f} COMMIT/request  "
+                f"{counts['statement'] / requests:.1f} statements/request  {elapsed:.2f} ms/request"
+            )
+
+
+async def main(requests: int) -> None:
+    services.invalidate_role = _noop
+    # sqlite has no `= ANY(array)`
+    repository.in_array = lambda col, values: col.in_(values)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'benchmark.db'}")
+        try:
+            await _run(engine, requests)
+        finally:
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("requests", type=int, nargs="?", default=200)
+    asyncio.run(main(parser.parse_args().requests))
@@ -19,7 +19,7 @@ def gunicorn_options() -> dict[str, Any]:
         "workers": settings.WORKERS,
         "worker_class": "uvicorn.workers.UvicornWorker",
         "preload": "-",
-        "forwarded_allow_ips": "*",
+        "forwarded_allow_ips": settings.FORWARDED_ALLOW_IPS,
         "accesslog": "-",
         "errorlog": "-",
         "logger_class": GunicornLogger,
@@ -36,7 +36,7 @@ if __name__ == "__main__":
             port=settings.LISTENING_PORT,
             log_config=LOGGING,
             proxy_headers=True,
-            forwarded_allow_ips="*",
+            forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
             loop="uvloop",
             http="httptools",
         )
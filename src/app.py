@@ -1,30 +1,61 @@
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any
+from urllib.parse import urlsplit
 
 import redis.asyncio as aioreids
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.responses import HTMLResponse
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.errors import ServerErrorMiddleware
 
 from src.core.config import _Env, settings
+from src.core.database.pool import pool_health_task
+from src.core.database.session import async_engines, session_stats
 from src.core.errors.auth_exceptions import default_exception_handler, exception_handlers, sentry_ignore_errors
+from src.core.repositories import register_write_hook
+from src.deps import auth
+from src.features.admin.cache import load_revoked_tokens
+from src.features.admin.security import password_hasher, permission_index, route_access
+from src.features.admin.signing import key_ring
 from src.libs.redis import cache
+from src.libs.redis.pubsub import invalidation_bus
+from src.libs.redis.rate_limiter import RateLimitMiddleware
 from src.openapi import get_open_api_intro, get_stoplight_elements_html
-from src.register.middlewares import RequestMiddleware
+from src.register.middlewares import DeadlineMiddleware, RequestMiddleware
 from src.register.routers import router
+from src.register.warmup import warm_up, warmup_report
 
 
 def create_app() -> FastAPI:
     @asynccontextmanager
     async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # noqa: ARG001
-        pool = aioreids.ConnectionPool.from_url(
-            settings.REDIS_DSN, encoding="utf-8", db=cache.RedisDBType.DEFAULT, decode_response=True
-        )
-        cache.redis_client = cache.FastapiCache(connection_pool=pool)
-        yield
-        await pool.disconnect()
+        async with AsyncExitStack() as stack:
+            # callbacks run in reverse, pools are released even when startup fails or shutdown is cancelled
+            stack.callback(password_hasher.shutdown)
+            pool = aioreids.ConnectionPool.from_url(settings.REDIS_DSN, db=cache.RedisDBType.DEFAULT)
+            stack.push_async_callback(pool.disconnect)
+            pubsub_pool = aioreids.ConnectionPool.from_url(settings.REDIS_DSN, db=cache.RedisDBType.PUBSUB)
+            stack.push_async_callback(pubsub_pool.disconnect)
+            # nodes are named by address, the dsn carries the password and node names show in metrics
+            shard_pools = {
+                urlsplit(dsn).netloc.rpartition("@")[2]: aioreids.ConnectionPool.from_url(
+                    dsn, db=cache.RedisDBType.DEFAULT
+                )
+                for dsn in settings.REDIS_CACHE_NODES
+            }
+            for shard_pool in shard_pools.values():
+                stack.push_async_callback(shard_pool.disconnect)
+            cache.redis_client = cache.FastapiCache(
+                connection_pool=pool,
+                shards={name: aioreids.Redis(connection_pool=shard_pool) for name, shard_pool in shard_pools.items()},
+            )
+            await load_revoked_tokens()
+            await stack.enter_async_context(pool_health_task(*async_engines.values()))
+            await stack.enter_async_context(invalidation_bus.listening(aioreids.Redis(connection_pool=pubsub_pool)))
+            await warm_up()
+            yield
 
     if _Env.PROD.name == settings.ENV:
         sentry_sdk.init(
@@ -58,6 +89,36 @@ def create_app() -> FastAPI:
     def version() -> dict[str, str]:
         return {"version": settings.VERSION}
 
+    @app.get(
+        "/.well-known/jwks.json",
+        include_in_schema=False,
+        tags=["Internal"],
+        operation_id="3f6a2d9e-8b41-4c7a-95e0-2d1b7c4e8a53",
+    )
+    def jwks(response: Response) -> dict[str, list[dict[str, str]]]:
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return key_ring.jwks()
+
+    @app.get(
+        "/api/metrics",
+        include_in_schema=False,
+        tags=["Internal"],
+        operation_id="0d5e3b8a-2c4f-4f8e-9b1a-6a7c3e9d2f41",
+        dependencies=[Depends(auth)],
+    )
+    def metrics() -> dict[str, Any]:
+        """Worker internals (pools, caches, breakers, hot key counts), only for users granted the operation."""
+        return {
+            "session": session_stats.dict(),
+            "pool": {name: engine.pool.stats() for name, engine in async_engines.items()},
+            "password_hasher": password_hasher.stats(),
+            "cache": cache.cache_stats.dict(),
+            "redis_batch": cache.redis_client.batch_stats() if cache.redis_client else {},
+            "redis_breaker": cache.redis_client.breaker_stats() if cache.redis_client else {},
+            "hot_keys": {"hot": len(cache.hot_key_detector.hot_keys()), "replicated": len(cache.hot_replicas)},
+            "warmup": warmup_report,
+        }
+
     @app.get(
         "/api/elements", include_in_schema=False, tags=["Docs"], operation_id="1a4987dd-6c38-4502-a879-3fe35050ae38"
     )
@@ -67,6 +128,8 @@ def create_app() -> FastAPI:
     app.include_router(router, prefix="/api")
     for handler in exception_handlers:
         app.add_exception_handler(exc_class_or_status_code=handler["exception"], handler=handler["handler"])
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(RateLimitMiddleware)
     app.add_middleware(RequestMiddleware)
     app.add_middleware(ServerErrorMiddleware, handler=default_exception_handler)
     app.add_middleware(
@@ -76,6 +139,10 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    permission_index.build(app.routes)
+    route_access.build(app.routes, auth)
+    key_ring.load(settings.JWT_PRIVATE_KEY_FILES)
+    register_write_hook(cache.invalidate_entities)
     return app
 
 
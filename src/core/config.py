@@ -20,6 +20,7 @@ class _Env(StrEnum):
 class Settings(BaseSettings):
     SECRET_KEY: str = Field(default="ea90084454f1f94244f779d605286ae482ffb1f33570dcd1f6a683e5c002b492")
     SECURITY_BCRYPT_ROUNDS: int = Field(default=4)
+    PASSWORD_HASH_WORKERS: int = Field(default=4, gt=0)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=120)
     REFRESH_TOKEN_EXPIRE_MINUTES: int = Field(default=11520)
     BACKEND_CORS: list[str] = Field(default=["*"])
@@ -31,6 +32,8 @@ class Settings(BaseSettings):
     DESCRIPTION: str = Field(default=PYPROJECT_CONTENT["description"])
     ENABLE_LIMIT: bool = Field(default=False)
     LIMITED_RATE: tuple[int, int] = Field(default=(20, 10))
+    # operation id -> (requests, seconds), overriding LIMITED_RATE for the route
+    RATE_LIMIT_ROUTES: dict[str, tuple[int, int]] = Field(default={})
 
     WEB_SENTRY_DSN: str | None = Field(default=None)
     SENTRY_SAMPLE_RATE: float = Field(default=1.0, gt=0.0, le=1.0)
@@ -41,13 +44,78 @@ class Settings(BaseSettings):
     )
     DATABASE_POOL_SIZE: int | None = Field(default=50)
     DATABASE_POOL_MAX_OVERFLOW: int | None = Field(default=10)
+    DATABASE_POOL_TIMEOUT: float = Field(default=5, gt=0)
+    DATABASE_AUTH_POOL_SIZE: int | None = Field(default=10)
+    DATABASE_AUTH_POOL_MAX_OVERFLOW: int | None = Field(default=5)
+    DATABASE_AUTH_POOL_TIMEOUT: float = Field(default=2, gt=0)
+    DATABASE_BULK_POOL_SIZE: int | None = Field(default=10)
+    DATABASE_BULK_POOL_MAX_OVERFLOW: int | None = Field(default=0)
+    DATABASE_BULK_POOL_TIMEOUT: float = Field(default=10, gt=0)
+    DATABASE_POOL_RETRY_AFTER_SECS: int = Field(default=1, gt=0)
+    # connection level statement_timeout/lock_timeout, request deadlines only override them when tighter
+    DATABASE_STATEMENT_TIMEOUT_SECS: float = Field(default=5, gt=0)
+    DATABASE_BULK_STATEMENT_TIMEOUT_SECS: float = Field(default=15, gt=0)
+    REQUEST_DEADLINE_SECS: float = Field(default=30, gt=0)
+    LIST_REQUEST_DEADLINE_SECS: float = Field(default=15, gt=0)
+    DATABASE_POOL_RECYCLE_SECS: int = Field(default=1800)
+    DATABASE_POOL_PING_IDLE_SECS: int = Field(default=30)
+    DATABASE_POOL_HEALTH_CHECK_INTERVAL: int = Field(default=30, gt=0)
+    ROLE_PERMISSION_CACHE_SIZE: int = Field(default=1024, gt=0)
+    ROLE_PERMISSION_CACHE_TTL: int = Field(default=300, gt=0)
+    ROLE_PERMISSION_CACHE_REDIS_TTL: int = Field(default=86400, gt=0)
+    PRINCIPAL_CACHE_SIZE: int = Field(default=10000, gt=0)
+    PRINCIPAL_CACHE_LOCAL_TTL: int = Field(default=60, gt=0)
+    PRINCIPAL_CACHE_TTL: int = Field(default=3600, gt=0)
+    # worker TTL of role and principal records while invalidations from other workers may be lost
+    AUTH_CACHE_DEGRADED_TTL: float = Field(default=5, gt=0)
+    # retries (with exponential backoff) of the role and principal invalidations run after commit
+    AUTH_CACHE_INVALIDATION_RETRIES: int = Field(default=3, ge=0)
+    JWT_STATELESS_CLAIMS: bool = Field(default=False)
+    # PEM private keys (Ed25519 or P-256), the first one signs, signing falls back to HS256 with SECRET_KEY if empty
+    JWT_PRIVATE_KEY_FILES: list[str] = Field(default=[])
+    JWT_VERIFY_CACHE_SIZE: int = Field(default=10000, gt=0)
+    TOKEN_REVOCATION_BLOOM_BITS: int = Field(default=1 << 20, gt=0)
+    TOKEN_REVOCATION_BLOOM_HASHES: int = Field(default=7, gt=0)
+    # namespace -> (maxsize, ttl) of the in-process tier in front of Redis
+    CACHE_LOCAL_TIERS: dict[str, tuple[int, float]] = Field(default={"nc_": (1024, 30), "api_": (256, 10)})
+    CACHE_STALE_TTL: int = Field(default=60, ge=0)
+    CACHE_LOCK_TIMEOUT: float = Field(default=5, gt=0)
+    # orjson and msgpack are installed with the `cache` extra
+    CACHE_SERIALIZER: Literal["json", "orjson", "msgpack"] = Field(default="json")
+    CACHE_COMPRESS_MIN_SIZE: int = Field(default=4096, gt=0)
+    CACHE_COMPRESS_LEVEL: int = Field(default=1, ge=0, le=9)
+    # startup warm-up must finish within this budget, steps still running are cancelled
+    CACHE_WARMUP_BUDGET: float = Field(default=10, gt=0)
+    # full keys (eg: "nc_menu_tree") of a local tier namespace loaded into the tier at startup
+    CACHE_WARMUP_KEYS: list[str] = Field(default=[])
     REDIS_DSN: str = Field(default="redis://:cfe1c2c4703abb205d71abdc07cc3f3d@localhost:6379")
+    # cache entries are sharded over these nodes by consistent hashing, instead of REDIS_DSN, if set
+    REDIS_CACHE_NODES: list[str] = Field(default=[])
+    REDIS_CACHE_VNODES: int = Field(default=160, gt=0)
+    # per call timeout of cache commands, a node whose calls fail or take longer than the slow call
+    # threshold REDIS_BREAKER_FAILURES times in a row is skipped for REDIS_BREAKER_RESET_TIMEOUT seconds
+    REDIS_CALL_TIMEOUT: float = Field(default=0.25, gt=0)
+    REDIS_BREAKER_SLOW_CALL: float = Field(default=0.1, gt=0)
+    REDIS_BREAKER_FAILURES: int = Field(default=5, gt=0)
+    REDIS_BREAKER_RESET_TIMEOUT: float = Field(default=5, gt=0)
+    # keys read HOT_KEY_MIN_HITS times per HOT_KEY_WINDOW seconds (estimated from a sample of reads)
+    # are replicated into every worker for HOT_KEY_LOCAL_TTL seconds
+    HOT_KEY_SAMPLE_RATE: float = Field(default=0.1, gt=0, le=1)
+    HOT_KEY_TOP_K: int = Field(default=32, gt=0)
+    HOT_KEY_MIN_HITS: int = Field(default=200, gt=0)
+    HOT_KEY_WINDOW: float = Field(default=10, gt=0)
+    HOT_KEY_SKETCH_WIDTH: int = Field(default=2048, gt=0)
+    HOT_KEY_SKETCH_DEPTH: int = Field(default=4, gt=0)
+    HOT_KEY_LOCAL_TTL: float = Field(default=1, gt=0)
 
     ENV: str = _Env.DEV.name
     RUNNING_MODE: Literal["uvicorn", "gunicorn"] | None = Field(default="uvicorn")
     WORKERS: int | None = Field(default=1, gt=0)
     LISTENING_HOST: str = Field(default="0.0.0.0")  # noqa: S104
     LISTENING_PORT: int = Field(default=8000, gt=0, le=65535)
+    # comma separated addresses or networks of the reverse proxies whose X-Forwarded-For/-Proto headers are
+    # trusted to set the client address (used by rate limiting), "*" trusts any peer and lets clients spoof it
+    FORWARDED_ALLOW_IPS: str = Field(default="127.0.0.1")
 
     model_config = SettingsConfigDict(env_file=f"{PROJECT_DIR}/.env", case_sensitive=True, extra="allow")
 
@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.config import settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+    from sqlalchemy.pool import ConnectionPoolEntry, PoolProxiedConnection
+
+logger = logging.getLogger(__name__)
+
+LAST_CHECKIN_KEY = "last_checkin"
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """`AsyncAdaptedQueuePool` which records how long checkouts wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waits: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+    def _do_get(self) -> "ConnectionPoolEntry":
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.waits += 1
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "waits": self.waits,
+            "wait_avg_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def register_pool_events(engine: "AsyncEngine") -> None:
+    """Pre-ping only connections idle longer than `DATABASE_POOL_PING_IDLE_SECS` on checkout.
+
+    Connections which were used recently skip the `SELECT 1` round trip, a failed ping raises
+    `DisconnectionError` so that the pool discards the connection and retries with a new one.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection: Any, connection_record: "ConnectionPoolEntry") -> None:  # noqa: ARG001
+        connection_record.info[LAST_CHECKIN_KEY] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(
+        dbapi_connection: Any,
+        connection_record: "ConnectionPoolEntry",
+        connection_proxy: "PoolProxiedConnection",  # noqa: ARG001
+    ) -> None:
+        last_checkin = connection_record.info.get(LAST_CHECKIN_KEY)
+        if last_checkin is None or time.monotonic() - last_checkin < settings.DATABASE_POOL_PING_IDLE_SECS:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            logger.warning("Idle database connection failed liveness check, reconnecting")
+            raise exc.DisconnectionError from e
+
+
+async def check_pool_health(engine: "AsyncEngine") -> None:
+    """Ping the database through the pool and invalidate it on failover.
+
+    The pool hands out its longest idle connection first, so every run also liveness checks one idle
+    connection through the checkout ping. A disconnect error invalidates every pooled connection by itself,
+    a server which came back as a read only standby (`pg_is_in_recovery()`) means we followed a failover
+    and the pool is disposed.
+    """
+    try:
+        async with engine.connect() as conn:
+            in_recovery = await conn.scalar(text("SELECT pg_is_in_recovery()"))
+    except Exception:
+        logger.exception("Database liveness check failed")
+        return
+    if in_recovery:
+        logger.warning("Database is in recovery mode, disposing connection pool after failover")
+        await engine.dispose()
+
+
+async def pool_health_loop(engine: "AsyncEngine", interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await check_pool_health(engine)
+
+
+@contextlib.asynccontextmanager
+async def pool_health_task(*engines: "AsyncEngine") -> AsyncIterator[None]:
+    """Run background liveness checks for the given engines for the lifetime of the context."""
+    tasks = [
+        asyncio.create_task(pool_health_loop(engine, settings.DATABASE_POOL_HEALTH_CHECK_INTERVAL))
+        for engine in engines
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
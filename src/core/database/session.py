@@ -1,26 +1,185 @@
+import asyncio
 import logging
-from collections.abc import AsyncGenerator
-from typing import TYPE_CHECKING
+import math
+from collections.abc import AsyncGenerator, Callable, Coroutine
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 
 from src.core.config import settings
+from src.core.database.pool import MonitoredQueuePool, register_pool_events
+from src.core.utils.deadline import remaining
 
 if TYPE_CHECKING:
+    from sqlalchemy import Connection, Engine
     from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
-async_engine = create_async_engine(
-    url=settings.SQLALCHEMY_DATABASE_URI,
-    pool_pre_ping=True,
-    future=True,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_POOL_MAX_OVERFLOW,
+SESSION_CONNECTED_KEY = "connected"
+AFTER_COMMIT_KEY = "after_commit"
+SET_TIMEOUTS_STMT = text(
+    "SELECT set_config('statement_timeout', :timeout, true), set_config('lock_timeout', :timeout, true)"
 )
-async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class DatabasePool(StrEnum):
+    """Traffic classes with their own connection pool, so that one class exhausting its pool
+    (eg: list/export traffic) can not starve the others (eg: login and auth lookups).
+    """
+
+    AUTH = "auth"
+    OLTP = "oltp"
+    BULK = "bulk"
+
+
+# pool_size, max_overflow, pool_timeout, statement_timeout
+POOL_SETTINGS: dict[DatabasePool, tuple[int | None, int | None, float, float]] = {
+    DatabasePool.AUTH: (
+        settings.DATABASE_AUTH_POOL_SIZE,
+        settings.DATABASE_AUTH_POOL_MAX_OVERFLOW,
+        settings.DATABASE_AUTH_POOL_TIMEOUT,
+        settings.DATABASE_STATEMENT_TIMEOUT_SECS,
+    ),
+    DatabasePool.OLTP: (
+        settings.DATABASE_POOL_SIZE,
+        settings.DATABASE_POOL_MAX_OVERFLOW,
+        settings.DATABASE_POOL_TIMEOUT,
+        settings.DATABASE_STATEMENT_TIMEOUT_SECS,
+    ),
+    DatabasePool.BULK: (
+        settings.DATABASE_BULK_POOL_SIZE,
+        settings.DATABASE_BULK_POOL_MAX_OVERFLOW,
+        settings.DATABASE_BULK_POOL_TIMEOUT,
+        settings.DATABASE_BULK_STATEMENT_TIMEOUT_SECS,
+    ),
+}
+
+
+def _timeout_ms(seconds: float) -> str:
+    return str(max(int(seconds * 1000), 1))
+
+
+def _create_engine(
+    name: DatabasePool, pool_size: int | None, max_overflow: int | None, timeout: float, statement_timeout: float
+) -> AsyncEngine:
+    engine = create_async_engine(
+        url=settings.SQLALCHEMY_DATABASE_URI,
+        future=True,
+        poolclass=MonitoredQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=timeout,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECS,
+        pool_logging_name=name.value,
+        # sent in the startup packet, no round trip
+        connect_args={
+            "server_settings": {
+                "statement_timeout": _timeout_ms(statement_timeout),
+                "lock_timeout": _timeout_ms(statement_timeout),
+            }
+        },
+    )
+    register_pool_events(engine)
+    return engine
+
+
+async_engines: dict[DatabasePool, AsyncEngine] = {
+    name: _create_engine(name, *params) for name, params in POOL_SETTINGS.items()
+}
+# sync engine -> statement_timeout of its connections
+_statement_timeouts: dict["Engine", float] = {
+    async_engines[name].sync_engine: params[3] for name, params in POOL_SETTINGS.items()
+}
+async_sessions: dict[DatabasePool, async_sessionmaker["AsyncSession"]] = {
+    name: async_sessionmaker(engine, autoflush=False, expire_on_commit=False) for name, engine in async_engines.items()
+}
+async_engine = async_engines[DatabasePool.OLTP]
+async_session = async_sessions[DatabasePool.OLTP]
+
+
+@dataclass
+class SessionStats:
+    """Per worker counters of request sessions.
+
+    `AsyncSession` only checks out a pool connection when its first statement executes,
+    `untouched` counts the sessions which were closed without ever doing so.
+    """
+
+    opened: int = 0
+    connected: int = 0
+
+    @property
+    def untouched(self) -> int:
+        return self.opened - self.connected
+
+    def record(self, session: "AsyncSession") -> None:
+        self.opened += 1
+        if session.info.get(SESSION_CONNECTED_KEY):
+            self.connected += 1
+
+    def dict(self) -> dict[str, int]:
+        return {"opened": self.opened, "connected": self.connected, "untouched": self.untouched}
+
+
+session_stats = SessionStats()
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_connected(session: Session, transaction: Any, connection: Any) -> None:  # noqa: ARG001
+    session.info[SESSION_CONNECTED_KEY] = True
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_request_deadline(session: Session, transaction: Any, connection: "Connection") -> None:  # noqa: ARG001
+    """Bound statement and lock waits of the transaction by the remaining request deadline.
+
+    Connections already bound them by the `statement_timeout` of their pool, the extra round trip is only
+    paid when the remaining budget is tighter than it, ie: close to the deadline.
+    """
+    budget = remaining()
+    if budget is None or budget >= _statement_timeouts.get(connection.engine, math.inf):
+        return
+    connection.execute(SET_TIMEOUTS_STMT, {"timeout": _timeout_ms(budget)})
+
+
+_after_commit_tasks: set[asyncio.Task[None]] = set()
+
+
+def after_commit(session: "AsyncSession | Session", callback: Callable[[], Coroutine[Any, Any, None]]) -> None:
+    """Schedule `callback` once the current transaction of `session` commits, it is dropped on rollback.
+
+    Used to publish cache invalidations only after other workers can read the committed rows.
+    """
+    session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+def _after_commit_done(task: asyncio.Task[None]) -> None:
+    _after_commit_tasks.discard(task)
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        logger.error("After commit callback failed", exc_info=exc)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+        task = asyncio.get_running_loop().create_task(callback())
+        _after_commit_tasks.add(task)
+        task.add_done_callback(_after_commit_done)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session: Session) -> None:
+    session.info.pop(AFTER_COMMIT_KEY, None)
 
 
 async def get_session() -> AsyncGenerator["AsyncSession", None]:
     async with async_session() as session:
-        yield session
+        try:
+            yield session
+        finally:
+            session_stats.record(session)
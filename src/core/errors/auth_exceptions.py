@@ -7,7 +7,9 @@ from uuid import UUID
 
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
+from src.core.config import settings
 from src.core.errors import base_exceptions
 from src.core.errors.base_exceptions import ErrorCode
 from src.core.utils.context import locale_ctx, request_id_ctx
@@ -153,6 +155,15 @@ def gener_error_handler(request: Request, exc: GenerError) -> JSONResponse:
     )
 
 
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> JSONResponse:
+    log_exception(exc, False)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"error": base_exceptions.ERR_503.error, "message": _(base_exceptions.ERR_503.message)},
+        headers={"Retry-After": str(settings.DATABASE_POOL_RETRY_AFTER_SECS)},
+    )
+
+
 def default_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     log_exception(exc, logger_trace_info=True)
     return JSONResponse(
@@ -172,6 +183,7 @@ exception_handlers = [
     {"exception": NotFoundError, "handler": resource_not_found_handler},
     {"exception": ExistError, "handler": resource_exist_handler},
     {"exception": GenerError, "handler": gener_error_handler},
+    {"exception": PoolTimeoutError, "handler": pool_timeout_handler},
 ]
 
 
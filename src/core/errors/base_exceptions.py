@@ -12,7 +12,10 @@ class ErrorCode(NamedTuple):
 
 ERR_404 = ErrorCode(404, "app.not_found")
 ERR_409 = ErrorCode(409, "app.already_exist")
+ERR_429 = ErrorCode(429, "app.too_many_requests")
 ERR_500 = ErrorCode(500, "app.internal_server_error")
+ERR_503 = ErrorCode(503, "app.database_pool_exhausted")
+ERR_504 = ErrorCode(504, "app.deadline_exceeded")
 ERR_10001 = ErrorCode(10001, "User's password can not set as null.")
 ERR_10002 = ErrorCode(10002, "Invalid bearer token.")
 ERR_10003 = ErrorCode(10003, "Bearer token was expired.")
@@ -20,3 +23,4 @@ ERR_10004 = ErrorCode(10004, "Bearer token is invalid for refresh token was prov
 ERR_10005 = ErrorCode(10005, "Permission deny, user with limited access for current API.")
 ERR_10005 = ErrorCode(10005, "Permission deny, user with limited access for current API.")
 ERR_10006 = ErrorCode(10006, "Update user failed, password can not be null.")
+ERR_10007 = ErrorCode(10007, "app.token_revocation_unavailable")
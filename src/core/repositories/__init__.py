@@ -1,3 +1,3 @@
-from src.core.repositories.repository import BaseRepository
+from src.core.repositories.repository import BaseRepository, register_write_hook
 
-__all__ = ("BaseRepository",)
+__all__ = ("BaseRepository", "register_write_hook")
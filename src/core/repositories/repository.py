@@ -1,9 +1,27 @@
-from collections.abc import Sequence
+from collections.abc import Callable, Coroutine, Sequence
+from functools import partial
 from typing import TYPE_CHECKING, Any, Generic, TypedDict, TypeVar, overload
 from uuid import UUID
 
 from pydantic import BaseModel
-from sqlalchemy import Row, Select, Text, cast, desc, func, inspect, not_, or_, select, text, types
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    Text,
+    all_,
+    any_,
+    cast,
+    desc,
+    func,
+    inspect,
+    literal,
+    not_,
+    or_,
+    select,
+    text,
+    types,
+)
 from sqlalchemy.dialects.postgresql import ARRAY, HSTORE, INET, JSON, JSONB, MACADDR
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.mutable import Mutable
@@ -11,7 +29,7 @@ from sqlalchemy.orm import InstrumentedAttribute, selectinload, undefer
 from sqlalchemy.sql.base import ExecutableOption
 
 from src.core._types import Order, QueryParams
-from src.core.database.session import async_engine
+from src.core.database.session import after_commit, async_engine
 from src.core.errors.auth_exceptions import ExistError, NotFoundError
 from src.core.models.base import Base
 from src.core.utils.context import locale_ctx
@@ -30,6 +48,9 @@ QuerySchemaType = TypeVar("QuerySchemaType", bound=QueryParams)
 
 TABLE_PARAMS: dict[str, "InspectorTableConstraint"] = {}
 
+type WriteHook = Callable[[str, tuple[Any, ...]], Coroutine[Any, Any, None]]
+_write_hooks: list[WriteHook] = []
+
 
 class InspectorTableConstraint(TypedDict, total=False):
     foreign_keys: dict[str, tuple[str, str]]
@@ -41,6 +62,31 @@ def register_table_params(table_name: str, params: InspectorTableConstraint) ->
         TABLE_PARAMS[table_name] = params
 
 
+def in_array(col: InstrumentedAttribute[Any] | ColumnElement[Any], values: Sequence[Any]) -> ColumnElement[bool]:
+    """Render `col = ANY(:values)` with one typed array bind parameter.
+
+    `col.in_(values)` expands to one bind parameter per element, so every list length
+    produces a new SQL string and a new asyncpg prepared statement. A single array
+    parameter keeps the statement text stable regardless of the list length.
+    """
+    return col == any_(literal(list(values), ARRAY(col.type)))
+
+
+def not_in_array(col: InstrumentedAttribute[Any] | ColumnElement[Any], values: Sequence[Any]) -> ColumnElement[bool]:
+    """Render `col != ALL(:values)` with one typed array bind parameter, see `in_array`."""
+    return col != all_(literal(list(values), ARRAY(col.type)))
+
+
+def register_write_hook(hook: WriteHook) -> None:
+    """Run `hook(table, pk_ids)` once the transaction of a repository write commits, never on rollback.
+
+    Lets other layers react to writes (eg: the cache invalidating the entries tagged with the written rows)
+    without repositories depending on them. `pk_ids` is empty for inserts.
+    """
+    if hook not in _write_hooks:
+        _write_hooks.append(hook)
+
+
 async def inspect_table(table_name: str) -> InspectorTableConstraint:
     """Reflect table schema to inspect unique constraints and many-to-one fks and cache in memory"""
     if result := TABLE_PARAMS.get(table_name):  # type: ignore  # noqa: PGH003
@@ -120,6 +166,11 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                 result[key] = _class
         return result
 
+    def _run_write_hooks_on_commit(self, session: AsyncSession, *pk_ids: PkIdT | None) -> None:
+        """Schedule the registered write hooks for the model rows written, once the transaction commits."""
+        for hook in _write_hooks:
+            after_commit(session, partial(hook, self.model.__tablename__, pk_ids))
+
     def _get_base_stmt(self) -> Select[tuple[ModelT]]:
         """Get base select statement of query"""
         return select(self.model)
@@ -239,8 +290,8 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             Select[tuple[ModelT]]: The filtered statement.
         """
         operators = {
-            "eq": lambda col, value: col.in_(value if isinstance(value, list) else [value]),
-            "ne": lambda col, value: ~col.in_(value if isinstance(value, list) else [value]),
+            "eq": lambda col, value: in_array(col, value if isinstance(value, list) else [value]),
+            "ne": lambda col, value: not_in_array(col, value if isinstance(value, list) else [value]),
             "ic": lambda col, value: col.ilike(f"%{value}%"),
             "nic": lambda col, value: not_(col.ilike(f"%{value}%")),
             "le": lambda col, value: col < value,
@@ -285,12 +336,12 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                     if key in self.model.__i18n_fields__ and type(getattr(self.model, key).type) is types.JSON:
                         stmt = stmt.where(
                             or_(
-                                getattr(self.model, key)["zh_CN"].in_(value),
-                                getattr(self.model, key)["en_US"].in_(value),
+                                in_array(getattr(self.model, key)["zh_CN"].as_string(), value),
+                                in_array(getattr(self.model, key)["en_US"].as_string(), value),
                             )
                         )
                     else:
-                        stmt = stmt.where(getattr(self.model, key).in_(value))
+                        stmt = stmt.where(in_array(getattr(self.model, key), value))
             elif value is None:
                 stmt = stmt.where(getattr(self.model, key).is_(None))
             else:
@@ -571,7 +622,7 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
         excludes: set[str] | None = None,
         exclude_unset: bool = False,
         exclude_none: bool = False,
-        commit: bool | None = True,
+        commit: bool | None = False,
     ) -> ModelT:
         """
         Creates a new object in the database.
@@ -580,7 +631,8 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             session (AsyncSession): The database session.
             obj_in (CreateSchemaType): The input object for creating a new record.
             excludes (set[str] | None, optional): A set of fields to exclude from the model dump. Defaults to None.
-            commit (bool | None, optional): Whether to commit the changes to the database. Defaults to True.
+            commit (bool | None, optional): Whether to commit the changes to the database. Defaults to False,
+            the object is flushed and committed once by the request scoped unit of work.
 
         Returns:
             ModelT: The newly created object.
@@ -610,9 +662,10 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                     db_m2m = await dto_m2m.get_multi_by_pks_or_404(session, [r.id for r in getattr(obj_in, key)])
                     setattr(new_obj, key, db_m2m)
                 setattr(obj_in, key, value)
+        self._run_write_hooks_on_commit(session)
         if commit:
             return await self.commit(session, new_obj)
-        return new_obj
+        return await self.flush(session, new_obj)
 
     async def update(
         self,
@@ -620,7 +673,7 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
         db_obj: ModelT,
         obj_in: UpdateSchemaType,
         excludes: set[str] | None = None,
-        commit: bool | None = True,
+        commit: bool | None = False,
     ) -> ModelT:
         """
         Update a database object.
@@ -630,7 +683,8 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             db_obj (ModelT): The database object to update.
             obj_in (UpdateSchemaType): The updated data for the object.
             excludes (set | None, optional): The fields to exclude from the update. Defaults to None.
-            commit (bool | None, optional): Whether to commit the changes. Defaults to True.
+            commit (bool | None, optional): Whether to commit the changes. Defaults to False,
+            the object is flushed and committed once by the request scoped unit of work.
 
         Returns:
             ModelT: The updated database object.
@@ -654,9 +708,10 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                         session, db_obj, value, key, [r.id for r in getattr(obj_in, key)], self.id_attribute
                     )
         db_obj = self._update_mutable_tracking(obj_in, db_obj, excludes)
+        self._run_write_hooks_on_commit(session, self.get_id_attribute_value(db_obj))
         if commit:
             return await self.commit(session, db_obj)
-        return db_obj
+        return await self.flush(session, db_obj)
 
     async def update_relationship_field(
         self,
@@ -842,7 +897,7 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
     ) -> Sequence[ModelT]:
         stmt = self._get_base_stmt()
         id_str = self.get_id_attribute_value(self.model)
-        stmt = stmt.where(id_str.in_(pk_ids))
+        stmt = stmt.where(in_array(id_str, pk_ids))
         if options:
             stmt = self._apply_selectinload(stmt, *options, undefer_load=undefer_load)
         return (await session.scalars(stmt)).all()
@@ -874,27 +929,31 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                 raise NotFoundError(self.model.__visible_name__[locale_ctx.get()], self.id_attribute, pk_ids)
         return results
 
-    async def get_one_and_delete(self, session: AsyncSession, pk_id: PkIdT) -> None:
+    async def get_one_and_delete(self, session: AsyncSession, pk_id: PkIdT, commit: bool | None = False) -> None:
         """
         Retrieves a single record from the database using the specified primary key ID and deletes it.
 
         Args:
             session (AsyncSession): The async session object used to interact with the database.
             pk_id (PkIdT): The primary key ID of the record to retrieve and delete.
+            commit (bool | None, optional): Whether to commit the deletion. Defaults to False.
 
         Returns:
             None: This function does not return anything.
         """
         result = await self.get_one_or_404(session, pk_id)
-        await self.delete(session, result)
+        await self.delete(session, result, commit)
 
-    async def get_multi_and_delete(self, session: AsyncSession, pk_ids: list[PkIdT]) -> None:
+    async def get_multi_and_delete(
+        self, session: AsyncSession, pk_ids: list[PkIdT], commit: bool | None = False
+    ) -> None:
         """
         Get multiple records by their primary keys and delete them from the database.
 
         Args:
             session (AsyncSession): The asynchronous session to use for the database operations.
             pk_ids (list[PkIdT]): A list of primary key IDs for the records to retrieve and delete.
+            commit (bool | None, optional): Whether to commit the deletion. Defaults to False.
 
         Returns:
             None: This function does not return anything.
@@ -909,7 +968,11 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             if id_value not in pk_ids:
                 raise NotFoundError(self.model.__visible_name__[locale_ctx.get()], self.id_attribute, id_value)
             await session.delete(r)
-        await session.commit()
+        self._run_write_hooks_on_commit(session, *pk_ids)
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
 
     async def commit(self, session: AsyncSession, obj: ModelT, refresh: bool = False) -> ModelT:
         """
@@ -930,6 +993,40 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             await session.refresh(obj)
         return obj
 
+    async def flush(self, session: AsyncSession, obj: ModelT) -> ModelT:
+        """
+        Flushes the object into the current transaction without committing it.
+
+        Server generated values such as primary keys are available after the flush, the
+        transaction is committed by the caller or by the request scoped unit of work.
+
+        Args:
+            session (AsyncSession): The session used to flush the changes.
+            obj (ModelT): The creating/updating object.
+
+        Returns:
+            ModelT: The creating/updating object.
+        """
+        session.add(obj)
+        await session.flush()
+        return obj
+
+    async def batch_flush(self, session: AsyncSession, objs: list[ModelT]) -> list[ModelT]:
+        """
+        Flushes the given objects into the current transaction without committing them.
+
+        Args:
+            session (AsyncSession): The session used to flush the changes.
+            objs (list[ModelT]): The creating/updating objects.
+
+        Returns:
+            list[ModelT]: The creating/updating objects.
+        """
+        self._run_write_hooks_on_commit(session, *(self.get_id_attribute_value(obj) for obj in objs))
+        session.add_all(objs)
+        await session.flush()
+        return objs
+
     async def batch_commit(self, session: AsyncSession, objs: list[ModelT], refresh: bool = False) -> list[ModelT]:
         """
         Commits the changes made in the session and refreshes the given objects.
@@ -943,6 +1040,7 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
             None
         """
         """"""
+        self._run_write_hooks_on_commit(session, *(self.get_id_attribute_value(obj) for obj in objs))
         session.add_all(objs)
         await session.commit()
         if refresh:
@@ -950,19 +1048,25 @@ class BaseRepository(Generic[ModelT, CreateSchemaType, UpdateSchemaType, QuerySc
                 await session.refresh(obj)
         return objs
 
-    async def delete(self, session: AsyncSession, db_obj: ModelT) -> None:
+    async def delete(self, session: AsyncSession, db_obj: ModelT, commit: bool | None = False) -> None:
         """
         Delete a database object.
 
         Args:
             session (AsyncSession): The database session.
             db_obj (ModelT): The object to be deleted from the database.
+            commit (bool | None, optional): Whether to commit the deletion. Defaults to False,
+            the deletion is flushed and committed once by the request scoped unit of work.
 
         Returns:
             None
         """
+        self._run_write_hooks_on_commit(session, self.get_id_attribute_value(db_obj))
         await session.delete(db_obj)
-        await session.commit()
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
 
     async def get_audit_log(self, session: AsyncSession, pk_id: PkIdT) -> tuple[int, Sequence["AuditLog"] | None]:
         if hasattr(self.model, "audit_log"):
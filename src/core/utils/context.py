@@ -5,3 +5,4 @@ request_id_ctx: ContextVar[str] = ContextVar("x-request-id", default=str(uuid4()
 user_ctx: ContextVar[int | None] = ContextVar("x-auth-user", default=None)
 locale_ctx: ContextVar[str] = ContextVar("Accept-Language", default="en_US")
 orm_diff_ctx: ContextVar[dict | None] = ContextVar("x-orm-diff", default=None)
+deadline_ctx: ContextVar[float | None] = ContextVar("x-request-deadline", default=None)
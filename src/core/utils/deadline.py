@@ -0,0 +1,22 @@
+import asyncio
+from collections.abc import MutableMapping
+from typing import Any
+
+from src.core.utils.context import deadline_ctx
+
+DEADLINE_SCOPE_KEY = "deadline"
+DEADLINE_TIMERS_SCOPE_KEY = "deadline_timers"
+
+
+def remaining() -> float | None:
+    """Seconds left until the current request deadline, `None` when the request has no deadline."""
+    deadline = deadline_ctx.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def stop_deadline_timers(scope: MutableMapping[str, Any]) -> None:
+    """Stop cancelling the request task at its deadlines, before work which must not be interrupted (eg: COMMIT)."""
+    for timer in scope.pop(DEADLINE_TIMERS_SCOPE_KEY, []):
+        timer.cancel()
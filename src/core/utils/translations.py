@@ -1,4 +1,18 @@
 translations = {
-    "en_US": {},
-    "zh_CN": {},
+    "en_US": {
+        "app": {
+            "too_many_requests": "Too many requests, retry later.",
+            "database_pool_exhausted": "Service temporarily unavailable, database connection pool exhausted.",
+            "deadline_exceeded": "Request deadline exceeded.",
+            "token_revocation_unavailable": "Logout failed, token revocation is temporarily unavailable.",
+        },
+    },
+    "zh_CN": {
+        "app": {
+            "too_many_requests": "请求过于频繁，请稍后重试。",
+            "database_pool_exhausted": "服务暂时不可用，数据库连接池已耗尽。",
+            "deadline_exceeded": "请求已超过截止时间。",
+            "token_revocation_unavailable": "注销失败，令牌吊销服务暂时不可用。",
+        },
+    },
 }
@@ -1,41 +1,122 @@
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
+from functools import cache
 from typing import Annotated
 
 import jwt
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from src.core.config import settings
-from src.core.database.session import async_session
+from src.core.database.session import DatabasePool, async_sessions, session_stats
 from src.core.errors import auth_exceptions
-from src.core.utils.context import locale_ctx
+from src.core.utils.context import deadline_ctx, locale_ctx
+from src.core.utils.deadline import DEADLINE_SCOPE_KEY, DEADLINE_TIMERS_SCOPE_KEY, stop_deadline_timers
+from src.features.admin.cache import get_principal, get_principal_version, get_role_grant, is_token_revoked
 from src.features.admin.consts import ReservedRoleSlug
-from src.features.admin.models import RolePermission, User
-from src.features.admin.security import API_WHITE_LISTS, JWT_ALGORITHM, JwtTokenPayload
-from src.libs.redis.cache import CacheNamespace, redis_client
+from src.features.admin.models import User
+from src.features.admin.security import (
+    PRINCIPAL_SCOPE_KEY,
+    JwtTokenPayload,
+    Principal,
+    RouteAccess,
+    permission_index,
+    route_access,
+)
+from src.features.admin.signing import key_ring
 
 token = HTTPBearer()
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
-        yield session
+@cache
+def get_pool_session(pool: DatabasePool) -> Callable[[], AsyncGenerator[AsyncSession, None]]:
+    """Session dependency bound to the connection pool of a traffic class.
 
+    Cached per pool so that FastAPI resolves it once per request.
+    """
 
-async def auth(
-    request: Request, session: AsyncSession = Depends(get_session), token: HTTPAuthorizationCredentials = Depends(token)
-) -> User:
+    async def _get_session() -> AsyncGenerator[AsyncSession, None]:
+        """Request session, a pool connection is only checked out once the first statement executes."""
+        async with async_sessions[pool]() as session:
+            try:
+                yield session
+            finally:
+                session_stats.record(session)
+
+    return _get_session
+
+
+@cache
+def get_pool_uow(pool: DatabasePool) -> Callable[[], AsyncGenerator[AsyncSession, None]]:
+    """Unit of work dependency bound to the connection pool of a traffic class."""
+
+    async def _get_uow(request: Request) -> AsyncGenerator[AsyncSession, None]:
+        """Request scoped unit of work.
+
+        Repositories flush into one transaction which is committed once after the endpoint returns,
+        or rolled back as a whole if it raises. Repository calls with `commit=True` still commit on their own.
+        The route deadline stops before the commit, a COMMIT which may have reached the database is never
+        cancelled (the client would get a 504 for a committed write and the `after_commit` hooks would be lost).
+        """
+        async with async_sessions[pool]() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+            else:
+                stop_deadline_timers(request.scope)
+                await session.commit()
+            finally:
+                session_stats.record(session)
+
+    return _get_uow
+
+
+def deadline(seconds: float) -> Callable[[Request], AsyncGenerator[None, None]]:
+    """Route deadline dependency, the tightest deadline wins when several are declared.
+
+    Database transactions get the remaining budget as `statement_timeout`/`lock_timeout`, Redis calls
+    as timeout, and the request task is cancelled once it expires so that pooled connections are released.
+    """
+
+    async def _deadline(request: Request) -> AsyncGenerator[None, None]:
+        loop = asyncio.get_running_loop()
+        at = loop.time() + seconds
+        if (current := deadline_ctx.get()) is not None:
+            at = min(at, current)
+        deadline_ctx.set(at)
+        request.scope[DEADLINE_SCOPE_KEY] = at
+        task = asyncio.current_task()
+        handle = loop.call_at(at, task.cancel) if task else None
+        if handle:
+            request.scope.setdefault(DEADLINE_TIMERS_SCOPE_KEY, []).append(handle)
+        try:
+            yield
+        finally:
+            if handle:
+                handle.cancel()
+
+    return _deadline
+
+
+get_session = get_pool_session(DatabasePool.OLTP)
+get_uow = get_pool_uow(DatabasePool.OLTP)
+get_auth_session = get_pool_session(DatabasePool.AUTH)
+get_bulk_session = get_pool_session(DatabasePool.BULK)
+
+
+async def access_token(token: HTTPAuthorizationCredentials = Depends(token)) -> JwtTokenPayload:
+    """Decode and validate the bearer access token, rejecting revoked tokens."""
     if token.scheme != "Bearer":
         raise auth_exceptions.TokenInvalidError
     if not token:
         raise auth_exceptions.TokenInvalidError
     try:
-        payload = jwt.decode(token.credentials, settings.SECRET_KEY, algorithms=[JWT_ALGORITHM])
-    except jwt.DecodeError as e:
+        payload = key_ring.decode(token.credentials)
+    except jwt.InvalidTokenError as e:
         raise auth_exceptions.TokenInvalidError from e
     token_data = JwtTokenPayload(**payload)
     if token_data.refresh:
@@ -43,17 +124,52 @@ async def auth(
     now = datetime.now(tz=UTC)
     if now < token_data.issued_at or now > token_data.expires_at:
         raise auth_exceptions.TokenExpireError
-    user = await session.get(User, token_data.sub, options=[selectinload(User.role)])
-    if not user:
-        raise auth_exceptions.NotFoundError(User.__visible_name__[locale_ctx.get()], "id", id)
-    check_user_active(user.is_active)
+    if token_data.jti and await is_token_revoked(token_data.jti):
+        raise auth_exceptions.TokenInvalidError
+    return token_data
+
+
+auth_session = asynccontextmanager(get_auth_session)
+
+
+async def auth(request: Request, token_data: JwtTokenPayload = Depends(access_token)) -> Principal:
+    """Authorize the request from cached principal and role records, without loading `User`.
+
+    Claims embedded in the access token are trusted while their version matches the user version counter,
+    the principal is loaded otherwise. Whitelisted routes (`RouteAccess.TOKEN`) skip the role lookup.
+    Lookups run in a short-lived `AUTH` session, so that its connection is released before the endpoint runs.
+    """
     operation_id = request.scope["route"].operation_id
     if not operation_id:
         raise auth_exceptions.PermissionDenyError
-    privileged = check_privileged_role(user.role.slug, operation_id)
-    if privileged:
-        return user
-    await check_role_permissions(user.role_id, session, operation_id)
+    async with auth_session() as session:
+        principal = token_data.principal()
+        if principal is None or principal.version != await get_principal_version(principal.id):
+            principal = await get_principal(session, token_data.sub)
+        if not principal:
+            raise auth_exceptions.NotFoundError(User.__visible_name__[locale_ctx.get()], "id", token_data.sub)
+        check_user_active(principal.is_active)
+        request.scope[PRINCIPAL_SCOPE_KEY] = principal
+        if route_access.get(operation_id) is RouteAccess.TOKEN:
+            return principal
+        grant = await get_role_grant(session, principal.role_id)
+    if not grant:
+        raise auth_exceptions.PermissionDenyError
+    if check_privileged_role(grant.slug):
+        return principal
+    check_role_permissions(grant.permissions, operation_id)
+    return principal
+
+
+async def auth_user(principal: Principal = Depends(auth)) -> User:
+    """Authorize the request and load the full `User`, for endpoints which need more than the principal.
+
+    The user is loaded in a short-lived `AUTH` session and returned detached, its relationships are not loaded.
+    """
+    async with auth_session() as session:
+        user = await session.get(User, principal.id)
+    if not user:
+        raise auth_exceptions.NotFoundError(User.__visible_name__[locale_ctx.get()], "id", principal.id)
     return user
 
 
@@ -62,25 +178,16 @@ def check_user_active(is_active: bool) -> None:
         raise auth_exceptions.PermissionDenyError
 
 
-def check_privileged_role(slug: str, operation_id: str) -> bool:
-    if slug == ReservedRoleSlug.ADMIN:
-        return True
-    return operation_id in API_WHITE_LISTS
+def check_privileged_role(slug: str) -> bool:
+    return slug == ReservedRoleSlug.ADMIN
 
 
-async def check_role_permissions(role_id: int, session: AsyncSession, operation_id: str) -> None:
-    permissions: list[str] | None = await redis_client.get_cache(name=str(role_id), namespace=CacheNamespace.ROLE_CACHE)
-    if not permissions:
-        _permissions = (
-            await session.scalars(select(RolePermission.permission_id).where(RolePermission.role_id == role_id))
-        ).all()
-        if not _permissions:
-            raise auth_exceptions.PermissionDenyError
-        permissions = [str(p) for p in _permissions]
-        await redis_client.set_nx(name=str(role_id), value=permissions, namespace=CacheNamespace.ROLE_CACHE)
-    if operation_id not in permissions:
+def check_role_permissions(permissions: int, operation_id: str) -> None:
+    if not permission_index.has(permissions, operation_id):
         raise auth_exceptions.PermissionDenyError
 
 
 SqlaSession = Annotated[AsyncSession, Depends(get_session)]
-AuthUser = Annotated[User, Depends(auth)]
+UowSession = Annotated[AsyncSession, Depends(get_uow)]
+AuthPrincipal = Annotated[Principal, Depends(auth)]
+AuthUser = Annotated[User, Depends(auth_user)]
@@ -3,19 +3,22 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.core._types import IdResponse, ListT
+from src.core.config import settings
 from src.core.errors import base_exceptions
 from src.core.errors.auth_exceptions import GenerError
 from src.core.utils.cbv import cbv
-from src.core.utils.validators import list_to_tree
-from src.deps import auth, get_session
+from src.deps import access_token, auth, deadline, get_auth_session, get_bulk_session, get_uow
 from src.features.admin import schemas
+from src.features.admin.cache import get_menu_tree, get_principal, revoke_token
 from src.features.admin.models import Group, Permission, Role, User
-from src.features.admin.security import generate_access_token_response
+from src.features.admin.security import JwtTokenPayload, Principal, generate_access_token_response
 from src.features.admin.services import group_repo, menu_repo, permission_repo, role_repo, user_repo
+from src.libs.redis import cache
 
 router = APIRouter()
 
@@ -23,22 +26,45 @@ router = APIRouter()
 @router.post("/pwd-login", operation_id="c5f719b1-7adf-4b4e-a498-732b8da7d758")
 async def login_pwd(
     user: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_auth_session)],
 ) -> schemas.AccessToken:
     result = await user_repo.verify_user(session, user)
-    return generate_access_token_response(result.id)
+    principal = await get_principal(session, result.id)
+    return generate_access_token_response(result.id, principal)
+
+
+@router.post(
+    "/logout",
+    operation_id="9b0f4c1e-7d3a-4e52-a8c6-1f2e3d4b5a69",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(auth)],
+)
+async def logout(token_data: Annotated[JwtTokenPayload, Depends(access_token)]) -> None:
+    if token_data.jti:
+        try:
+            await revoke_token(token_data.jti, token_data.expires_at.timestamp())
+        except RedisError as e:
+            raise GenerError(base_exceptions.ERR_10007, status_code=status.HTTP_503_SERVICE_UNAVAILABLE) from e
+
+
+@router.get("/cache/hot-keys", operation_id="5d39d77a-39b7-4744-964c-87526e4afbea", dependencies=[Depends(auth)])
+async def get_hot_keys() -> list[schemas.HotKey]:
+    """Cache keys currently detected as hot by this worker, hottest first."""
+    return [
+        schemas.HotKey(key=key, reads=reads, replicated=cache.hot_replicas.get(key) is not None)
+        for key, reads in cache.hot_key_detector.hot_keys()
+    ]
 
 
 @cbv(router)
 class UserAPI:
-    user: User = Depends(auth)
-    session: AsyncSession = Depends(get_session)
+    principal: Principal = Depends(auth)
+    session: AsyncSession = Depends(get_uow)
 
     @router.post("/users", operation_id="5091fff6-1adc-4a22-8a8c-ef0107122df7", summary="创建新用户/Create new user")
     async def create_user(self, user: schemas.UserCreate) -> IdResponse:
         new_user = await user_repo.create(self.session, user)
-        result = await user_repo.commit(self.session, new_user)
-        return IdResponse(id=result.id)
+        return IdResponse(id=new_user.id)
 
     @router.get(
         "/users/{id}",
@@ -54,10 +80,18 @@ class UserAPI:
         )
         return schemas.UserDetail.model_validate(db_user)
 
-    @router.get("/users", operation_id="2485e2a2-4d81-4601-a6fd-c633b23ce5fc")
-    async def get_users(self, query: Annotated[schemas.UserQuery, Depends()]) -> ListT[schemas.UserDetail]:
+    @router.get(
+        "/users",
+        operation_id="2485e2a2-4d81-4601-a6fd-c633b23ce5fc",
+        dependencies=[Depends(deadline(settings.LIST_REQUEST_DEADLINE_SECS))],
+    )
+    async def get_users(
+        self,
+        query: Annotated[schemas.UserQuery, Depends()],
+        session: Annotated[AsyncSession, Depends(get_bulk_session)],
+    ) -> ListT[schemas.UserDetail]:
         count, results = await user_repo.list_and_count(
-            self.session,
+            session,
             query,
             selectinload(User.role).load_only(Role.id, Role.name),
             selectinload(User.group).load_only(Group.id, Group.name),
@@ -82,8 +116,8 @@ class UserAPI:
 
 @cbv(router)
 class GroupAPI:
-    user: User = Depends(auth)
-    session: AsyncSession = Depends(get_session)
+    principal: Principal = Depends(auth)
+    session: AsyncSession = Depends(get_uow)
 
     @router.post("/groups", operation_id="9e3e639d-c694-467d-9209-717b038cf267")
     async def create_group(self, group: schemas.GroupCreate) -> IdResponse:
@@ -95,9 +129,17 @@ class GroupAPI:
         db_group = await group_repo.get_one_or_404(self.session, id, undefer_load=True)
         return schemas.GroupDetail.model_validate(db_group)
 
-    @router.get("/groups", operation_id="a1d1f8f1-4d4d-4fab-868b-3f977df26e05")
-    async def get_groups(self, query: Annotated[schemas.GroupQuery, Depends()]) -> ListT[schemas.GroupDetail]:
-        count, results = await group_repo.list_and_count(self.session, query)
+    @router.get(
+        "/groups",
+        operation_id="a1d1f8f1-4d4d-4fab-868b-3f977df26e05",
+        dependencies=[Depends(deadline(settings.LIST_REQUEST_DEADLINE_SECS))],
+    )
+    async def get_groups(
+        self,
+        query: Annotated[schemas.GroupQuery, Depends()],
+        session: Annotated[AsyncSession, Depends(get_bulk_session)],
+    ) -> ListT[schemas.GroupDetail]:
+        count, results = await group_repo.list_and_count(session, query)
         return ListT(count=count, results=[schemas.GroupDetail.model_validate(r) for r in results])
 
     @router.put("/groups/{id}", operation_id="3d5badd1-665c-49f8-85c4-6f6d7f3a1b2a")
@@ -115,8 +157,8 @@ class GroupAPI:
 
 @cbv(router)
 class RoleAPI:
-    user: User = Depends(auth)
-    session: AsyncSession = Depends(get_session)
+    principal: Principal = Depends(auth)
+    session: AsyncSession = Depends(get_uow)
 
     @router.post("/roles", operation_id="a18a152b-e9e9-4128-b8be-8a8e9c842abb")
     async def create_role(self, role: schemas.RoleCreate) -> IdResponse:
@@ -128,9 +170,17 @@ class RoleAPI:
         db_role = await role_repo.get_one_or_404(self.session, id, selectinload(Role.permission), undefer_load=True)
         return schemas.RoleDetail.model_validate(db_role)
 
-    @router.get("/roles", operation_id="c5f793b1-7adf-4b4e-a498-732b0fa7d758")
-    async def get_roles(self, query: Annotated[schemas.RoleQuery, Depends()]) -> ListT[schemas.RoleList]:
-        count, results = await role_repo.list_and_count(self.session, query)
+    @router.get(
+        "/roles",
+        operation_id="c5f793b1-7adf-4b4e-a498-732b0fa7d758",
+        dependencies=[Depends(deadline(settings.LIST_REQUEST_DEADLINE_SECS))],
+    )
+    async def get_roles(
+        self,
+        query: Annotated[schemas.RoleQuery, Depends()],
+        session: Annotated[AsyncSession, Depends(get_bulk_session)],
+    ) -> ListT[schemas.RoleList]:
+        count, results = await role_repo.list_and_count(session, query)
         return ListT(count=count, results=[schemas.RoleList.model_validate(r) for r in results])
 
     @router.put("/roles/{id}", operation_id="2fda2e00-ad86-4296-a1d4-c7f02366b52e")
@@ -148,8 +198,8 @@ class RoleAPI:
 
 @cbv(router)
 class MenuAPI:
-    user: User = Depends(auth)
-    session: AsyncSession = Depends(get_session)
+    principal: Principal = Depends(auth)
+    session: AsyncSession = Depends(get_uow)
 
     @router.post("/menus", operation_id="008bf4d4-cc01-48b0-82b8-1a67c0348b31")
     async def create_menu(self, meun: schemas.MenuCreate) -> IdResponse:
@@ -158,8 +208,7 @@ class MenuAPI:
 
     @router.get("/menus", operation_id="cb7f25ab-798b-4668-a838-6339425e2889")
     async def get_menus(self) -> schemas.MenuTree:
-        results = await menu_repo.get_all(self.session)
-        data = list_to_tree([r.dict() for r in results])
+        data = await get_menu_tree(self.session)
         return schemas.MenuTree.model_validate(data)
 
     @router.put("menus/{id}", operation_id="b4d7ac97-a182-4bd1-a75c-6ae44b5fcf0a")
@@ -176,8 +225,8 @@ class MenuAPI:
 
 @cbv(router)
 class PermissionCBV:
-    user: User = Depends(auth)
-    session: AsyncSession = Depends(get_session)
+    principal: Principal = Depends(auth)
+    session: AsyncSession = Depends(get_uow)
 
     @router.get("/permissions", operation_id="8057d614-150f-42ee-984c-d0af35796da3")
     async def get_permissions(self) -> ListT[schemas.Permission]:
@@ -204,5 +253,5 @@ class PermissionCBV:
             await permission_repo.get_multi_and_delete(self.session, [UUID(p_id) for p_id in removed])
         if added:
             new_permissions = [Permission(id=p_id, **router_mappings[p_id]) for p_id in added]
-            await permission_repo.batch_commit(self.session, new_permissions)
+            await permission_repo.batch_flush(self.session, new_permissions)
         return {"added": added, "removed": removed}
@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, fields
+from typing import Any
+
+import redis.asyncio as redis
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.utils.validators import list_to_tree
+from src.features.admin.consts import ReservedRoleSlug
+from src.features.admin.models import Menu, Role, RolePermission, User
+from src.features.admin.security import Principal, RoleGrant, permission_index
+from src.libs.redis import cache
+from src.libs.redis.bloom import BloomFilter
+from src.libs.redis.local_cache import LocalCache
+from src.libs.redis.pubsub import INVALIDATE_ALL, invalidation_bus
+from src.libs.redis.serializers import CacheDecodeError, codec
+
+logger = logging.getLogger(__name__)
+
+ROLE_TOPIC = "role"
+PRINCIPAL_TOPIC = "principal"
+REVOKED_TOKEN_TOPIC = "revoked_token"  # noqa: S105
+REVOKED_TOKENS_KEY = "revoked_tokens"
+MENU_TREE_KEY = "menu_tree"
+INVALIDATION_BACKOFF = 0.1  # seconds before the first retry of a failed invalidation
+ROLE_RECORD_FIELDS = frozenset(("slug", "index", "bits", "version"))
+PRINCIPAL_RECORD_FIELDS = frozenset(field.name for field in fields(Principal))
+
+role_cache: LocalCache[int, RoleGrant] = LocalCache(
+    maxsize=settings.ROLE_PERMISSION_CACHE_SIZE, ttl=settings.ROLE_PERMISSION_CACHE_TTL
+)
+principal_cache: LocalCache[int, Principal] = LocalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL
+)
+principal_version_cache: LocalCache[int, int] = LocalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL
+)
+revoked_tokens = BloomFilter(size=settings.TOKEN_REVOCATION_BLOOM_BITS, hashes=settings.TOKEN_REVOCATION_BLOOM_HASHES)
+
+
+def _principal_name(user_id: int) -> str:
+    # hash tag, so that the principal record and version counter of a user live on the same cache node
+    return f"{{{user_id}}}"
+
+
+def _principal_version_key(user_id: int) -> str:
+    return f"{cache.CacheNamespace.PRINCIPAL_CACHE}version_{_principal_name(user_id)}"
+
+
+def _local_ttl() -> float | None:
+    """Short worker TTL while invalidations of other workers may be lost, so that stale grants fail closed."""
+    return settings.AUTH_CACHE_DEGRADED_TTL if invalidation_bus.degraded else None
+
+
+def _role_name(role_id: int) -> str:
+    # hash tag, so that the role record and version counter live on the same cache node
+    return f"{{{role_id}}}"
+
+
+def _role_version_key(role_id: int) -> str:
+    return f"{cache.CacheNamespace.ROLE_CACHE}version_{_role_name(role_id)}"
+
+
+def _decode_record(record: bytes | None, record_fields: frozenset[str]) -> dict[str, Any] | None:
+    """Cached record with exactly the expected fields, `None` if it is missing, truncated, foreign or outdated."""
+    if not record:
+        return None
+    try:
+        data = codec.loads(record)
+    except CacheDecodeError:
+        return None
+    return data if isinstance(data, dict) and data.keys() == record_fields else None
+
+
+async def _start_version(key: str) -> int:
+    """Start a missing (never set, evicted, flushed or moved) version counter at the current time in ms.
+
+    Versions the lost counter reached are far below it, so records or tokens carrying them are never trusted again.
+    """
+    async with cache.redis_client.guarded(key):
+        _, current = await (
+            cache.redis_client.node(key).pipeline().set(key, time.time_ns() // 1_000_000, nx=True).get(key).execute()
+        )
+    return int(current)
+
+
+async def _load_role_record(session: AsyncSession, role_id: int) -> dict[str, Any] | None:
+    slug = await session.scalar(select(Role.slug).where(Role.id == role_id))
+    if slug is None:
+        return None
+    bits = 0
+    if slug != ReservedRoleSlug.ADMIN:
+        # admin is authorized by slug, its permissions are never checked
+        results = await session.scalars(select(RolePermission.permission_id).where(RolePermission.role_id == role_id))
+        bits = permission_index.encode(str(p) for p in results.all())
+    return {"slug": slug, "index": permission_index.fingerprint, "bits": format(bits, "x")}
+
+
+async def get_role_grant(session: AsyncSession, role_id: int) -> RoleGrant | None:
+    """Slug and permission bitset of the role, from the worker cache, then Redis, then the database.
+
+    The Redis record stores the bitset as hex together with the `permission_index` fingerprint it was
+    encoded with and the role version counter it was loaded at, `invalidate_role` bumps the counter.
+    Records of another route set or version are reloaded from the database, so that a record loaded
+    before a role update and written after its invalidation is never trusted.
+    While Redis is unavailable the role is loaded from the database on every call.
+    """
+    if (grant := role_cache.get(role_id)) is not None:
+        return grant
+    version = role_cache.version
+    key = cache.CacheNamespace.ROLE_CACHE + _role_name(role_id)
+    version_key = _role_version_key(role_id)
+    try:
+        record, current = await cache.redis_client.batched("MGET", key, version_key)
+        current_version = int(current) if current is not None else await _start_version(version_key)
+    except redis.RedisError:
+        loaded = await _load_role_record(session, role_id)
+        return RoleGrant(slug=loaded["slug"], permissions=int(loaded["bits"], 16)) if loaded else None
+    cached = _decode_record(record, ROLE_RECORD_FIELDS)
+    if cached is None or cached["index"] != permission_index.fingerprint or cached["version"] != current_version:
+        if (loaded := await _load_role_record(session, role_id)) is None:
+            return None
+        cached = {**loaded, "version": current_version}
+        await cache.redis_client.set_ex(
+            name=_role_name(role_id),
+            value=cached,
+            expire=settings.ROLE_PERMISSION_CACHE_REDIS_TTL,
+            namespace=cache.CacheNamespace.ROLE_CACHE,
+        )
+    grant = RoleGrant(slug=cached["slug"], permissions=int(cached["bits"], 16))
+    role_cache.set(role_id, grant, version, _local_ttl())
+    return grant
+
+
+async def _load_principal_row(session: AsyncSession, user_id: int) -> Row[tuple[int, bool]] | None:
+    return (await session.execute(select(User.role_id, User.is_active).where(User.id == user_id))).one_or_none()
+
+
+async def get_principal(session: AsyncSession, user_id: int) -> Principal | None:
+    """Compact record of the user for authorization, from the worker cache, then Redis, then the database.
+
+    The Redis record carries the user version counter it was loaded at and is only trusted while
+    the counter is unchanged, `invalidate_principal` bumps it on every user update or deletion.
+    Records which can not be decoded into a principal of this user are reloaded from the database.
+    While Redis is unavailable the principal is loaded from the database on every call.
+    """
+    if (principal := principal_cache.get(user_id)) is not None:
+        return principal
+    version = principal_cache.version
+    key = cache.CacheNamespace.PRINCIPAL_CACHE + _principal_name(user_id)
+    try:
+        record, current = await cache.redis_client.batched("MGET", key, _principal_version_key(user_id))
+        current_version = int(current) if current is not None else await _start_version(_principal_version_key(user_id))
+    except redis.RedisError:
+        row = await _load_principal_row(session, user_id)
+        return Principal(id=user_id, role_id=row.role_id, is_active=row.is_active, version=-1) if row else None
+    data = _decode_record(record, PRINCIPAL_RECORD_FIELDS)
+    if data is not None and data["id"] == user_id and data["version"] == current_version:
+        principal = Principal(**data)
+    else:
+        row = await _load_principal_row(session, user_id)
+        if row is None:
+            return None
+        principal = Principal(id=user_id, role_id=row.role_id, is_active=row.is_active, version=current_version)
+        await cache.redis_client.set_ex(
+            name=_principal_name(user_id),
+            value=asdict(principal),
+            expire=settings.PRINCIPAL_CACHE_TTL,
+            namespace=cache.CacheNamespace.PRINCIPAL_CACHE,
+        )
+    principal_cache.set(user_id, principal, version, _local_ttl())
+    return principal
+
+
+async def get_principal_version(user_id: int) -> int | None:
+    """Current version counter of the user, checked against the `ver` claim of stateless access tokens.
+
+    `None` while Redis is unavailable or the counter is missing, so that no claims are trusted,
+    the counter is then restarted by `get_principal`.
+    """
+    if (principal := principal_cache.get(user_id)) is not None:
+        return principal.version
+    if (current := principal_version_cache.get(user_id)) is not None:
+        return current
+    version = principal_version_cache.version
+    try:
+        counter = await cache.redis_client.batched("GET", _principal_version_key(user_id))
+    except redis.RedisError:
+        return None
+    if counter is None:
+        return None
+    current = int(counter)
+    principal_version_cache.set(user_id, current, version, _local_ttl())
+    return current
+
+
+async def get_menu_tree(session: AsyncSession) -> list[dict[str, Any]]:
+    """Menu tree from the local tier, then Redis, then the database, dropped by any menu write."""
+    cached, *_ = await cache.redis_client.get_many([MENU_TREE_KEY], namespace=cache.CacheNamespace.NORMAL_CACHE)
+    if cached is not None:
+        return cached
+    menus = (await session.scalars(select(Menu))).all()
+    tree = list_to_tree([m.dict() for m in menus])
+    await cache.redis_client.set_ex(
+        name=MENU_TREE_KEY,
+        value=tree,
+        namespace=cache.CacheNamespace.NORMAL_CACHE,
+        tags=cache.entity_tags(Menu.__tablename__),
+    )
+    return tree
+
+
+async def _bump_version(version_key: str, key: str) -> None:
+    """Bump the version counter and drop the record it guards, retried with backoff while the node fails.
+
+    Once retries are exhausted the failure is logged, the record is then trusted until it expires.
+    """
+    retries = settings.AUTH_CACHE_INVALIDATION_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            async with cache.redis_client.guarded(version_key):
+                await cache.redis_client.node(version_key).pipeline().incr(version_key).delete(key).execute()
+        except redis.RedisError:
+            if attempt == retries:
+                logger.exception(f"Failed to invalidate {key} after {retries} retries")
+                return
+            await asyncio.sleep(INVALIDATION_BACKOFF * 2**attempt)
+        else:
+            await cache.invalidate_local_copies([version_key, key])
+            return
+
+
+async def invalidate_role(role_id: int) -> None:
+    """Bump the role version counter and drop the cached slug and permissions in Redis and in every worker."""
+    await _bump_version(_role_version_key(role_id), cache.CacheNamespace.ROLE_CACHE + _role_name(role_id))
+    await invalidation_bus.publish(ROLE_TOPIC, str(role_id))
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Bump the user version counter and drop the cached principal in Redis and in every worker."""
+    await _bump_version(
+        _principal_version_key(user_id), cache.CacheNamespace.PRINCIPAL_CACHE + _principal_name(user_id)
+    )
+    await invalidation_bus.publish(PRINCIPAL_TOPIC, str(user_id))
+
+
+async def revoke_token(jti: str, expires_at: float) -> None:
+    """Revoke a token until it expires, in Redis and in the bloom filter of every worker.
+
+    Revoked ids are kept in a sorted set scored by token expiry, so that expired entries are pruned here.
+
+    Raises:
+        redis.RedisError: Redis is unavailable, the token is only revoked in this worker.
+    """
+    revoked_tokens.add(jti)
+    async with cache.redis_client.guarded_primary():
+        await (
+            cache.redis_client.pipeline()
+            .zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+            .zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+            .execute()
+        )
+    await invalidation_bus.publish(REVOKED_TOKEN_TOPIC, jti)
+
+
+async def is_token_revoked(jti: str) -> bool:
+    """Check the local bloom filter first, only its (rare) positives are confirmed in Redis.
+
+    While the invalidation bus is degraded the filter may miss revocations of other workers, misses are
+    then checked in Redis as well until the bus resubscribes and the filter is reloaded.
+    Positives which can not be confirmed while Redis is unavailable are considered revoked (fail closed),
+    misses which can not be checked are accepted, a revocation is only acknowledged once stored in Redis.
+    """
+    maybe_revoked = jti in revoked_tokens
+    if not maybe_revoked and not invalidation_bus.degraded:
+        return False
+    try:
+        async with cache.redis_client.guarded_primary():
+            return await cache.redis_client.zscore(REVOKED_TOKENS_KEY, jti) is not None
+    except redis.RedisError:
+        if not maybe_revoked:
+            logger.warning(f"Failed to check token revocation while invalidations may be lost: jti={jti}")
+            return False
+        logger.warning(f"Failed to confirm token revocation, rejecting it: jti={jti}")
+        return True
+
+
+async def load_revoked_tokens() -> None:
+    """Rebuild the bloom filter from the unexpired revoked ids in Redis."""
+    try:
+        jtis = await cache.redis_client.zrangebyscore(REVOKED_TOKENS_KEY, time.time(), "+inf")
+    except Exception:
+        logger.exception("Failed to load revoked tokens")
+        return
+    revoked_tokens.clear()
+    for jti in jtis:
+        revoked_tokens.add(jti.decode() if isinstance(jti, bytes) else jti)
+
+
+_reload_tasks: set[asyncio.Task[None]] = set()
+
+
+def _on_token_revoked(key: str) -> None:
+    if key != INVALIDATE_ALL:
+        revoked_tokens.add(key)
+        return
+    task = asyncio.get_running_loop().create_task(load_revoked_tokens())
+    _reload_tasks.add(task)
+    task.add_done_callback(_reload_tasks.discard)
+
+
+def _invalidate_local(
+    local_cache: LocalCache[int, RoleGrant] | LocalCache[int, Principal] | LocalCache[int, int], key: str
+) -> None:
+    if key == INVALIDATE_ALL:
+        local_cache.clear()
+    else:
+        local_cache.invalidate(int(key))
+
+
+invalidation_bus.subscribe(ROLE_TOPIC, lambda key: _invalidate_local(role_cache, key))
+invalidation_bus.subscribe(PRINCIPAL_TOPIC, lambda key: _invalidate_local(principal_cache, key))
+invalidation_bus.subscribe(PRINCIPAL_TOPIC, lambda key: _invalidate_local(principal_version_cache, key))
+invalidation_bus.subscribe(REVOKED_TOKEN_TOPIC, _on_token_revoked)
@@ -179,3 +179,9 @@ class GroupQuery(QueryParams): ...
 
 
 class RoleQuery(QueryParams): ...
+
+
+class HotKey(BaseModel):
+    key: str
+    reads: int = Field(description="estimated reads per detection window")
+    replicated: bool
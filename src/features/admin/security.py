@@ -1,18 +1,46 @@
+import asyncio
 import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from enum import StrEnum
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+from uuid import uuid4
 
 import bcrypt
-import jwt
 from pydantic import BaseModel
 
 from src.core.config import settings
 from src.features.admin.schemas import AccessToken
+from src.features.admin.signing import key_ring
+
+if TYPE_CHECKING:
+    from fastapi.dependencies.models import Dependant
+    from starlette.routing import BaseRoute
+
+P = ParamSpec("P")
+R = TypeVar("R")
 
-JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_SECS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
 REFRESH_TOKEN_EXPIRE_SECS = settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+PRINCIPAL_SCOPE_KEY = "principal"
+
+# operation ids every authenticated user may call, regardless of role permissions
+API_WHITE_LISTS: set[str] = {
+    "9b0f4c1e-7d3a-4e52-a8c6-1f2e3d4b5a69",  # logout
+}
 
-API_WHITE_LISTS: set[str] = set()
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Compact record of an authenticated user, enough to authorize a request without loading `User`."""
+
+    id: int
+    role_id: int
+    is_active: bool
+    version: int = 0
 
 
 class JwtTokenPayload(BaseModel):
@@ -20,15 +48,105 @@ class JwtTokenPayload(BaseModel):
     refresh: bool
     issued_at: datetime
     expires_at: datetime
+    jti: str | None = None
+    # authorization claims, only present in access tokens issued with `JWT_STATELESS_CLAIMS`
+    role_id: int | None = None
+    is_active: bool | None = None
+    ver: int | None = None
+
+    def principal(self) -> Principal | None:
+        """Principal snapshot embedded in the token, if any, only valid while `ver` is current."""
+        if self.role_id is None or self.is_active is None or self.ver is None:
+            return None
+        return Principal(id=self.sub, role_id=self.role_id, is_active=self.is_active, version=self.ver)
+
+
+@dataclass(frozen=True, slots=True)
+class RoleGrant:
+    slug: str
+    permissions: int
+
+
+class PermissionIndex:
+    """Stable bit positions for route operation ids, so that role permissions are packed into one integer.
+
+    Positions follow the sorted operation ids of the app routes, every worker running the same routes
+    computes the same positions. `fingerprint` identifies the route set, bitsets cached under another
+    fingerprint (eg: during a rolling deploy) must not be decoded with this index.
+    """
+
+    def __init__(self) -> None:
+        self.positions: dict[str, int] = {}
+        self.fingerprint: str = ""
+
+    def build(self, routes: Iterable["BaseRoute"]) -> None:
+        operation_ids = sorted({op for route in routes if (op := getattr(route, "operation_id", None))})
+        self.positions = {op: position for position, op in enumerate(operation_ids)}
+        self.fingerprint = blake2b("\n".join(operation_ids).encode(), digest_size=8).hexdigest()
+
+    def encode(self, operation_ids: Iterable[str]) -> int:
+        bits = 0
+        for op in operation_ids:
+            if (position := self.positions.get(op)) is not None:
+                bits |= 1 << position
+        return bits
+
+    def has(self, bits: int, operation_id: str) -> bool:
+        position = self.positions.get(operation_id)
+        return position is not None and (bits >> position) & 1 == 1
+
+
+permission_index = PermissionIndex()
+
+
+class RouteAccess(StrEnum):
+    PUBLIC = "public"  # no auth dependency
+    TOKEN = "token"  # noqa: S105 any active user with a valid token, no permission check
+    PERMISSION = "permission"  # role permission check
+
+
+class RouteAccessTable:
+    """Access class of every route by operation id, computed once at startup from the app routes."""
+
+    def __init__(self) -> None:
+        self.access: dict[str, RouteAccess] = {}
 
+    @classmethod
+    def _depends_on(cls, dependant: "Dependant", call: Callable[..., Any]) -> bool:
+        return any(dep.call is call or cls._depends_on(dep, call) for dep in dependant.dependencies)
 
-def create_jwt_token(subject: int, expire_seconds: int, refresh: bool) -> tuple[str, int, int]:
+    def build(self, routes: Iterable["BaseRoute"], auth_dependency: Callable[..., Any]) -> None:
+        access: dict[str, RouteAccess] = {}
+        for route in routes:
+            operation_id = getattr(route, "operation_id", None)
+            dependant = getattr(route, "dependant", None)
+            if not operation_id or dependant is None:
+                continue
+            if not self._depends_on(dependant, auth_dependency):
+                access[operation_id] = RouteAccess.PUBLIC
+            elif operation_id in API_WHITE_LISTS:
+                access[operation_id] = RouteAccess.TOKEN
+            else:
+                access[operation_id] = RouteAccess.PERMISSION
+        self.access = access
+
+    def get(self, operation_id: str) -> RouteAccess:
+        return self.access.get(operation_id, RouteAccess.PERMISSION)
+
+
+route_access = RouteAccessTable()
+
+
+def create_jwt_token(
+    subject: int, expire_seconds: int, refresh: bool, principal: Principal | None = None
+) -> tuple[str, int, int]:
     """Create jwt access token or refresh token for use
 
     Args:
         subject (UUID): unique ID for user(primary key used in this project).
         expire_seconds (int): expire time in seconds.
         refresh (bool | None, optional): if set True, token is refresh token.
+        principal (Principal | None, optional): if set, its role, active flag and version are embedded as claims.
 
     Returns:
         tuple[str, datetime, datetime]: token str, expires_at, issued_at.
@@ -40,14 +158,21 @@ def create_jwt_token(subject: int, expire_seconds: int, refresh: bool) -> tuple[
         "expires_at": expires_at,
         "sub": str(subject),
         "refresh": refresh,
+        "jti": uuid4().hex,
     }
-    encode_jwt = jwt.encode(to_encode, key=settings.SECRET_KEY, algorithm=JWT_ALGORITHM)
+    if principal:
+        to_encode.update(role_id=principal.role_id, is_active=principal.is_active, ver=principal.version)
+    encode_jwt = key_ring.encode(to_encode)
     return encode_jwt, expires_at, issued_at
 
 
-def generate_access_token_response(subject: int) -> AccessToken:
-    """Generate tokens and return AccessTokenResponse."""
-    at, et, it = create_jwt_token(subject, ACCESS_TOKEN_EXPIRE_SECS, refresh=False)
+def generate_access_token_response(subject: int, principal: Principal | None = None) -> AccessToken:
+    """Generate tokens and return AccessTokenResponse.
+
+    The principal is embedded into the access token when `JWT_STATELESS_CLAIMS` is enabled.
+    """
+    claims = principal if settings.JWT_STATELESS_CLAIMS else None
+    at, et, it = create_jwt_token(subject, ACCESS_TOKEN_EXPIRE_SECS, refresh=False, principal=claims)
     rat, ret, rit = create_jwt_token(subject, REFRESH_TOKEN_EXPIRE_SECS, refresh=True)
     return AccessToken(
         access_token=at,
@@ -67,3 +192,72 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """Create hashed password from plain password."""
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.SECURITY_BCRYPT_ROUNDS)).decode()
+
+
+class PasswordHasher:
+    """Run bcrypt in a dedicated, bounded thread pool instead of on the event loop.
+
+    bcrypt releases the GIL, so hashing in threads keeps the worker serving other requests during
+    a login burst. At most `max_workers` hashes run at once, the rest queue in the executor.
+    Once shut down, the hasher refuses new work instead of starting another pool.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._closed = False
+        self.pending = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._closed:
+            msg = "Password hasher is shut down"
+            raise RuntimeError(msg)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        submitted_at = time.perf_counter()
+
+        def timed() -> tuple[R, float]:
+            started_at = time.perf_counter()
+            return func(*args, **kwargs), started_at - submitted_at
+
+        self.pending += 1
+        try:
+            result, waited = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "max_workers": self.max_workers,
+            "running": min(self.pending, self.max_workers),
+            "queued": max(self.pending - self.max_workers, 0),
+            "completed": self.completed,
+            "wait_avg_ms": round(self.wait_total / self.completed * 1000, 3) if self.completed else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
@@ -1,16 +1,20 @@
 from collections.abc import Sequence
+from functools import partial
 
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
 from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.database.session import after_commit
 from src.core.errors.auth_exceptions import NotFoundError, PermissionDenyError
 from src.core.repositories import BaseRepository
 from src.core.utils.context import locale_ctx
 from src.features.admin import schemas
+from src.features.admin.cache import invalidate_principal, invalidate_role
 from src.features.admin.consts import ReservedRoleSlug
 from src.features.admin.models import Group, Menu, Permission, Role, User
-from src.features.admin.security import verify_password
+from src.features.admin.security import password_hasher
 
 
 class UserRepo(BaseRepository[User, schemas.UserCreate, schemas.UserUpdate, schemas.UserQuery]):
@@ -19,10 +23,45 @@ class UserRepo(BaseRepository[User, schemas.UserCreate, schemas.UserUpdate, sche
         db_user = await session.scalar(stmt)
         if not db_user:
             raise NotFoundError(self.model.__visible_name__[locale_ctx.get()], "username", user.username)
-        if not verify_password(user.password, db_user.password):
+        if not await password_hasher.verify(user.password, db_user.password):
             raise PermissionDenyError
         return db_user
 
+    @staticmethod
+    async def _hash_password[SchemaT: BaseModel](obj_in: SchemaT) -> SchemaT:
+        """Schema with its plain password replaced by its hash, computed in the password hasher pool."""
+        if not (password := getattr(obj_in, "password", None)):
+            return obj_in
+        return obj_in.model_copy(update={"password": await password_hasher.hash(password)})
+
+    async def create(
+        self,
+        session: AsyncSession,
+        obj_in: schemas.UserCreate,
+        excludes: set[str] | None = None,
+        exclude_unset: bool = False,
+        exclude_none: bool = False,
+        commit: bool | None = False,
+    ) -> User:
+        obj_in = await self._hash_password(obj_in)
+        return await super().create(session, obj_in, excludes, exclude_unset, exclude_none, commit)
+
+    async def update(
+        self,
+        session: AsyncSession,
+        db_obj: User,
+        obj_in: schemas.UserUpdate,
+        excludes: set[str] | None = None,
+        commit: bool | None = False,
+    ) -> User:
+        after_commit(session, partial(invalidate_principal, db_obj.id))
+        obj_in = await self._hash_password(obj_in)
+        return await super().update(session, db_obj, obj_in, excludes, commit)
+
+    async def delete(self, session: AsyncSession, db_obj: User, commit: bool | None = False) -> None:
+        after_commit(session, partial(invalidate_principal, db_obj.id))
+        await super().delete(session, db_obj, commit)
+
 
 class PermissionRepo(
     BaseRepository[Permission, schemas.PermissionCreate, schemas.PermissionUpdate, schemas.PermissionQuery]
@@ -34,7 +73,7 @@ class PermissionRepo(
         excludes: set[str] | None = None,
         exclude_unset: bool = False,
         exclude_none: bool = False,
-        commit: bool | None = True,
+        commit: bool | None = False,
     ) -> Permission:
         raise NotImplementedError
 
@@ -44,11 +83,11 @@ class PermissionRepo(
         db_obj: Permission,
         obj_in: schemas.PermissionUpdate,
         excludes: set[str] | None = None,
-        commit: bool | None = True,
+        commit: bool | None = False,
     ) -> Permission:
         raise NotImplementedError
 
-    async def delete(self, session: AsyncSession, db_obj: Permission) -> None:
+    async def delete(self, session: AsyncSession, db_obj: Permission, commit: bool | None = False) -> None:
         raise NotImplementedError
 
 
@@ -71,12 +110,27 @@ class RoleRepo(BaseRepository[Role, schemas.RoleCreate, schemas.RoleUpdate, sche
         excludes: set[str] | None = None,
         exclude_unset: bool = False,
         exclude_none: bool = False,
-        commit: bool | None = True,
+        commit: bool | None = False,
     ) -> Role:
         if obj_in.slug == ReservedRoleSlug.ADMIN:
             raise PermissionDenyError("Admin role can't be created again")
         return await super().create(session, obj_in, excludes, exclude_unset, exclude_none, commit)
 
+    async def update(
+        self,
+        session: AsyncSession,
+        db_obj: Role,
+        obj_in: schemas.RoleUpdate,
+        excludes: set[str] | None = None,
+        commit: bool | None = False,
+    ) -> Role:
+        after_commit(session, partial(invalidate_role, db_obj.id))
+        return await super().update(session, db_obj, obj_in, excludes, commit)
+
+    async def delete(self, session: AsyncSession, db_obj: Role, commit: bool | None = False) -> None:
+        after_commit(session, partial(invalidate_role, db_obj.id))
+        await super().delete(session, db_obj, commit)
+
 
 user_repo = UserRepo(User)
 permission_repo = PermissionRepo(Permission)
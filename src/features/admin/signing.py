@@ -0,0 +1,110 @@
+import base64
+import hashlib
+import json
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from src.core.config import settings
+from src.libs.redis.local_cache import LocalCache
+
+HS_ALGORITHM = "HS256"
+# members of the public jwk hashed into the RFC 7638 thumbprint, used as `kid`
+THUMBPRINT_MEMBERS = {"OKP": ("crv", "kty", "x"), "EC": ("crv", "kty", "x", "y")}
+
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey
+    public_key: ed25519.Ed25519PublicKey | ec.EllipticCurvePublicKey
+    jwk: dict[str, str]
+
+    @classmethod
+    def from_pem(cls, data: bytes) -> "SigningKey":
+        private_key = serialization.load_pem_private_key(data, password=None)
+        public_key = private_key.public_key()
+        if isinstance(private_key, ed25519.Ed25519PrivateKey):
+            algorithm, jwk = "EdDSA", OKPAlgorithm.to_jwk(public_key, as_dict=True)
+        elif isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+            algorithm, jwk = "ES256", ECAlgorithm.to_jwk(public_key, as_dict=True)
+        else:
+            raise TypeError("Only Ed25519 (EdDSA) and P-256 (ES256) keys are supported for jwt signing")
+        thumbprint = json.dumps(
+            {member: jwk[member] for member in THUMBPRINT_MEMBERS[jwk["kty"]]}, separators=(",", ":"), sort_keys=True
+        )
+        kid = base64.urlsafe_b64encode(hashlib.sha256(thumbprint.encode()).digest()).rstrip(b"=").decode()
+        return cls(
+            kid=kid,
+            algorithm=algorithm,
+            private_key=private_key,
+            public_key=public_key,
+            jwk={**jwk, "kid": kid, "alg": algorithm},
+        )
+
+
+class KeyRing:
+    """Keys signing and verifying jwt tokens.
+
+    The first configured key signs new tokens, the others only verify, so that a key is rotated by
+    prepending its successor and dropping it once the tokens it signed expired. Other services verify
+    tokens locally with the public keys published by `jwks`. Without configured keys tokens are signed
+    with `SECRET_KEY` (HS256).
+
+    Verified payloads are cached by token until they expire, repeated requests with the same token skip
+    the signature check.
+    """
+
+    def __init__(self) -> None:
+        self.keys: dict[str, SigningKey] = {}
+        self.active: SigningKey | None = None
+        self._verified: LocalCache[str, dict[str, Any]] = LocalCache(
+            maxsize=settings.JWT_VERIFY_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+
+    def load(self, paths: Iterable[str]) -> None:
+        keys = [SigningKey.from_pem(Path(path).read_bytes()) for path in paths]
+        self.keys = {key.kid: key for key in keys}
+        self.active = keys[0] if keys else None
+        self._verified.clear()
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        if self.active is None:
+            return jwt.encode(payload, key=settings.SECRET_KEY, algorithm=HS_ALGORITHM)
+        return jwt.encode(
+            payload, key=self.active.private_key, algorithm=self.active.algorithm, headers={"kid": self.active.kid}
+        )
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Verify the token signature and return its payload.
+
+        Raises:
+            jwt.InvalidTokenError: malformed token, bad signature or unknown `kid`.
+        """
+        if (payload := self._verified.get(token)) is not None:
+            return payload
+        if self.active is None:
+            payload = jwt.decode(token, key=settings.SECRET_KEY, algorithms=[HS_ALGORITHM])
+        else:
+            key = self.keys.get(jwt.get_unverified_header(token).get("kid", ""))
+            if key is None:
+                raise jwt.InvalidTokenError("Unknown signing key")
+            payload = jwt.decode(token, key=key.public_key, algorithms=[key.algorithm])
+        ttl = payload.get("expires_at", 0) - time.time()
+        if ttl > 0:
+            self._verified.set(token, payload, ttl=ttl)
+        return payload
+
+    def jwks(self) -> dict[str, list[dict[str, str]]]:
+        return {"keys": [{**key.jwk, "use": "sig"} for key in self.keys.values()]}
+
+
+key_ring = KeyRing()
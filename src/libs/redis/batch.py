@@ -0,0 +1,72 @@
+import asyncio
+import contextlib
+from typing import Any
+
+import redis.asyncio as redis
+
+from src.libs.redis.breaker import CircuitBreaker
+
+
+class CommandBatcher:
+    """Coalesce the Redis commands issued in the same event loop tick into one pipeline round trip.
+
+    Every caller gets its own future back, resolved with the reply of its command, so that concurrent
+    lookups (eg: principal and permission checks of concurrent requests) share one round trip.
+    With a `breaker`, every round trip is run through it once, timed from the moment the pipeline is sent,
+    whatever the number of callers waiting on it.
+    """
+
+    def __init__(self, client: redis.Redis, breaker: CircuitBreaker | None = None) -> None:
+        self.client = client
+        self.breaker = breaker
+        self.batches = 0
+        self.commands = 0
+        self._pending: list[tuple[tuple[Any, ...], asyncio.Future[Any]]] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def execute(self, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush)
+        self._pending.append((args, future))
+        return await future
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: list[tuple[tuple[Any, ...], asyncio.Future[Any]]]) -> None:
+        pending = [(args, future) for args, future in pending if not future.done()]
+        if not pending:
+            return
+        self.batches += 1
+        self.commands += len(pending)
+        pipe = self.client.pipeline(transaction=False)
+        for args, _ in pending:
+            pipe.execute_command(*args)
+        guard = self.breaker.guard(deadline=False) if self.breaker else contextlib.nullcontext()
+        try:
+            async with guard:
+                replies = await pipe.execute(raise_on_error=False)
+        except Exception as e:  # noqa: BLE001 the failure is raised to every caller
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), reply in zip(pending, replies, strict=True):
+            if future.done():
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "batches": self.batches,
+            "commands": self.commands,
+            "commands_per_batch": round(self.commands / self.batches, 2) if self.batches else 0.0,
+        }
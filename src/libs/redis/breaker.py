@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import StrEnum
+
+from redis import exceptions
+
+from src.core.utils.deadline import remaining
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(exceptions.ConnectionError):
+    """The node is considered down, the call was rejected without a round trip."""
+
+
+class DeadlineExceededError(exceptions.TimeoutError):
+    """The request deadline expired during the call, the node is not blamed for it."""
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling a failing or slow Redis node, instead of letting every request wait on its timeouts.
+
+    Calls are bounded by `call_timeout` and the request deadline, a call failing or slower than `slow_call`
+    counts as a failure.
+    `failures` consecutive failures open the circuit, calls are then rejected with `CircuitOpenError`
+    until `reset_timeout` elapsed, when one probe call is let through (half open): its success closes
+    the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failures: int, slow_call: float, call_timeout: float, reset_timeout: float) -> None:
+        self.max_failures = failures
+        self.slow_call = slow_call
+        self.call_timeout = call_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self.slow_calls = 0
+        self._probing = False
+
+    def _admit(self) -> bool:
+        """Whether the call is the half open probe, raise if the circuit rejects it."""
+        if self.state is CircuitState.CLOSED:
+            return False
+        if self.state is CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = CircuitState.HALF_OPEN
+        if self.state is CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError
+
+    def _record(self, failed: bool) -> None:
+        if not failed:
+            self.failures = 0
+            self.state = CircuitState.CLOSED
+            return
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN or self.failures >= self.max_failures:
+            if self.state is not CircuitState.OPEN:
+                self.opened += 1
+                logger.warning(f"Redis circuit opened after {self.failures} failed or slow calls")
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def guard(self, deadline: bool = True) -> AsyncIterator[None]:
+        """Run the calls of the block through the circuit, bounded by the request deadline unless `deadline` is false
+        (eg: a batch shared by several requests).
+
+        Raises:
+            CircuitOpenError: the circuit is open.
+            DeadlineExceededError: the request deadline (or another timeout than ours) expired during the block.
+            redis.exceptions.TimeoutError: the block took longer than `call_timeout`.
+        """
+        probe = self._admit()
+        start = time.monotonic()
+        budget = remaining() if deadline else None
+        by_deadline = budget is not None and budget < self.call_timeout
+        try:
+            async with asyncio.timeout(budget if by_deadline else self.call_timeout) as timeout:
+                yield
+        except TimeoutError as e:
+            # a builtin TimeoutError would escape the `except RedisError` fallbacks of callers
+            if by_deadline or not timeout.expired():
+                raise DeadlineExceededError from e
+            self._record(failed=True)
+            raise exceptions.TimeoutError from e
+        except (exceptions.RedisError, OSError):
+            self._record(failed=True)
+            raise
+        else:
+            slow = time.monotonic() - start > self.slow_call
+            self.slow_calls += slow
+            self._record(failed=slow)
+        finally:
+            if probe:
+                self._probing = False
+
+    def stats(self) -> dict[str, str | int]:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "slow_calls": self.slow_calls,
+        }
+
+
+@asynccontextmanager
+async def within_deadline() -> AsyncIterator[None]:
+    """Bound the block by the request deadline only, for calls whose outcome the breaker records elsewhere
+    (eg: commands waiting on a batch).
+
+    Raises:
+        DeadlineExceededError: the request deadline expired during the block.
+    """
+    try:
+        async with asyncio.timeout(remaining()):
+            yield
+    except TimeoutError as e:
+        raise DeadlineExceededError from e
@@ -1,37 +1,64 @@
 import asyncio
+import contextlib
 import json
 import logging
-from collections import OrderedDict
-from collections.abc import Awaitable, Callable, Mapping
-from datetime import datetime
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable, Collection, Iterable, Mapping, Sequence
+from dataclasses import dataclass
 from enum import IntEnum, StrEnum
 from functools import partial, update_wrapper, wraps
-from hashlib import md5
 from inspect import Parameter, Signature, signature
-from typing import Any, NewType, ParamSpec, TypeVar, get_type_hints
-from uuid import UUID
+from typing import Any, ParamSpec, TypeVar
 
 import redis.asyncio as redis
-from fastapi import Request, Response
+from fastapi import Request, Response, status
 from fastapi.concurrency import run_in_threadpool
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
 from httpx import AsyncClient, Client
-from pydantic import BaseModel
 from redis import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from src.core.config import settings
+from src.core.utils.context import locale_ctx
 from src.features.admin.models import User
+from src.features.admin.security import PRINCIPAL_SCOPE_KEY, Principal
+from src.libs.redis.batch import CommandBatcher
+from src.libs.redis.breaker import CircuitBreaker, within_deadline
+from src.libs.redis.hotkeys import HotKeyDetector
+from src.libs.redis.keys import KeyBuilder
+from src.libs.redis.local_cache import LocalCache
+from src.libs.redis.pubsub import INVALIDATE_ALL, invalidation_bus
+from src.libs.redis.ring import HashRing
+from src.libs.redis.serializers import CacheDecodeError, codec
 
 P = ParamSpec("P")
 R = TypeVar("R")
 
 DEFAULT_CACHE_HEADER = "X-Cache"
+CACHE_REQUEST_PARAM = "__cache_request"
+LOCAL_TIER_TOPIC = "local_tier:"
+HOT_KEY_TOPIC = "hot_key"
+# commands whose keys are counted by the hot key detector, and those whose replies are replicated
+COUNTED_COMMANDS = {"GET", "MGET", "HGETALL"}
+REPLICATED_COMMANDS = {"GET", "MGET"}
+CACHE_LOCK_PREFIX = "lock_"
+CACHE_TAG_PREFIX = "tag_"
+ALL_ROWS_TAG = "*"
+CACHE_LOCK_POLL_INTERVAL = 0.05
+CACHE_HIT, CACHE_MISS, CACHE_STALE = "Hit", "Miss", "Stale"
+UNCACHED_RESPONSE_HEADERS = {"content-length", "set-cookie"}
+DEFAULT_SHARD = "default"
 logger = logging.getLogger(__name__)
 
-_T = NewType("_T", BaseModel)
 type ArgType = type[object]
-SigParameters = Mapping[str, Parameter]
-ALWAYS_IGNORE_ARG_TYPES = [Response, Request, Client, AsyncClient, Session, AsyncSession, Redis, User]
+ALWAYS_IGNORE_ARG_TYPES = [Response, Request, Client, AsyncClient, Session, AsyncSession, Redis, User, Principal]
 
 
 class RedisDBType(IntEnum):
@@ -43,6 +70,30 @@ class CacheNamespace(StrEnum):
     API_CACHE = "api_"
     NORMAL_CACHE = "nc_"
     ROLE_CACHE = "role_"
+    PRINCIPAL_CACHE = "principal_"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    status_code: int
+    headers: dict[str, str]
+    body: bytes
+    delta: float  # seconds it took to compute the response
+    expires_at: float  # `time.monotonic()` the entry goes stale at
+
+    @property
+    def ttl(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def response(self) -> Response:
+        return Response(content=self.body, status_code=self.status_code, headers=self.headers)
+
+
+class CacheVary(StrEnum):
+    QUERY = "query"  # raw query string, for endpoints reading `request.query_params` directly
+    LOCALE = "locale"
+    USER = "user"
+    ROLE = "role"
 
 
 class RedisStatus(IntEnum):
@@ -61,38 +112,229 @@ class RedisEvent(IntEnum):
     FAILED_TO_CACHE_KEY = 6
 
 
-def default(obj: Any) -> Any:
-    if isinstance(obj, UUID):
-        return str(obj)
-    if isinstance(obj, datetime):
-        return datetime.strftime(obj, "%Y-%m-%dT%H:%M:%S.%f2")
-    return None
+class ShardPipelines:
+    """One pipeline per node of the ring, commands are queued on the pipeline of the node owning their key."""
+
+    def __init__(self, client: "FastapiCache", transaction: bool = True) -> None:
+        self.client = client
+        self.transaction = transaction
+        self.pipes: dict[str, redis.client.Pipeline] = {}
+
+    def __getitem__(self, key: str) -> redis.client.Pipeline:
+        name = self.client.ring.name_for(key)
+        if (pipe := self.pipes.get(name)) is None:
+            pipe = self.pipes[name] = self.client.ring.nodes[name].pipeline(transaction=self.transaction)
+        return pipe
+
+    async def _execute(self, name: str, pipe: redis.client.Pipeline) -> list[Any]:
+        async with self.client.breaker(name).guard():
+            return await pipe.execute()
+
+    async def execute(self) -> dict[str, list[Any]]:
+        """Replies of the commands queued on every node, by node name."""
+        replies = await asyncio.gather(*(self._execute(name, pipe) for name, pipe in self.pipes.items()))
+        return dict(zip(self.pipes, replies, strict=True))
 
 
 class FastapiCache(redis.Redis):
+    """Client of the `REDIS_DSN` node, which also routes cache entries across the nodes of a hash ring.
+
+    Cache entries, their tags and locks are spread over `shards` (eg: the `REDIS_CACHE_NODES`) by
+    consistent hashing of their key, other data (eg: revoked tokens) stays on this node. Without shards
+    this node is the only node of the ring.
+
+    Calls to every node go through its circuit breaker, while a node is down lookups of its entries
+    are misses (served by the local tier or the database) and writes to it are skipped.
+    """
+
     response_header: str = DEFAULT_CACHE_HEADER
     ignore_arg_types: list[ArgType] = ALWAYS_IGNORE_ARG_TYPES
 
-    async def set_ex(self, name: str, value: Any, expire: int = 1800, namespace: CacheNamespace | None = None) -> Any:
+    def __init__(self, *args: Any, shards: Mapping[str, redis.Redis] | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.ring: HashRing[redis.Redis] = HashRing(shards or {DEFAULT_SHARD: self}, vnodes=settings.REDIS_CACHE_VNODES)
+        self.batchers: dict[str, CommandBatcher] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def node(self, key: str) -> redis.Redis:
+        """Client of the node owning the key."""
+        return self.ring.node_for(key)
+
+    def add_shard(self, name: str, client: redis.Redis) -> None:
+        """Add a node to the ring, only the keys of the arcs it takes over are remapped (and missed once)."""
+        self.ring.add(name, client)
+
+    def remove_shard(self, name: str) -> None:
+        self.ring.remove(name)
+        self.batchers.pop(name, None)
+        self.breakers.pop(name, None)
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        if (breaker := self.breakers.get(name)) is None:
+            breaker = self.breakers[name] = CircuitBreaker(
+                failures=settings.REDIS_BREAKER_FAILURES,
+                slow_call=settings.REDIS_BREAKER_SLOW_CALL,
+                call_timeout=settings.REDIS_CALL_TIMEOUT,
+                reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+            )
+        return breaker
+
+    def guarded(self, key: str) -> contextlib.AbstractAsyncContextManager[None]:
+        """Circuit breaker guard of the node owning the key."""
+        return self.breaker(self.ring.name_for(key)).guard()
+
+    def guarded_primary(self) -> contextlib.AbstractAsyncContextManager[None]:
+        """Circuit breaker guard of this node, for the data which is not sharded (eg: revoked tokens)."""
+        return self.breaker(DEFAULT_SHARD).guard()
+
+    def breaker_stats(self) -> dict[str, dict[str, str | int]]:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    async def set_ex(
+        self,
+        name: str,
+        value: Any,
+        expire: int = 1800,
+        namespace: CacheNamespace | None = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Fill the entry after a miss.
+
+        Copies held by other workers are not invalidated, so that read-through fills do not defeat
+        the local tiers and hot key replicas. Writers drop entries with `delete_cache`/`delete_keys`.
+        """
         key = name
         if namespace:
             key = namespace + name
-        return self.setex(name=key, time=expire, value=json.dumps(value))
+        pipes = ShardPipelines(self)
+        pipes[key].setex(name=key, time=expire, value=codec.dumps(value))
+        _tag_entry(pipes, key, tags, expire)
+        try:
+            await pipes.execute()
+        except redis.RedisError:
+            self.log(RedisEvent.FAILED_TO_CACHE_KEY, name=key)
 
     async def set_nx(self, name: str, value: Any, namespace: CacheNamespace | None = None) -> Any:
         key = name
         if namespace:
             key = namespace + name
-        return await self.setnx(name=key, value=json.dumps(value, default=default))
+        async with self.guarded(key):
+            return await self.node(key).setnx(name=key, value=codec.dumps(value))
+
+    def batcher(self, name: str) -> CommandBatcher:
+        """Batches the commands of concurrent callers to the node issued in the same loop tick."""
+        if (batcher := self.batchers.get(name)) is None:
+            batcher = self.batchers[name] = CommandBatcher(self.ring.nodes[name], self.breaker(name))
+        return batcher
+
+    def batch_stats(self) -> dict[str, int | float]:
+        batches = sum(batcher.batches for batcher in self.batchers.values())
+        commands = sum(batcher.commands for batcher in self.batchers.values())
+        return {
+            "shards": len(self.ring),
+            "batches": batches,
+            "commands": commands,
+            "commands_per_batch": round(commands / batches, 2) if batches else 0.0,
+        }
+
+    async def batched(self, *args: Any) -> Any:
+        """Run a single key read (or `MGET`, split per node) on the node owning its key(s), batched.
+
+        `GET` and `MGET` values of hot keys are served from the worker replica while it holds them.
+        """
+        command, *keys = args
+        if command in COUNTED_COMMANDS:
+            for key in keys:
+                hot_key_detector.record(key)
+        if command in REPLICATED_COMMANDS:
+            values = await self._read_values(keys)
+            return values if command == "MGET" else values[0]
+        return await self._execute_batched(self.ring.name_for(args[1]), *args)
+
+    async def _read_values(self, keys: Sequence[str]) -> list[Any]:
+        values = [hot_replicas.get(key) for key in keys]
+        if not (missing := [i for i, value in enumerate(values) if value is None]):
+            return values
+        version = hot_replicas.version
+        fetched = await self._sharded_mget([keys[i] for i in missing])
+        for i, value in zip(missing, fetched, strict=True):
+            values[i] = value
+            if value is not None and hot_key_detector.is_hot(keys[i]):
+                hot_replicas.set(keys[i], value, version)
+        return values
+
+    async def _execute_batched(self, name: str, *args: Any) -> Any:
+        # the batcher records the outcome of the round trip in the breaker, once for all its callers
+        async with within_deadline():
+            return await self.batcher(name).execute(*args)
+
+    async def _sharded_mget(self, keys: Sequence[str]) -> list[Any]:
+        groups = self.ring.group(keys)
+        replies = await asyncio.gather(
+            *(self._execute_batched(name, "MGET", *(keys[i] for i in positions)) for name, positions in groups.items())
+        )
+        values: list[Any] = [None] * len(keys)
+        for positions, reply in zip(groups.values(), replies, strict=True):
+            for i, value in zip(positions, reply, strict=True):
+                values[i] = value
+        return values
+
+    async def delete_keys(self, *keys: str) -> None:
+        """Delete keys spread over several nodes, with one `DEL` per node, and their copies in every worker."""
+        groups = self.ring.group(keys)
+        await asyncio.gather(*(self._delete(name, [keys[i] for i in positions]) for name, positions in groups.items()))
+
+    async def _delete(self, name: str, keys: list[str]) -> None:
+        async with self.breaker(name).guard():
+            await self.ring.nodes[name].delete(*keys)
+        await invalidate_local_copies(keys)
 
     async def get_cache(self, name: str, namespace: CacheNamespace | None = None) -> Any:
+        return (await self.get_many([name], namespace))[0]
+
+    async def get_many(self, names: Sequence[str], namespace: CacheNamespace | None = None) -> list[Any]:
+        """Values of several entries in one `MGET` at most, `None` for missing entries."""
+        keys = [namespace + name if namespace else name for name in names]
+        results: list[Any] = [None] * len(keys)
+        tier = local_tiers.get(namespace)
+        missing: list[int] = []
+        for i, key in enumerate(keys):
+            if tier is not None and (result := tier.get(key)) is not None:
+                cache_stats.record(namespace, CacheOutcome.LOCAL_HIT)
+                results[i] = codec.loads(result)
+            else:
+                missing.append(i)
+        if not missing:
+            return results
+        version = tier.version if tier is not None else None
+        try:
+            values = await self.batched("MGET", *(keys[i] for i in missing))
+        except redis.RedisError:
+            cache_stats.record(namespace, CacheOutcome.UNAVAILABLE, len(missing))
+            return results
+        for i, value in zip(missing, values, strict=True):
+            if not value:
+                cache_stats.record(namespace, CacheOutcome.MISS)
+                continue
+            try:
+                results[i] = codec.loads(value)
+            except CacheDecodeError as e:
+                logger.warning(f"Failed to decode cached value, treated as a miss: key={keys[i]}, error={e}")
+                cache_stats.record(namespace, CacheOutcome.MISS)
+                continue
+            cache_stats.record(namespace, CacheOutcome.REMOTE_HIT)
+            if tier is not None:
+                tier.set(keys[i], value, version)
+        return results
+
+    async def delete_cache(self, name: str, namespace: CacheNamespace | None = None) -> None:
+        """Delete the entry from Redis and from the local tier of every worker."""
         key = name
         if namespace:
             key = namespace + name
-        result = await self.get(name=key)
-        if result:
-            return json.loads(result)
-        return None
+        async with self.guarded(key):
+            await self.node(key).delete(key)
+        await invalidate_local_copies([key])
 
     def log(self, event: RedisEvent, msg: str | None = None, name: str | None = None, value: Any = None) -> None:
         message = f"| {event.name}"
@@ -111,52 +353,136 @@ class FastapiCache(redis.Redis):
             for directive in ["no-store", "no-cache", "must-revalidate"]
         )
 
-    async def add_to_cache(self, name: str, value: dict | _T, expire: int) -> bool:
-        response_data = None
+    async def add_to_cache(
+        self, name: str, response: Response, expire: int, delta: float = 0.0, tags: Iterable[str] = ()
+    ) -> bool:
+        """Store the encoded body, status and headers of a response, so that a hit is returned as is.
+
+        The entry is kept `CACHE_STALE_TTL` seconds past `expire`, to serve it while it is recomputed.
+        Like `set_ex` it is a fill, copies held by other workers are left to expire with their tier.
+        """
+        headers = {k: v for k, v in response.headers.items() if k not in UNCACHED_RESPONSE_HEADERS}
+        key = CacheNamespace.API_CACHE + name
+        stale = settings.CACHE_STALE_TTL
+        pipes = ShardPipelines(self)
+        (
+            pipes[key]
+            .hset(
+                key,
+                mapping={
+                    "status": response.status_code,
+                    "headers": json.dumps(headers),
+                    "body": response.body,
+                    "delta": delta,
+                    "stale": stale,
+                },
+            )
+            .expire(key, expire + stale)
+        )
+        _tag_entry(pipes, key, tags, expire + stale)
         try:
-            response_data = value.model_dump() if isinstance(value, BaseModel) else value
-        except TypeError:
-            message = f"Object of type {type(value)} is not JSON-serializable"
-            self.log(RedisEvent.FAILED_TO_CACHE_KEY, msg=message, name=name, value=value)
+            await pipes.execute()
+        except redis.RedisError:
+            self.log(RedisEvent.FAILED_TO_CACHE_KEY, name=name)
             return False
-        cached = await self.set_ex(name, response_data, expire, namespace=CacheNamespace.API_CACHE)
-        if cached:
-            self.log(event=RedisEvent.KEY_ADDED_TO_CACHE, name=name)
-        else:
-            self.log(event=RedisEvent.FAILED_TO_CACHE_KEY, name=name, value=value)
-        return cached
-
-    async def check_cache(self, name: str) -> tuple[int, str]:
-        pipe = self.pipeline()
-        pipe.ttl(CacheNamespace.API_CACHE + name).get(CacheNamespace.API_CACHE + name)
-        ttl, in_cache = await pipe.execute()
-        return ttl, json.loads(in_cache) if in_cache else None
-
-    def set_response_headers(self, response: Response, cache_hit: bool, ttl: int | None = None) -> None:
-        response.headers[self.response_header] = "Hit" if cache_hit else "Miss"
+        self.log(event=RedisEvent.KEY_ADDED_TO_CACHE, name=name)
+        return True
+
+    async def check_cache(self, name: str) -> CachedResponse | None:
+        """Cached response including stale entries, `CachedResponse.ttl` is negative once it went stale."""
+        key = CacheNamespace.API_CACHE + name
+        tier = local_tiers.get(CacheNamespace.API_CACHE)
+        if tier is not None and (entry := tier.get(key)) is not None:
+            cache_stats.record(CacheNamespace.API_CACHE, CacheOutcome.LOCAL_HIT)
+            return entry
+        version = tier.version if tier is not None else None
+        try:
+            pttl, in_cache = await asyncio.gather(self.batched("PTTL", key), self.batched("HGETALL", key))
+        except redis.RedisError:
+            cache_stats.record(CacheNamespace.API_CACHE, CacheOutcome.UNAVAILABLE)
+            return None
+        if not in_cache or pttl <= 0:
+            cache_stats.record(CacheNamespace.API_CACHE, CacheOutcome.MISS)
+            return None
+        cache_stats.record(CacheNamespace.API_CACHE, CacheOutcome.REMOTE_HIT)
+        entry = CachedResponse(
+            status_code=int(in_cache[b"status"]),
+            headers=json.loads(in_cache[b"headers"]),
+            body=in_cache[b"body"],
+            delta=float(in_cache.get(b"delta", 0)),
+            expires_at=time.monotonic() + pttl / 1000 - float(in_cache.get(b"stale", 0)),
+        )
+        if tier is not None:
+            tier.set(key, entry, version, ttl=min(pttl / 1000, tier.ttl))
+        return entry
+
+    def set_response_headers(
+        self, response: Response, cache_hit: bool, ttl: int | None = None, stale: bool = False
+    ) -> None:
+        response.headers[self.response_header] = CACHE_STALE if stale else CACHE_HIT if cache_hit else CACHE_MISS
         response.headers[self.response_header + "-TTL"] = f"max-age-{ttl}"
 
 
 redis_client: FastapiCache = None
 
 
-def _get_cache_key(func: Callable, *args: Any, **kwargs: Any) -> str:
-    sig = signature(func)
-    type_hints = get_type_hints(func)
-    func_args = _get_func_args(sig, *args, **kwargs)
-    args_str = ""
-    for arg, arg_value in func_args.items():
-        if arg in type_hints:
-            arg_type = type_hints[arg]
-            if arg_type not in ALWAYS_IGNORE_ARG_TYPES:
-                args_str += f"{arg}={arg_value}"
-    return md5(f"{func.__module__}.{func.__name__}({args_str})".encode()).hexdigest()  # noqa: S324
+class CacheOutcome(StrEnum):
+    LOCAL_HIT = "local_hit"
+    REMOTE_HIT = "remote_hit"
+    MISS = "miss"
+    # Redis was down or its circuit open, the lookup fell back to the source
+    UNAVAILABLE = "unavailable"
+
 
+class CacheStats:
+    """Per worker lookup outcomes by namespace, to tune the local tier policies."""
 
-def _get_func_args(sig: Signature, *args: Any, **kwargs: Any) -> OrderedDict[str, Any]:
-    func_args = sig.bind(*args, **kwargs)
-    func_args.apply_defaults()
-    return func_args.arguments
+    def __init__(self) -> None:
+        self.counts: defaultdict[str, Counter[CacheOutcome]] = defaultdict(Counter)
+
+    def record(self, namespace: CacheNamespace | None, outcome: CacheOutcome, count: int = 1) -> None:
+        self.counts[namespace or ""][outcome] += count
+
+    def dict(self) -> dict[str, dict[str, int]]:
+        stats: dict[str, dict[str, int]] = {}
+        for namespace, counts in self.counts.items():
+            stats[namespace] = {outcome.value: counts[outcome] for outcome in CacheOutcome}
+            if (tier := local_tiers.get(namespace)) is not None:
+                stats[namespace]["local_size"] = len(tier)
+        return stats
+
+
+cache_stats = CacheStats()
+
+# in-process tier in front of Redis for the namespaces configured in `CACHE_LOCAL_TIERS`,
+# kept coherent across workers through the invalidation bus.
+local_tiers: dict[CacheNamespace, LocalCache[str, Any]] = {
+    CacheNamespace(namespace): LocalCache(maxsize=maxsize, ttl=ttl)
+    for namespace, (maxsize, ttl) in settings.CACHE_LOCAL_TIERS.items()
+}
+
+
+def _invalidate_local_tier(tier: LocalCache[str, Any], key: str) -> None:
+    if key == INVALIDATE_ALL:
+        tier.clear()
+    else:
+        tier.invalidate(key)
+
+
+for _namespace, _tier in local_tiers.items():
+    invalidation_bus.subscribe(LOCAL_TIER_TOPIC + _namespace, partial(_invalidate_local_tier, _tier))
+
+hot_key_detector = HotKeyDetector(
+    sample_rate=settings.HOT_KEY_SAMPLE_RATE,
+    top_k=settings.HOT_KEY_TOP_K,
+    min_hits=settings.HOT_KEY_MIN_HITS,
+    window=settings.HOT_KEY_WINDOW,
+    width=settings.HOT_KEY_SKETCH_WIDTH,
+    depth=settings.HOT_KEY_SKETCH_DEPTH,
+)
+# short lived worker copies of the values of hot keys, so that one key does not saturate its node
+hot_replicas: LocalCache[str, Any] = LocalCache(maxsize=settings.HOT_KEY_TOP_K, ttl=settings.HOT_KEY_LOCAL_TTL)
+invalidation_bus.subscribe(HOT_KEY_TOPIC, partial(_invalidate_local_tier, hot_replicas))
 
 
 async def _get_api_response_async(
@@ -169,30 +495,276 @@ async def _get_api_response_async(
     )
 
 
-def cache(*, expire: int = 600):  # noqa: ANN201
-    def outer(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R, Response]]:
+async def _encode_response(request: Request, result: Any) -> Response:
+    """Validate and serialize an endpoint result the way FastAPI does for the matched route."""
+    if isinstance(result, Response):
+        return result
+    route = request.scope.get("route")
+    if not isinstance(route, APIRoute):
+        return JSONResponse(content=jsonable_encoder(result))
+    content = await serialize_response(
+        field=route.response_field,
+        response_content=result,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    return response_class(content=content, status_code=route.status_code or status.HTTP_200_OK)
+
+
+def _vary_key(request: Request, vary: tuple[CacheVary, ...]) -> str:
+    principal: Principal | None = request.scope.get(PRINCIPAL_SCOPE_KEY)
+    parts = []
+    for item in vary:
+        match item:
+            case CacheVary.QUERY:
+                parts.append(str(sorted(request.query_params.multi_items())))
+            case CacheVary.LOCALE:
+                parts.append(locale_ctx.get())
+            case CacheVary.USER:
+                parts.append(str(principal.id if principal else None))
+            case CacheVary.ROLE:
+                parts.append(str(principal.role_id if principal else None))
+    return "|".join(parts)
+
+
+def _with_request_param(sig: Signature) -> tuple[Signature, str, bool]:
+    """Name of the `Request` parameter of the endpoint, added to its signature if it has none."""
+    for parameter in sig.parameters.values():
+        if parameter.annotation is Request:
+            return sig, parameter.name, False
+    parameter = Parameter(CACHE_REQUEST_PARAM, Parameter.KEYWORD_ONLY, annotation=Request)
+    parameters = list(sig.parameters.values())
+    position = next((i for i, p in enumerate(parameters) if p.kind is Parameter.VAR_KEYWORD), len(parameters))
+    parameters.insert(position, parameter)
+    return sig.replace(parameters=parameters), CACHE_REQUEST_PARAM, True
+
+
+_inflight: dict[str, asyncio.Future[CachedResponse]] = {}
+
+
+def entity_tags(table: str, *ids: Any) -> set[str]:
+    """Tags of rows of `table`, `<table>:<id>` for entries of one row and `<table>:*` for entries of any row
+    (eg: lists), a write of a row invalidates both.
+    """
+    return {f"{table}:{ALL_ROWS_TAG}", *(f"{table}:{pk}" for pk in ids if pk is not None)}
+
+
+def _tag_entry(pipes: ShardPipelines, key: str, tags: Iterable[str], ttl: int) -> None:
+    """Add the entry key to the sets of its tags, kept at least as long as the entry."""
+    for tag in tags:
+        tag_key = CACHE_TAG_PREFIX + tag
+        pipes[tag_key].sadd(tag_key, key).expire(tag_key, ttl, nx=True).expire(tag_key, ttl, gt=True)
+
+
+async def invalidate_tags(tags: Iterable[str]) -> None:
+    """Delete every cache entry tagged with one of `tags`, in Redis and in the local tier of every worker."""
+    tag_keys = [CACHE_TAG_PREFIX + tag for tag in tags]
+    if not tag_keys:
+        return
+    try:
+        pipes = ShardPipelines(redis_client)
+        for tag_key in tag_keys:
+            pipes[tag_key].smembers(tag_key).delete(tag_key)
+        replies = await pipes.execute()
+        # replies alternate the members of a tag and the count of deleted tag sets
+        keys = {key.decode() for node_replies in replies.values() for members in node_replies[::2] for key in members}
+        if keys:
+            await redis_client.delete_keys(*keys)
+    except redis.RedisError:
+        logger.exception(f"Failed to invalidate cache tags: {tag_keys}")
+
+
+async def invalidate_entities(table: str, pk_ids: Iterable[Any]) -> None:
+    """Repository write hook, invalidate the entries tagged with the rows written to `table`."""
+    await invalidate_tags(entity_tags(table, *pk_ids))
+
+
+async def invalidate_local_copies(keys: Iterable[str]) -> None:
+    """Drop the keys from the local tier or the hot key replica of every worker."""
+    for key in keys:
+        if namespace := next((ns for ns in local_tiers if key.startswith(ns)), None):
+            await invalidation_bus.publish(LOCAL_TIER_TOPIC + namespace, key)
+        else:
+            await invalidation_bus.publish(HOT_KEY_TOPIC, key)
+
+
+def _cached_response(entry: CachedResponse) -> Response:
+    response = entry.response()
+    ttl = entry.ttl
+    redis_client.set_response_headers(response, cache_hit=True, ttl=max(int(ttl), 0), stale=ttl <= 0)
+    return response
+
+
+def _should_refresh_early(entry: CachedResponse, beta: float) -> bool:
+    """XFetch: recompute a fresh entry ahead of expiry with a probability growing as it gets closer,
+    weighted by how long it takes to compute, so that a single request refreshes it before it expires.
+    """
+    return beta > 0 and entry.delta * beta * -math.log(1.0 - random.random()) >= entry.ttl  # noqa: S311
+
+
+async def _wait_for_other_worker(key: str) -> CachedResponse | None:
+    waited = 0.0
+    while waited < settings.CACHE_LOCK_TIMEOUT:
+        await asyncio.sleep(CACHE_LOCK_POLL_INTERVAL)
+        waited += CACHE_LOCK_POLL_INTERVAL
+        if (entry := await redis_client.check_cache(key)) is not None and entry.ttl > 0:
+            return entry
+    return None
+
+
+async def _recompute(
+    key: str,
+    request: Request,
+    expire: int,
+    tags: Collection[str],
+    func: Callable[..., Awaitable[Any]],
+    *args: Any,
+    **kwargs: Any,
+) -> tuple[Response, CachedResponse]:
+    start = time.perf_counter()
+    response = await _encode_response(request, await _get_api_response_async(func, *args, **kwargs))
+    delta = time.perf_counter() - start
+    if response.status_code == status.HTTP_200_OK and hasattr(response, "body"):
+        await redis_client.add_to_cache(key, response, expire, delta, tags)
+    entry = CachedResponse(
+        status_code=response.status_code,
+        headers={k: v for k, v in response.headers.items() if k not in UNCACHED_RESPONSE_HEADERS},
+        body=getattr(response, "body", b""),
+        delta=delta,
+        expires_at=time.monotonic() + expire,
+    )
+    redis_client.set_response_headers(response, cache_hit=False, ttl=expire)
+    return response, entry
+
+
+async def _recompute_unless_locked(
+    key: str,
+    entry: CachedResponse | None,
+    request: Request,
+    expire: int,
+    tags: Collection[str],
+    func: Callable[..., Awaitable[Any]],
+    *args: Any,
+    **kwargs: Any,
+) -> tuple[Response, CachedResponse]:
+    """Recompute the entry, unless a request of another worker holds its lock: serve its result then."""
+    lock_key = CACHE_LOCK_PREFIX + key
+    lock = redis_client.node(lock_key).lock(lock_key, timeout=settings.CACHE_LOCK_TIMEOUT, blocking=False)
+    try:
+        async with redis_client.guarded(lock_key):
+            acquired = await lock.acquire()
+    except redis.RedisError:
+        # Redis is down, recompute without coordinating with other workers
+        acquired = None
+    if acquired is False:
+        if entry is not None:
+            return _cached_response(entry), entry
+        if (other := await _wait_for_other_worker(key)) is not None:
+            return _cached_response(other), other
+    try:
+        return await _recompute(key, request, expire, tags, func, *args, **kwargs)
+    finally:
+        if acquired:
+            with contextlib.suppress(redis.RedisError):
+                async with redis_client.guarded(lock_key):
+                    await lock.release()
+
+
+async def _refill(
+    key: str,
+    entry: CachedResponse | None,
+    request: Request,
+    expire: int,
+    tags: Collection[str],
+    func: Callable[..., Awaitable[Any]],
+    *args: Any,
+    **kwargs: Any,
+) -> Response:
+    """Recompute a missing, stale or early refreshed entry, unless another request of any worker already does.
+
+    The in-flight future is registered before any await, so that concurrent requests of the worker wait
+    for it instead of polling Redis, and only its owner removes it.
+    """
+    if (future := _inflight.get(key)) is not None:
+        if entry is not None:
+            return _cached_response(entry)
+        await asyncio.wait([future])
+        if not future.cancelled():
+            # raises the error of the recomputing request, eg: a 404
+            return _cached_response(future.result())
+    future = asyncio.get_running_loop().create_future()
+    # waiters retrieve the exception, this only silences "exception was never retrieved" without waiters
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    try:
+        response, result = await _recompute_unless_locked(key, entry, request, expire, tags, func, *args, **kwargs)
+    except asyncio.CancelledError:
+        # waiters recompute themselves
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    return response
+
+
+def cache(  # noqa: ANN201
+    *,
+    expire: int = 600,
+    vary: Iterable[CacheVary] = (),
+    tags: Iterable[str] | Callable[..., Iterable[str]] = (),
+    early_refresh_beta: float = 1.0,
+):
+    """Cache the encoded response of a GET endpoint in Redis.
+
+    A hit returns the stored body and headers as a `Response`, skipping the endpoint, response model
+    validation and serialization. Entries vary by the endpoint arguments, and by `vary`, eg: `CacheVary.USER`
+    for endpoints whose result depends on the authenticated user, which requires the `auth` dependency.
+
+    Only one request per key recomputes an expired entry: concurrent requests of the worker wait for it,
+    other workers skip recomputing while it holds a short Redis lock. While an entry is recomputed, the other
+    requests are served its stale copy (`X-Cache: Stale`) if one is still kept.
+
+    Args:
+        expire (int, optional): entry ttl in seconds.
+        vary (Iterable[CacheVary], optional): request attributes the entry additionally varies by.
+        tags (Iterable[str] | Callable[..., Iterable[str]], optional): tags of the entry, or a callable returning
+            them from the endpoint keyword arguments, eg: `lambda id, **_: entity_tags("user", id)`. Writes through
+            `BaseRepository` invalidate the tags of the rows they change, see `entity_tags`.
+        early_refresh_beta (float, optional): XFetch beta, > 1 favors earlier recomputation, 0 disables it.
+    """
+    vary = tuple(vary)
+    static_tags = None if callable(tags) else frozenset(tags)
+
+    def outer(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R | Response]]:
+        sig, request_param, injected = _with_request_param(signature(func))
+        build_key = KeyBuilder(func, ALWAYS_IGNORE_ARG_TYPES)
+
         @wraps(func)
         async def inner(*args: P.args, **kwargs: P.kwargs) -> R | Response:
-            copy_kwargs = kwargs.copy()
-            request: Request | None = copy_kwargs.pop("request", None)
-            response: Response | None = copy_kwargs.pop("respinse", None)
-            create_response_directly = not response
-            if create_response_directly:
-                response = Response()
+            request: Request = kwargs.pop(request_param) if injected else kwargs[request_param]
             if redis_client.request_is_not_cacheable(request):
-                result = await _get_api_response_async(func, *args, **kwargs)
-            key = _get_cache_key(func, *args, **kwargs)
-            ttl, in_cache = await redis_client.check_cache(key)
-            if in_cache:
-                redis_client.set_response_headers(response, True, ttl)
-                result = in_cache
-            else:
-                result = await _get_api_response_async(func, *args, **kwargs)
-                cached = await redis_client.add_to_cache(key, result, expire)
-                if cached:
-                    redis_client.set_response_headers(response, cache_hit=False, ttl=ttl)
-            return result
-
+                return await _get_api_response_async(func, *args, **kwargs)
+            key = build_key(args, kwargs, _vary_key(request, vary) if vary else "")
+            entry = await redis_client.check_cache(key)
+            if entry is not None and entry.ttl > 0 and not _should_refresh_early(entry, early_refresh_beta):
+                return _cached_response(entry)
+            entry_tags = static_tags if static_tags is not None else frozenset(tags(**kwargs))
+            return await _refill(key, entry, request, expire, entry_tags, func, *args, **kwargs)
+
+        inner.__signature__ = sig
         return inner
 
     return outer
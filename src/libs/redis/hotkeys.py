@@ -0,0 +1,83 @@
+import random
+import time
+from array import array
+from hashlib import blake2b
+
+
+class CountMinSketch:
+    """Approximate per key counts in fixed memory, estimates only ever overcount."""
+
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _columns(self, key: str) -> list[int]:
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8]), int.from_bytes(digest[8:]) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count the key, return its new estimate."""
+        columns = self._columns(key)
+        for row, column in zip(self._rows, columns, strict=True):
+            row[column] += 1
+        return min(row[column] for row, column in zip(self._rows, columns, strict=True))
+
+    def estimate(self, key: str) -> int:
+        return min(row[column] for row, column in zip(self._rows, self._columns(key), strict=True))
+
+
+class HotKeyDetector:
+    """Sampled detection of the most read keys over a sliding window.
+
+    One read in `1 / sample_rate` is counted in a count-min sketch, the `top_k` keys with the highest
+    estimates are tracked, those estimated at `min_hits` reads or more per window are hot. The window
+    slides by halves: counts of the previous half are kept and dropped one half later.
+    """
+
+    def __init__(self, sample_rate: float, top_k: int, min_hits: int, window: float, width: int, depth: int) -> None:
+        self.sample_rate = sample_rate
+        self.top_k = top_k
+        self.min_samples = max(1, round(min_hits * sample_rate))
+        self.window = window
+        self.width = width
+        self.depth = depth
+        self._current = CountMinSketch(width, depth)
+        self._previous = CountMinSketch(width, depth)
+        self._rotated_at = time.monotonic()
+        self._top: dict[str, int] = {}
+
+    def _rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated_at < self.window / 2:
+            return
+        stale = now - self._rotated_at >= self.window
+        self._previous = CountMinSketch(self.width, self.depth) if stale else self._current
+        self._current = CountMinSketch(self.width, self.depth)
+        self._rotated_at = now
+        self._top = {key: count for key in self._top if (count := self._previous.estimate(key))}
+
+    def record(self, key: str) -> None:
+        if random.random() >= self.sample_rate:  # noqa: S311
+            return
+        self._rotate()
+        count = self._current.add(key) + self._previous.estimate(key)
+        if key in self._top or len(self._top) < self.top_k:
+            self._top[key] = count
+            return
+        coldest = min(self._top, key=self._top.__getitem__)
+        if count > self._top[coldest]:
+            del self._top[coldest]
+            self._top[key] = count
+
+    def is_hot(self, key: str) -> bool:
+        return self._top.get(key, 0) >= self.min_samples
+
+    def hot_keys(self) -> list[tuple[str, int]]:
+        """Hot keys with their estimated reads per window, hottest first."""
+        self._rotate()
+        hot = sorted(
+            ((key, count) for key, count in self._top.items() if count >= self.min_samples), key=lambda x: -x[1]
+        )
+        return [(key, round(count / self.sample_rate)) for key, count in hot]
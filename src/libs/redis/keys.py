@@ -0,0 +1,118 @@
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, time
+from enum import Enum
+from hashlib import blake2b
+from inspect import Parameter, signature
+from typing import Any, get_type_hints
+from uuid import UUID
+
+from pydantic import BaseModel
+
+type KeyEncoder = Callable[[Any], bytes]
+
+NUMBER_TAGS: dict[type, bytes] = {bool: b"b", int: b"i", float: b"f"}
+
+
+def _frame(tag: bytes, data: bytes) -> bytes:
+    """Type tag and length prefixed bytes, so that no two distinct values (or sequences of them) frame equally."""
+    return tag + str(len(data)).encode() + b":" + data
+
+
+def _encode_scalar(value: Any) -> bytes:
+    match value:
+        case None:
+            return _frame(b"n", b"")
+        case Enum():
+            return encode_value(value.value)
+        case UUID():
+            return _frame(b"u", value.bytes)
+        case datetime() | date() | time():
+            return _frame(b"t", value.isoformat().encode())
+        case BaseModel():
+            return _frame(b"m", value.model_dump_json().encode())
+        case _:
+            return _frame(b"o", str(value).encode())
+
+
+def encode_value(value: Any) -> bytes:
+    """Canonical bytes of an argument value, equal values encode equally regardless of their `__str__`.
+
+    Every value is framed with its type and length, `1` and `"1"` or `["a,b"]` and `["a", "b"]` differ.
+    """
+    if type(value) is str:
+        return _frame(b"s", value.encode())
+    if (tag := NUMBER_TAGS.get(type(value))) is not None:
+        return _frame(tag, repr(value).encode())
+    if isinstance(value, list | tuple):
+        return _frame(b"l", b"".join(encode_value(v) for v in value))
+    if isinstance(value, set | frozenset):
+        return _frame(b"S", b"".join(sorted(encode_value(v) for v in value)))
+    if isinstance(value, dict):
+        return _frame(b"d", b"".join(sorted(encode_value(k) + encode_value(v) for k, v in value.items())))
+    return _encode_scalar(value)
+
+
+def _encode_model(value: Any) -> bytes:
+    return _frame(b"m", value.model_dump_json().encode()) if isinstance(value, BaseModel) else encode_value(value)
+
+
+def _encode_str(value: Any) -> bytes:
+    return _frame(b"s", value.encode()) if isinstance(value, str) else encode_value(value)
+
+
+def _encode_int(value: Any) -> bytes:
+    return _frame(b"i", repr(value).encode()) if type(value) is int else encode_value(value)
+
+
+def _encode_uuid(value: Any) -> bytes:
+    return _frame(b"u", value.bytes) if isinstance(value, UUID) else encode_value(value)
+
+
+ENCODERS: dict[type, KeyEncoder] = {str: _encode_str, int: _encode_int, UUID: _encode_uuid}
+
+
+def _encoder_for(annotation: Any) -> KeyEncoder:
+    """Encoder of the declared argument type, falling back to `encode_value` for other values."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _encode_model
+    return ENCODERS.get(annotation, encode_value)
+
+
+def _is_ignored(annotation: Any, ignore_types: tuple[type, ...]) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, ignore_types)
+
+
+class KeyBuilder:
+    """Cache key of a function call, with the argument lookups and encoders resolved once at decoration time.
+
+    Only typed arguments which are not of `ignore_types` (eg: sessions, requests) take part in the key.
+    """
+
+    def __init__(self, func: Callable[..., Any], ignore_types: Iterable[type]) -> None:
+        ignored = tuple(ignore_types)
+        hints = get_type_hints(func)
+        self.prefix = f"{func.__module__}.{func.__qualname__}".encode()
+        self.params: list[tuple[str, int | None, Any, KeyEncoder]] = []
+        for position, parameter in enumerate(signature(func).parameters.values()):
+            if parameter.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
+            annotation = hints.get(parameter.name)
+            if annotation is None or _is_ignored(annotation, ignored):
+                continue
+            positional = position if parameter.kind is not Parameter.KEYWORD_ONLY else None
+            default = None if parameter.default is Parameter.empty else parameter.default
+            self.params.append((parameter.name, positional, default, _encoder_for(annotation)))
+
+    def __call__(self, args: tuple[Any, ...], kwargs: dict[str, Any], extra: str = "") -> str:
+        digest = blake2b(self.prefix, digest_size=16)
+        for name, position, default, encoder in self.params:
+            if name in kwargs:
+                value = kwargs[name]
+            elif position is not None and position < len(args):
+                value = args[position]
+            else:
+                value = default
+            digest.update(_frame(b"p", name.encode()) + encoder(value))
+        if extra:
+            digest.update(_frame(b"x", extra.encode()))
+        return digest.hexdigest()
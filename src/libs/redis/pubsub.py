@@ -0,0 +1,105 @@
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+INVALIDATE_ALL = "*"
+
+type InvalidationHandler = Callable[[str], None]
+
+
+class InvalidationBus:
+    """Fan out cache invalidations to every worker on every node through Redis pub/sub.
+
+    Handlers are plain callables keyed by topic, `publish` runs the local handlers right away and
+    the other workers run theirs when the message arrives on `INVALIDATION_CHANNEL`. Messages are
+    published through the client passed to `listening`, before that invalidations stay local.
+    """
+
+    def __init__(self) -> None:
+        self.origin = uuid.uuid4().hex
+        self.handlers: defaultdict[str, list[InvalidationHandler]] = defaultdict(list)
+        self.client: redis.Redis | None = None
+        self.subscribed = False
+
+    @property
+    def degraded(self) -> bool:
+        """Whether invalidations published by other workers may currently be lost."""
+        return self.client is not None and not self.subscribed
+
+    def _drop_all(self) -> None:
+        for topic in list(self.handlers):
+            self.dispatch(topic, INVALIDATE_ALL)
+
+    def subscribe(self, topic: str, handler: InvalidationHandler) -> None:
+        self.handlers[topic].append(handler)
+
+    def dispatch(self, topic: str, key: str) -> None:
+        for handler in self.handlers.get(topic, []):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception(f"Cache invalidation handler failed: topic={topic}, key={key}")
+
+    async def publish(self, topic: str, key: str = INVALIDATE_ALL) -> None:
+        self.dispatch(topic, key)
+        if self.client is None:
+            return
+        message = json.dumps({"origin": self.origin, "topic": topic, "key": key})
+        try:
+            await self.client.publish(INVALIDATION_CHANNEL, message)
+        except redis.RedisError:
+            logger.exception(f"Failed to publish cache invalidation: topic={topic}, key={key}")
+
+    async def listen(self, client: redis.Redis, resubscribed: bool = False) -> None:
+        async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            self.subscribed = True
+            if resubscribed:
+                # invalidations published while we were disconnected are lost, drop everything instead.
+                self._drop_all()
+            async for message in pubsub.listen():
+                try:
+                    data = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if data.get("origin") != self.origin:
+                    self.dispatch(data["topic"], data["key"])
+
+    async def _listen_forever(self, client: redis.Redis) -> None:
+        resubscribed = False
+        while True:
+            try:
+                await self.listen(client, resubscribed)
+            except redis.RedisError:
+                logger.exception("Cache invalidation subscriber disconnected, resubscribing")
+                if self.subscribed:
+                    # local copies would miss the invalidations of other workers until we resubscribe
+                    self.subscribed = False
+                    self._drop_all()
+                await asyncio.sleep(1)
+            resubscribed = True
+
+    @contextlib.asynccontextmanager
+    async def listening(self, client: redis.Redis) -> AsyncIterator[None]:
+        """Receive invalidations from other workers for the lifetime of the context."""
+        self.client = client
+        task = asyncio.create_task(self._listen_forever(client))
+        try:
+            yield
+        finally:
+            self.client = None
+            self.subscribed = False
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+invalidation_bus = InvalidationBus()
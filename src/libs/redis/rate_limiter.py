@@ -0,0 +1,179 @@
+import math
+import time
+from dataclasses import dataclass, field
+
+import jwt
+import redis.asyncio as redis
+from fastapi import status
+from fastapi.responses import JSONResponse
+from redis.commands.core import AsyncScript
+from starlette.routing import Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+from src.core.errors import base_exceptions
+from src.core.utils.i18n import _
+from src.features.admin.cache import revoked_tokens
+from src.features.admin.signing import key_ring
+from src.libs.redis import cache
+from src.libs.redis.local_cache import LocalCache
+
+RATE_LIMIT_PREFIX = "ratelimit_"
+UNMATCHED_ROUTE = "unmatched"
+
+# Generic cell rate algorithm: the key holds the theoretical arrival time (TAT) of the next request,
+# a request is allowed while it is at most `burst` emission intervals ahead of now.
+# KEYS[1]: bucket, ARGV[1]: emission interval (ms), ARGV[2]: burst (requests)
+# returns {allowed, remaining, retry after (ms), reset after (ms)}
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = interval * tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = time[1] * 1000 + time[2] / 1000
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local new_tat = tat + interval
+if new_tat - now > tolerance then
+    return {0, 0, math.ceil(new_tat - now - tolerance), math.ceil(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {1, math.floor((tolerance - (new_tat - now)) / interval), 0, math.ceil(new_tat - now)}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    limit: int
+    allowed: bool
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        """`RateLimit-*` headers of the IETF draft, with `Retry-After` on rejected requests."""
+        headers = [
+            (b"ratelimit-limit", str(self.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(self.reset_after)).encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(math.ceil(self.retry_after)).encode()))
+        return headers
+
+
+class RateLimiter:
+    """GCRA rate limiter, one atomic script call (one round trip) per request on the node owning the bucket.
+
+    `limit` requests are allowed per `period` seconds, evenly refilled, with bursts of up to `limit`.
+    The clock is the one of Redis, so that every worker agrees on it.
+    """
+
+    def __init__(self) -> None:
+        self._script: AsyncScript | None = None
+
+    def _registered(self) -> AsyncScript:
+        if self._script is None or self._script.registered_client is not cache.redis_client:
+            self._script = cache.redis_client.register_script(GCRA_SCRIPT)
+        return self._script
+
+    async def hit(self, key: str, limit: int, period: float) -> RateLimit | None:
+        """Count a request in the bucket, `None` while Redis is unavailable (requests are then allowed)."""
+        key = RATE_LIMIT_PREFIX + key
+        try:
+            async with cache.redis_client.guarded(key):
+                allowed, remaining, retry_after, reset_after = await self._registered()(
+                    keys=[key], args=[period * 1000 / limit, limit], client=cache.redis_client.node(key)
+                )
+        except redis.RedisError:
+            return None
+        return RateLimit(
+            limit=limit,
+            allowed=bool(allowed),
+            remaining=remaining,
+            retry_after=retry_after / 1000,
+            reset_after=reset_after / 1000,
+        )
+
+
+rate_limiter = RateLimiter()
+
+
+@dataclass
+class RateLimitMiddleware:
+    """Limit the requests of every client (user, else IP) to every route, before any routing or auth work.
+
+    Buckets are keyed by route operation id and client, the route limit is taken from `RATE_LIMIT_ROUTES`
+    and defaults to `LIMITED_RATE`. Routes hidden from the schema (health, metrics, docs) are not limited,
+    nothing is limited unless `ENABLE_LIMIT` is set.
+
+    Anonymous clients are keyed by the client address of the scope, which the server takes from
+    `X-Forwarded-For` only for the proxies of `FORWARDED_ALLOW_IPS`. It must list the reverse proxies in
+    front of the app, else all clients behind them share one bucket.
+    """
+
+    app: ASGIApp
+    _routes: LocalCache[tuple[str, str], str | None] = field(
+        default_factory=lambda: LocalCache(maxsize=4096, ttl=math.inf)
+    )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not settings.ENABLE_LIMIT or scope["type"] != "http" or (route := self._route(scope)) is None:
+            await self.app(scope, receive, send)
+            return
+        limit, period = settings.RATE_LIMIT_ROUTES.get(route, settings.LIMITED_RATE)
+        result = await rate_limiter.hit(f"{route}:{_client(scope)}", limit, period)
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+        if not result.allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"error": base_exceptions.ERR_429.error, "message": _(base_exceptions.ERR_429.message)},
+            )
+            response.raw_headers.extend(result.headers())
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *result.headers()]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _route(self, scope: Scope) -> str | None:
+        """Operation id of the matched route, `None` for routes which are not limited."""
+        cache_key = (scope["method"], scope["path"])
+        if (route := self._routes.get(cache_key)) is not None:
+            return route or None
+        route = UNMATCHED_ROUTE
+        for candidate in scope["app"].router.routes:
+            if isinstance(candidate, Route) and candidate.matches(scope)[0] is Match.FULL:
+                route = getattr(candidate, "operation_id", None) or candidate.path
+                if not candidate.include_in_schema:
+                    route = ""
+                break
+        self._routes.set(cache_key, route)
+        return route or None
+
+
+def _client(scope: Scope) -> str:
+    """`user:<id>` of a valid bearer token, else `ip:<address>` of the client (as forwarded by trusted proxies).
+
+    Expired tokens and tokens the worker bloom filter holds as (maybe) revoked are keyed by address, so that
+    a leaked token does not get its own bucket, the revocation is not confirmed in Redis on this path.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                try:
+                    payload = key_ring.decode(token)
+                    valid = payload["issued_at"] <= time.time() <= payload["expires_at"]
+                    jti = payload.get("jti")
+                    if valid and (not jti or jti not in revoked_tokens):
+                        return f"user:{payload['sub']}"
+                except (jwt.InvalidTokenError, KeyError, TypeError):
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
@@ -0,0 +1,71 @@
+import bisect
+from collections.abc import Iterable, Mapping
+from hashlib import blake2b
+from typing import Generic, TypeVar
+
+N = TypeVar("N")
+
+
+def hash_key(key: str) -> str:
+    """Part of the key which is hashed, the content of the first non-empty `{...}` if any.
+
+    Keys sharing a hash tag (eg: `principal_{42}` and `principal_version_{42}`) live on the same node,
+    so that they can be read in one multi-key command.
+    """
+    if (start := key.find("{")) != -1 and (end := key.find("}", start + 1)) > start + 1:
+        return key[start + 1 : end]
+    return key
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest())
+
+
+class HashRing(Generic[N]):
+    """Consistent hash ring mapping keys onto named nodes.
+
+    Every node is placed at `vnodes` points of the ring, a key belongs to the node of the first point
+    following its hash. Adding or removing a node only remaps the keys of the arcs it gains or loses,
+    about `1 / len(nodes)` of the keys.
+    """
+
+    def __init__(self, nodes: Mapping[str, N], vnodes: int) -> None:
+        self.vnodes = vnodes
+        self.nodes: dict[str, N] = {}
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        for name, node in nodes.items():
+            self.add(name, node)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, name: str, node: N) -> None:
+        self.nodes[name] = node
+        for i in range(self.vnodes):
+            point = _point(f"{name}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, name)
+
+    def remove(self, name: str) -> None:
+        del self.nodes[name]
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners, strict=True) if owner != name]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def name_for(self, key: str) -> str:
+        if len(self.nodes) == 1:
+            return next(iter(self.nodes))
+        index = bisect.bisect(self._points, _point(hash_key(key))) % len(self._points)
+        return self._owners[index]
+
+    def node_for(self, key: str) -> N:
+        return self.nodes[self.name_for(key)]
+
+    def group(self, keys: Iterable[str]) -> dict[str, list[int]]:
+        """Positions of `keys` grouped by the name of their node."""
+        groups: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(self.name_for(key), []).append(i)
+        return groups
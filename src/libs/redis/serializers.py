@@ -0,0 +1,131 @@
+import json
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from enum import IntEnum
+from typing import Any
+from uuid import UUID
+
+from src.core.config import settings
+
+
+class SerializerFormat(IntEnum):
+    """Format marker, the first byte of a cached value.
+
+    Markers are control bytes no JSON document starts with, values written before markers were
+    introduced are read as plain JSON.
+    """
+
+    JSON = 1
+    ORJSON = 2
+    MSGPACK = 3
+
+
+class CacheDecodeError(ValueError):
+    """The cached value is corrupted, or written with a serializer which is not installed in this worker."""
+
+
+class Compression(IntEnum):
+    """Second byte of a cached value."""
+
+    NONE = 0
+    ZLIB = 1
+
+
+def default(obj: Any) -> Any:
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, datetime | date | time):
+        return obj.isoformat()
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class Serializer:
+    format: SerializerFormat
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+SERIALIZERS: dict[SerializerFormat, Serializer] = {
+    SerializerFormat.JSON: Serializer(
+        SerializerFormat.JSON,
+        lambda value: json.dumps(value, default=default, separators=(",", ":")).encode(),
+        json.loads,
+    ),
+}
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    pass
+else:
+    SERIALIZERS[SerializerFormat.ORJSON] = Serializer(
+        SerializerFormat.ORJSON,
+        lambda value: orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads,
+    )
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    pass
+else:
+    SERIALIZERS[SerializerFormat.MSGPACK] = Serializer(
+        SerializerFormat.MSGPACK,
+        lambda value: msgpack.packb(value, default=default, datetime=False),
+        lambda data: msgpack.unpackb(data, strict_map_key=False),
+    )
+
+
+FORMAT_MARKERS = frozenset(SerializerFormat)
+
+
+class CacheCodec:
+    """Encode cached values with the configured serializer, compressing them above a size threshold.
+
+    Values are prefixed with their format and compression markers, so that values written with another
+    serializer (eg: by workers of the previous release during a rollout) are still read.
+    """
+
+    def __init__(self, serializer: SerializerFormat, compress_min_size: int, compress_level: int) -> None:
+        if serializer not in SERIALIZERS:
+            msg = f"Cache serializer {serializer.name} is not installed"
+            raise ValueError(msg)
+        self.serializer = SERIALIZERS[serializer]
+        self.compress_min_size = compress_min_size
+        self.compress_level = compress_level
+
+    def dumps(self, value: Any) -> bytes:
+        data = self.serializer.dumps(value)
+        compression = Compression.NONE
+        if len(data) >= self.compress_min_size:
+            data, compression = zlib.compress(data, self.compress_level), Compression.ZLIB
+        return bytes((self.serializer.format, compression)) + data
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode a cached value whatever serializer wrote it.
+
+        Raises:
+            CacheDecodeError: the value can not be decoded by this worker, callers treat it as a miss.
+        """
+        if isinstance(data, bytes) and data and data[0] in FORMAT_MARKERS and data[0] not in SERIALIZERS:
+            msg = f"Cache serializer {SerializerFormat(data[0]).name} is not installed"
+            raise CacheDecodeError(msg)
+        try:
+            if isinstance(data, str) or not data or data[0] not in FORMAT_MARKERS:
+                return json.loads(data)
+            body = data[2:]
+            if data[1] == Compression.ZLIB:
+                body = zlib.decompress(body)
+            return SERIALIZERS[SerializerFormat(data[0])].loads(body)
+        except (ValueError, TypeError, IndexError, zlib.error) as e:
+            raise CacheDecodeError(str(e)) from e
+
+
+codec = CacheCodec(
+    SerializerFormat[settings.CACHE_SERIALIZER.upper()],
+    compress_min_size=settings.CACHE_COMPRESS_MIN_SIZE,
+    compress_level=settings.CACHE_COMPRESS_LEVEL,
+)
@@ -1,13 +1,24 @@
+import asyncio
+import logging
 import time
 import uuid
 from dataclasses import dataclass
 
+from fastapi import status
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from src.core.utils.context import locale_ctx, request_id_ctx
+from src.core.errors import base_exceptions
+from src.core.utils.context import deadline_ctx, locale_ctx, request_id_ctx
+from src.core.utils.i18n import _
+
+logger = logging.getLogger(__name__)
+
+# nginx convention, the client closed the connection before the response was sent
+CLIENT_CLOSED_REQUEST = 499
 
 
 @dataclass
@@ -27,3 +38,85 @@ class RequestMiddleware(BaseHTTPMiddleware):
         response.headers[self.time_header] = str(time.time() - start_time)
 
         return response
+
+
+@dataclass
+class _TrackedSend:
+    """`send` recording how far the response went."""
+
+    send: Send
+    started: bool = False
+    complete: bool = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.started = True
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            self.complete = True
+        await self.send(message)
+
+
+@dataclass
+class DeadlineMiddleware:
+    """Run the request in its own task and cancel it when the client disconnects or the route deadline expires.
+
+    Cancelling the task cancels in-flight asyncpg queries and releases their pooled connections instead of
+    finishing work nobody waits for. The receive channel is drained into a queue so that `http.disconnect`
+    is noticed while the endpoint is still running. A cancelled request always ends with a complete response
+    (`CLIENT_CLOSED_REQUEST` for disconnects, 504 for deadlines), outer middlewares never see it missing.
+    """
+
+    app: ASGIApp
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        deadline_ctx.set(None)
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        disconnected = False
+        tracked_send = _TrackedSend(send)
+        app_task = asyncio.create_task(self.app(scope, messages.get, tracked_send))
+
+        async def listen_for_disconnect() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    logger.info(f"Client disconnected, cancelling request {scope['path']}")
+                    app_task.cancel()
+                    return
+
+        listener = asyncio.create_task(listen_for_disconnect())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if (current and current.cancelling()) or not app_task.cancelled():
+                app_task.cancel()
+                raise
+            if not tracked_send.complete:
+                await self._end_cancelled(scope, tracked_send, disconnected)
+        finally:
+            listener.cancel()
+
+    @staticmethod
+    async def _end_cancelled(scope: Scope, send: _TrackedSend, disconnected: bool) -> None:
+        if send.started:
+            logger.warning(f"Request cancelled after its response started {scope['path']}")
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif disconnected:
+            await Response(status_code=CLIENT_CLOSED_REQUEST)(scope, _never_receive, send)
+        else:
+            logger.warning(f"Request deadline exceeded, cancelled request {scope['path']}")
+            response = JSONResponse(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                content={"error": base_exceptions.ERR_504.error, "message": _(base_exceptions.ERR_504.message)},
+            )
+            await response(scope, _never_receive, send)
+
+
+async def _never_receive() -> Message:
+    return {"type": "http.disconnect"}
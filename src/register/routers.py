@@ -1,11 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from src.core.config import settings
+from src.deps import deadline
 from src.features.admin.api import router as auth_router
 
 
 def register_v1_router() -> APIRouter:
     root_router = APIRouter()
-    root_router.include_router(auth_router, prefix="/v1/admin", tags=["Admin"])
+    root_router.include_router(
+        auth_router,
+        prefix="/v1/admin",
+        tags=["Admin"],
+        dependencies=[Depends(deadline(settings.REQUEST_DEADLINE_SECS))],
+    )
     return root_router
 
 
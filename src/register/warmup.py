@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import select
+
+from src.core.config import settings
+from src.core.database.session import DatabasePool, async_sessions
+from src.core.models.base import Base
+from src.core.repositories.repository import inspect_table
+from src.features.admin.cache import get_menu_tree, get_role_grant
+from src.features.admin.models import Role
+from src.libs.redis import cache
+
+logger = logging.getLogger(__name__)
+
+# step name -> {"status": ..., "count": ..., "elapsed_ms": ...} of the last warm-up of this worker
+warmup_report: dict[str, dict[str, Any]] = {}
+
+
+async def _warm_role(role_id: int, limit: asyncio.Semaphore) -> None:
+    async with limit, async_sessions[DatabasePool.AUTH]() as session:
+        await get_role_grant(session, role_id)
+
+
+async def _warm_roles() -> int:
+    """Load the roles concurrently, each in its own session, at most `DATABASE_AUTH_POOL_SIZE` at once."""
+    async with async_sessions[DatabasePool.AUTH]() as session:
+        role_ids = (await session.scalars(select(Role.id))).all()
+    limit = asyncio.Semaphore(settings.DATABASE_AUTH_POOL_SIZE or 1)
+    results = await asyncio.gather(*(_warm_role(role_id, limit) for role_id in role_ids), return_exceptions=True)
+    if errors := [result for result in results if isinstance(result, Exception)]:
+        raise errors[0]
+    return len(role_ids)
+
+
+async def _warm_menus() -> int:
+    async with async_sessions[DatabasePool.OLTP]() as session:
+        return len(await get_menu_tree(session))
+
+
+async def _warm_tables() -> int:
+    tables = list(Base.metadata.tables)
+    for table_name in tables:
+        await inspect_table(table_name)
+    return len(tables)
+
+
+async def _warm_keys() -> int:
+    warmed = 0
+    for namespace in cache.local_tiers:
+        names = [key.removeprefix(namespace) for key in settings.CACHE_WARMUP_KEYS if key.startswith(namespace)]
+        if names:
+            values = await cache.redis_client.get_many(names, namespace=cache.CacheNamespace(namespace))
+            warmed += sum(value is not None for value in values)
+    return warmed
+
+
+WARMUP_STEPS: dict[str, Callable[[], Awaitable[int]]] = {
+    "roles": _warm_roles,
+    "menus": _warm_menus,
+    "tables": _warm_tables,
+    "cache_keys": _warm_keys,
+}
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[int]]) -> None:
+    start = time.perf_counter()
+    report = warmup_report[name] = {"status": "running", "count": 0, "elapsed_ms": 0.0}
+    try:
+        report["count"] = await step()
+        report["status"] = "ok"
+    except asyncio.CancelledError:
+        report["status"] = "timeout"
+        raise
+    except Exception:
+        logger.exception(f"Warm-up step {name} failed")
+        report["status"] = "failed"
+    finally:
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+
+async def warm_up() -> dict[str, dict[str, Any]]:
+    """Load role permissions, the menu tree, table constraints and `CACHE_WARMUP_KEYS` before serving.
+
+    Steps run concurrently within `CACHE_WARMUP_BUDGET`, steps still running then are cancelled and
+    left to load lazily on first use. A failed step never prevents the worker from starting.
+    """
+    warmup_report.clear()
+    tasks = [asyncio.create_task(_run_step(name, step)) for name, step in WARMUP_STEPS.items()]
+    _, pending = await asyncio.wait(tasks, timeout=settings.CACHE_WARMUP_BUDGET)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    logger.info(f"Warm-up finished: {warmup_report}")
+    return warmup_report
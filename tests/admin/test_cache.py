@@ -0,0 +1,170 @@
+import asyncio
+from collections.abc import Iterator
+from types import SimpleNamespace
+
+import pytest
+import redis
+
+from src.core.config import settings
+from src.features.admin import cache as admin_cache
+from src.features.admin.security import Principal, RoleGrant, permission_index
+from src.libs.redis import cache
+from src.libs.redis.bloom import BloomFilter
+from src.libs.redis.pubsub import invalidation_bus
+from src.libs.redis.serializers import codec
+
+
+async def test_missing_principal_version_trusts_no_claims(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache
+):
+    async def batched(*_: str) -> None:
+        return None
+
+    monkeypatch.setattr(unreachable_redis, "batched", batched)
+    admin_cache.principal_version_cache.invalidate(-42)
+    assert await admin_cache.get_principal_version(-42) is None
+    assert admin_cache.principal_version_cache.get(-42) is None
+
+
+async def test_role_record_of_older_version_is_reloaded(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache
+):
+    stale = {"slug": "user", "index": permission_index.fingerprint, "bits": "0", "version": 3}
+    stored: list[dict] = []
+
+    async def batched(*_: str) -> list[bytes]:
+        return [codec.dumps(stale), b"4"]
+
+    async def load_role_record(*_: object) -> dict:
+        return {"slug": "user", "index": permission_index.fingerprint, "bits": "ff"}
+
+    async def set_ex(value: dict, **_: object) -> None:
+        stored.append(value)
+
+    monkeypatch.setattr(unreachable_redis, "batched", batched)
+    monkeypatch.setattr(unreachable_redis, "set_ex", set_ex)
+    monkeypatch.setattr(admin_cache, "_load_role_record", load_role_record)
+    admin_cache.role_cache.invalidate(-42)
+    grant = await admin_cache.get_role_grant(None, -42)
+    assert grant == RoleGrant(slug="user", permissions=int("ff", 16))
+    assert stored == [{"slug": "user", "index": permission_index.fingerprint, "bits": "ff", "version": 4}]
+
+
+PRINCIPAL_RECORD = {"id": -42, "role_id": 1, "is_active": True, "version": 4}
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        codec.dumps(PRINCIPAL_RECORD)[:-3],
+        bytes((1, 1)) + b"not zlib",
+        codec.dumps(["foreign"]),
+        codec.dumps({"id": -42, "role_id": 1, "is_active": True}),
+        codec.dumps({**PRINCIPAL_RECORD, "id": -43}),
+    ],
+    ids=["truncated", "corrupted", "foreign", "older-format", "other-user"],
+)
+async def test_undecodable_principal_record_is_reloaded(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache, record: bytes
+):
+    stored: list[dict] = []
+
+    async def batched(*_: str) -> list[bytes]:
+        return [record, b"4"]
+
+    async def load_principal_row(*_: object) -> SimpleNamespace:
+        return SimpleNamespace(role_id=2, is_active=True)
+
+    async def set_ex(value: dict, **_: object) -> None:
+        stored.append(value)
+
+    monkeypatch.setattr(unreachable_redis, "batched", batched)
+    monkeypatch.setattr(unreachable_redis, "set_ex", set_ex)
+    monkeypatch.setattr(admin_cache, "_load_principal_row", load_principal_row)
+    admin_cache.principal_cache.invalidate(-42)
+    principal = await admin_cache.get_principal(None, -42)
+    assert principal == Principal(id=-42, role_id=2, is_active=True, version=4)
+    assert stored == [{"id": -42, "role_id": 2, "is_active": True, "version": 4}]
+
+
+async def test_current_principal_record_is_trusted(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache
+):
+    async def batched(*_: str) -> list[bytes]:
+        return [codec.dumps(PRINCIPAL_RECORD), b"4"]
+
+    monkeypatch.setattr(unreachable_redis, "batched", batched)
+    admin_cache.principal_cache.invalidate(-42)
+    assert await admin_cache.get_principal(None, -42) == Principal(**PRINCIPAL_RECORD)
+    admin_cache.principal_cache.invalidate(-42)
+
+
+@pytest.mark.usefixtures("unreachable_redis")
+async def test_failed_role_invalidation_still_drops_local_copy(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "AUTH_CACHE_INVALIDATION_RETRIES", 1)
+    monkeypatch.setattr(admin_cache, "INVALIDATION_BACKOFF", 0)
+    admin_cache.role_cache.set(-42, RoleGrant(slug="user", permissions=0))
+    await admin_cache.invalidate_role(-42)
+    assert admin_cache.role_cache.get(-42) is None
+
+
+async def test_local_ttl_is_short_while_invalidations_may_be_lost(monkeypatch: pytest.MonkeyPatch):
+    assert admin_cache._local_ttl() is None
+    monkeypatch.setattr(invalidation_bus, "client", object())
+    assert admin_cache._local_ttl() == settings.AUTH_CACHE_DEGRADED_TTL
+    monkeypatch.setattr(invalidation_bus, "subscribed", True)
+    assert admin_cache._local_ttl() is None
+
+
+@pytest.fixture
+def revoked_tokens() -> Iterator[BloomFilter]:
+    """The worker bloom filter, emptied after the test."""
+    yield admin_cache.revoked_tokens
+    admin_cache.revoked_tokens.clear()
+
+
+@pytest.mark.usefixtures("unreachable_redis", "revoked_tokens")
+async def test_unconfirmed_bloom_positives_are_revoked():
+    assert not await admin_cache.is_token_revoked("never-revoked")
+    with pytest.raises(redis.RedisError):
+        await admin_cache.revoke_token("revoked", 0)
+    assert await admin_cache.is_token_revoked("revoked")
+
+
+@pytest.mark.usefixtures("revoked_tokens")
+async def test_bloom_misses_are_checked_in_redis_while_the_bus_is_degraded(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache
+):
+    revoked = {"revoked-elsewhere"}
+    checked: list[str] = []
+
+    async def zscore(_: str, jti: str) -> float | None:
+        checked.append(jti)
+        return 1.0 if jti in revoked else None
+
+    monkeypatch.setattr(unreachable_redis, "zscore", zscore)
+    assert not await admin_cache.is_token_revoked("revoked-elsewhere")
+    assert checked == []
+
+    monkeypatch.setattr(invalidation_bus, "client", object())
+    assert await admin_cache.is_token_revoked("revoked-elsewhere")
+    assert not await admin_cache.is_token_revoked("never-revoked")
+    assert checked == ["revoked-elsewhere", "never-revoked"]
+
+
+@pytest.mark.usefixtures("unreachable_redis", "revoked_tokens")
+async def test_unchecked_bloom_misses_are_accepted_while_the_bus_is_degraded(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(invalidation_bus, "client", object())
+    assert not await admin_cache.is_token_revoked("never-revoked")
+
+
+async def test_bloom_filter_is_reloaded_when_the_bus_resubscribes(
+    monkeypatch: pytest.MonkeyPatch, unreachable_redis: cache.FastapiCache, revoked_tokens: BloomFilter
+):
+    async def zrangebyscore(*_: object) -> list[bytes]:
+        return [b"revoked-elsewhere"]
+
+    monkeypatch.setattr(unreachable_redis, "zrangebyscore", zrangebyscore)
+    invalidation_bus._drop_all()
+    await asyncio.gather(*admin_cache._reload_tasks)
+    assert "revoked-elsewhere" in revoked_tokens
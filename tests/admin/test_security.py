@@ -0,0 +1,177 @@
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import Annotated, Any
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
+
+from src.core.errors.auth_exceptions import NotFoundError, PermissionDenyError
+from src.core.repositories import BaseRepository
+from src.features.admin import schemas, services
+from src.features.admin.security import (
+    API_WHITE_LISTS,
+    PasswordHasher,
+    PermissionIndex,
+    RouteAccess,
+    RouteAccessTable,
+    get_password_hash,
+    verify_password,
+)
+
+LOGOUT = next(iter(API_WHITE_LISTS))
+PLAIN_TEXT = "secret"
+
+
+def fake_auth() -> None:
+    pass
+
+
+def nested_auth(_: Annotated[None, Depends(fake_auth)]) -> None:
+    pass
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/public", operation_id="public")
+    def public() -> None:
+        pass
+
+    @app.post("/logout", operation_id=LOGOUT, dependencies=[Depends(fake_auth)])
+    def logout() -> None:
+        pass
+
+    @app.get("/direct", operation_id="direct", dependencies=[Depends(fake_auth)])
+    def direct() -> None:
+        pass
+
+    @app.get("/nested", operation_id="nested")
+    def nested(_: Annotated[None, Depends(nested_auth)]) -> None:
+        pass
+
+    return app
+
+
+def test_operation_ids_map_to_stable_bits():
+    routes = _app().routes
+    index = PermissionIndex()
+    index.build(routes)
+    other = PermissionIndex()
+    other.build(reversed(routes))
+    assert index.positions == other.positions
+    assert index.fingerprint == other.fingerprint
+
+    bits = index.encode(["direct", "nested", "unknown"])
+    assert index.has(bits, "direct")
+    assert index.has(bits, "nested")
+    assert not index.has(bits, "public")
+    assert not index.has(bits, "unknown")
+
+
+def test_fingerprint_changes_with_the_route_set():
+    app = _app()
+    index = PermissionIndex()
+    index.build(app.routes)
+    fingerprint = index.fingerprint
+    app.get("/new", operation_id="new")(lambda: None)
+    index.build(app.routes)
+    assert index.fingerprint != fingerprint
+
+
+def test_route_access_follows_the_auth_dependency():
+    table = RouteAccessTable()
+    table.build(_app().routes, fake_auth)
+    assert table.get("public") is RouteAccess.PUBLIC
+    assert table.get(LOGOUT) is RouteAccess.TOKEN
+    assert table.get("direct") is RouteAccess.PERMISSION
+    assert table.get("nested") is RouteAccess.PERMISSION
+    assert table.get("unknown") is RouteAccess.PERMISSION
+
+
+@pytest.fixture
+def hasher() -> Iterator[PasswordHasher]:
+    hasher = PasswordHasher(max_workers=1)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hashed_passwords_verify(hasher: PasswordHasher):
+    hashed = await hasher.hash(PLAIN_TEXT)
+    assert await hasher.verify(PLAIN_TEXT, hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["running"] == hasher.stats()["queued"] == 0
+
+
+async def test_hasher_refuses_work_after_shutdown(hasher: PasswordHasher):
+    hashed = await hasher.hash(PLAIN_TEXT)
+    hasher.shutdown()
+    with pytest.raises(RuntimeError):
+        await hasher.verify(PLAIN_TEXT, hashed)
+    assert hasher._executor is None
+    assert hasher.stats()["running"] == 0
+
+
+class StubSession:
+    def __init__(self, user: Any) -> None:
+        self.user = user
+        self.info: dict[str, Any] = {}
+
+    async def scalar(self, _: object) -> Any:
+        return self.user
+
+
+@pytest.mark.parametrize(("password", "verified"), [(PLAIN_TEXT, True), ("wrong", False)])
+async def test_verify_user_checks_the_password_in_the_hasher(
+    monkeypatch: pytest.MonkeyPatch, hasher: PasswordHasher, password: str, verified: bool
+):
+    monkeypatch.setattr(services, "password_hasher", hasher)
+    user = SimpleNamespace(password=get_password_hash(PLAIN_TEXT))
+    form = OAuth2PasswordRequestForm(username="admin@example.com", password=password)
+    if verified:
+        assert await services.user_repo.verify_user(StubSession(user), form) is user
+    else:
+        with pytest.raises(PermissionDenyError):
+            await services.user_repo.verify_user(StubSession(user), form)
+    assert hasher.stats()["completed"] == 1
+
+
+async def test_verify_user_rejects_unknown_users(monkeypatch: pytest.MonkeyPatch, hasher: PasswordHasher):
+    monkeypatch.setattr(services, "password_hasher", hasher)
+    form = OAuth2PasswordRequestForm(username="nobody@example.com", password=PLAIN_TEXT)
+    with pytest.raises(NotFoundError):
+        await services.user_repo.verify_user(StubSession(None), form)
+    assert hasher.stats()["completed"] == 0
+
+
+@pytest.fixture
+def written(monkeypatch: pytest.MonkeyPatch) -> list[BaseModel]:
+    """Schemas passed on to the base repository writes."""
+    written: list[BaseModel] = []
+
+    async def write(_: BaseRepository, __: StubSession, *args: Any) -> None:
+        written.append(next(arg for arg in args if isinstance(arg, BaseModel)))
+
+    monkeypatch.setattr(BaseRepository, "create", write)
+    monkeypatch.setattr(BaseRepository, "update", write)
+    return written
+
+
+async def test_passwords_are_hashed_in_the_hasher_before_they_are_written(
+    monkeypatch: pytest.MonkeyPatch, hasher: PasswordHasher, written: list[BaseModel]
+):
+    monkeypatch.setattr(services, "password_hasher", hasher)
+    session, user = StubSession(None), SimpleNamespace(id=1)
+    await services.user_repo.update(session, user, schemas.UserUpdate(password=PLAIN_TEXT))
+    # `UserCreate` declares no password, any schema carrying one is hashed
+    await services.user_repo.create(session, schemas.UserUpdate(name="user", group_id=1, password=PLAIN_TEXT))
+    assert all(verify_password(PLAIN_TEXT, schema.password) for schema in written)
+    assert all("password" in schema.model_fields_set for schema in written)
+    assert hasher.stats()["completed"] == 2
+
+    update = schemas.UserUpdate(name="renamed")
+    await services.user_repo.update(session, user, update)
+    assert written[-1] is update
+    assert hasher.stats()["completed"] == 2
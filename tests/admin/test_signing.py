@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+
+from src.app import app
+from src.core.config import settings
+from src.features.admin.signing import HS_ALGORITHM, KeyRing, SigningKey, key_ring
+from src.libs.redis import local_cache
+
+# RFC 8037 appendix A: Ed25519 private key and the RFC 7638 thumbprint of its public jwk
+RFC_8037_D = "nWGxne_9WmC6hEr0kuwsxERJxWl7MmkZcDusAxyuf2A"
+RFC_8037_THUMBPRINT = "kPrK_qmxVWaYVA9wwBF6Iuo3vVzz7TxHCTwXBygrS4k"
+
+
+def _pem(private_key: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def _key_files(tmp_path: Path, *private_keys: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey) -> list[str]:
+    paths = []
+    for i, private_key in enumerate(private_keys):
+        path = tmp_path / f"key_{i}.pem"
+        path.write_bytes(_pem(private_key))
+        paths.append(str(path))
+    return paths
+
+
+def _payload(expires_in: float = 60) -> dict[str, int | str]:
+    now = int(time.time())
+    return {"sub": "1", "issued_at": now, "expires_at": int(now + expires_in)}
+
+
+@pytest.mark.parametrize(
+    ("private_key", "algorithm"),
+    [(ed25519.Ed25519PrivateKey.generate(), "EdDSA"), (ec.generate_private_key(ec.SECP256R1()), "ES256")],
+)
+def test_tokens_round_trip(
+    tmp_path: Path, private_key: ed25519.Ed25519PrivateKey | ec.EllipticCurvePrivateKey, algorithm: str
+):
+    ring = KeyRing()
+    ring.load(_key_files(tmp_path, private_key))
+    token = ring.encode(_payload())
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == algorithm
+    assert header["kid"] == ring.active.kid
+    assert ring.decode(token)["sub"] == "1"
+    assert jwt.decode(token, key=private_key.public_key(), algorithms=[algorithm])["sub"] == "1"
+
+
+def test_unsupported_keys_are_refused():
+    with pytest.raises(TypeError):
+        SigningKey.from_pem(_pem(ec.generate_private_key(ec.SECP384R1())))
+
+
+def test_kid_is_the_rfc_7638_thumbprint():
+    d = base64.urlsafe_b64decode(RFC_8037_D + "=")
+    key = SigningKey.from_pem(_pem(ed25519.Ed25519PrivateKey.from_private_bytes(d)))
+    assert key.kid == RFC_8037_THUMBPRINT
+
+    key = SigningKey.from_pem(_pem(ec.generate_private_key(ec.SECP256R1())))
+    members = json.dumps({m: key.jwk[m] for m in ("crv", "kty", "x", "y")}, separators=(",", ":"), sort_keys=True)
+    assert key.kid == base64.urlsafe_b64encode(hashlib.sha256(members.encode()).digest()).rstrip(b"=").decode()
+
+
+def test_first_key_signs_and_older_keys_still_verify(tmp_path: Path):
+    old, new = ed25519.Ed25519PrivateKey.generate(), ec.generate_private_key(ec.SECP256R1())
+    ring = KeyRing()
+    ring.load(_key_files(tmp_path, old))
+    old_token = ring.encode(_payload())
+    ring.load(_key_files(tmp_path, new, old))
+    new_token = ring.encode(_payload())
+    assert jwt.get_unverified_header(new_token)["kid"] == SigningKey.from_pem(_pem(new)).kid
+    assert ring.decode(old_token)["sub"] == ring.decode(new_token)["sub"] == "1"
+    assert [jwk["kid"] for jwk in ring.jwks()["keys"]] == list(ring.keys)
+
+
+def test_unknown_kid_is_rejected(tmp_path: Path):
+    signer, verifier = KeyRing(), KeyRing()
+    signer.load(_key_files(tmp_path, ed25519.Ed25519PrivateKey.generate()))
+    verifier.load(_key_files(tmp_path, ed25519.Ed25519PrivateKey.generate()))
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.decode(signer.encode(_payload()))
+
+
+def test_tokens_are_signed_with_the_secret_key_without_key_files():
+    ring = KeyRing()
+    ring.load([])
+    token = ring.encode(_payload())
+    assert jwt.get_unverified_header(token) == {"alg": HS_ALGORITHM, "typ": "JWT"}
+    assert jwt.decode(token, key=settings.SECRET_KEY, algorithms=[HS_ALGORITHM])["sub"] == "1"
+    assert ring.decode(token)["sub"] == "1"
+    assert ring.jwks() == {"keys": []}
+
+
+def test_verified_payloads_are_cached_until_the_token_expires(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr(local_cache.time, "monotonic", lambda: now)
+    ring = KeyRing()
+    ring.load(_key_files(tmp_path, ed25519.Ed25519PrivateKey.generate()))
+    token = ring.encode(_payload(expires_in=30))
+    payload = ring.decode(token)
+    assert ring._verified.get(token) is payload
+    now += 29
+    assert ring._verified.get(token) is payload
+    now += 2
+    assert ring._verified.get(token) is None
+
+    expired = ring.encode(_payload(expires_in=-1))
+    ring.decode(expired)
+    assert ring._verified.get(expired) is None
+
+
+async def test_jwks_publishes_the_public_keys(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    ring = KeyRing()
+    ring.load(_key_files(tmp_path, ed25519.Ed25519PrivateKey.generate(), ec.generate_private_key(ec.SECP256R1())))
+    monkeypatch.setattr(key_ring, "keys", ring.keys)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url=settings.BASE_URL) as client:
+        response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["cache-control"] == "public, max-age=300"
+    keys = response.json()["keys"]
+    assert [(jwk["kid"], jwk["alg"], jwk["use"]) for jwk in keys] == [
+        (key.kid, key.algorithm, "sig") for key in ring.keys.values()
+    ]
+    assert all("d" not in jwk for jwk in keys)
@@ -1,14 +1,19 @@
 import asyncio
 import gc
 from collections.abc import AsyncGenerator
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pytest
+import redis.asyncio as redis
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from src.app import app
 from src.core.config import settings
 from src.core.database.session import async_session
+from src.libs.redis import cache
+from tests.models import SqliteBase
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -43,3 +48,21 @@ async def admin_token() -> dict[str, str]:
 async def client(admin_token: dict[str, str]) -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(transport=ASGITransport(app=app), base_url=settings.BASE_URL, headers=admin_token) as client:
         yield client
+
+
+@pytest.fixture
+def unreachable_redis(monkeypatch: pytest.MonkeyPatch) -> cache.FastapiCache:
+    """Cache client of a node refusing connections, every call falls back as in an outage."""
+    client = cache.FastapiCache(connection_pool=redis.ConnectionPool.from_url("redis://127.0.0.1:1"))
+    monkeypatch.setattr(cache, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+async def sqlite_sessions(tmp_path: Path) -> AsyncGenerator[async_sessionmaker["AsyncSession"], None]:
+    """Sessions of a throwaway sqlite database holding the `SqliteBase` models, for transaction tests."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SqliteBase.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
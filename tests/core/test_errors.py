@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.config import settings
+from src.core.errors import base_exceptions
+from src.core.errors.auth_exceptions import exception_handlers
+from src.core.utils.i18n import _
+from src.core.utils.translations import translations
+from src.register.middlewares import RequestMiddleware
+
+
+def _app(tmp_path: Path) -> FastAPI:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    app = FastAPI()
+
+    @app.get("/exhausted")
+    async def exhausted() -> None:
+        async with engine.connect(), engine.connect():
+            pass
+
+    for handler in exception_handlers:
+        app.add_exception_handler(handler["exception"], handler["handler"])
+    app.add_middleware(RequestMiddleware)
+    return app
+
+
+@pytest.mark.parametrize("locale", ["en_US", "zh_CN"])
+async def test_pool_exhaustion_returns_503_with_retry_after(tmp_path: Path, locale: str):
+    async with AsyncClient(transport=ASGITransport(app=_app(tmp_path)), base_url="http://test") as client:
+        response = await client.get("/exhausted", headers={"Accept-Language": locale})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == str(settings.DATABASE_POOL_RETRY_AFTER_SECS)
+    assert response.json() == {
+        "error": base_exceptions.ERR_503.error,
+        "message": translations[locale]["app"]["database_pool_exhausted"],
+    }
+
+
+@pytest.mark.parametrize(
+    "error",
+    [base_exceptions.ERR_429, base_exceptions.ERR_503, base_exceptions.ERR_504, base_exceptions.ERR_10007],
+)
+@pytest.mark.parametrize("locale", ["en_US", "zh_CN"])
+def test_error_messages_are_translated(error: base_exceptions.ErrorCode, locale: str):
+    assert error.message.startswith("app.")
+    assert translations[locale]["app"][error.message.removeprefix("app.")]
+    assert not str(_(error.message)).startswith("missing translation")
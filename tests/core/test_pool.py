@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.core.config import settings
+from src.core.database import pool
+from src.core.database.pool import MonitoredQueuePool, check_pool_health, pool_health_task, register_pool_events
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Clock of the checkin and checkout listeners, the event loop keeps the real one."""
+    now = [1000.0]
+    monkeypatch.setattr(pool, "time", SimpleNamespace(monotonic=lambda: now[0], perf_counter=time.perf_counter))
+    return now
+
+
+@pytest.fixture
+async def engine(tmp_path: Path) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=MonitoredQueuePool)
+    register_pool_events(engine)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def pings(monkeypatch: pytest.MonkeyPatch, engine: AsyncEngine) -> list[Any]:
+    """dbapi connections pinged on checkout, the ping fails while the list ends with `None`."""
+    pinged: list[Any] = []
+
+    def do_ping(dbapi_connection: Any) -> bool:
+        failing = bool(pinged) and pinged[-1] is None
+        pinged.append(dbapi_connection)
+        if failing:
+            pinged.remove(None)
+            raise ConnectionError
+        return True
+
+    monkeypatch.setattr(engine.sync_engine.dialect, "do_ping", do_ping)
+    return pinged
+
+
+async def _dbapi_connection(engine: AsyncEngine) -> Any:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        return (await conn.get_raw_connection()).dbapi_connection
+
+
+async def test_only_idle_connections_are_pinged_on_checkout(engine: AsyncEngine, pings: list[Any], clock: list[float]):
+    first = await _dbapi_connection(engine)
+    clock[0] += settings.DATABASE_POOL_PING_IDLE_SECS - 1
+    assert await _dbapi_connection(engine) is first
+    assert pings == []
+    clock[0] += settings.DATABASE_POOL_PING_IDLE_SECS
+    assert await _dbapi_connection(engine) is first
+    assert pings == [first]
+
+
+async def test_failed_ping_reconnects(engine: AsyncEngine, pings: list[Any], clock: list[float]):
+    first = await _dbapi_connection(engine)
+    clock[0] += settings.DATABASE_POOL_PING_IDLE_SECS
+    pings.append(None)
+    second = await _dbapi_connection(engine)
+    assert second is not first
+    assert pings == [first]
+    assert engine.pool.stats()["checked_out"] == 0
+
+
+async def test_checkout_waits_are_recorded(engine: AsyncEngine):
+    await _dbapi_connection(engine)
+    await _dbapi_connection(engine)
+    stats = engine.pool.stats()
+    assert stats["waits"] == 2
+    assert stats["wait_max_ms"] >= stats["wait_avg_ms"] >= 0
+
+
+class StubConnection:
+    def __init__(self, in_recovery: bool) -> None:
+        self.in_recovery = in_recovery
+
+    async def scalar(self, _: Any) -> bool:
+        return self.in_recovery
+
+
+class StubEngine:
+    def __init__(self, in_recovery: bool = False, down: bool = False) -> None:
+        self.in_recovery = in_recovery
+        self.down = down
+        self.checks = 0
+        self.disposed = False
+
+    @contextlib.asynccontextmanager
+    async def connect(self) -> AsyncIterator[StubConnection]:
+        self.checks += 1
+        if self.down:
+            raise ConnectionRefusedError
+        yield StubConnection(self.in_recovery)
+
+    async def dispose(self) -> None:
+        self.disposed = True
+
+
+@pytest.mark.parametrize(
+    ("stub", "disposed"),
+    [(StubEngine(), False), (StubEngine(in_recovery=True), True), (StubEngine(down=True), False)],
+    ids=["primary", "failover", "down"],
+)
+async def test_pool_is_disposed_after_a_failover(stub: StubEngine, disposed: bool):
+    await check_pool_health(stub)
+    assert stub.checks == 1
+    assert stub.disposed is disposed
+
+
+async def test_health_checks_run_until_the_context_exits(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "DATABASE_POOL_HEALTH_CHECK_INTERVAL", 0)
+    engines = [StubEngine(), StubEngine(down=True)]
+    async with pool_health_task(*engines):
+        for _ in range(5):
+            await asyncio.sleep(0)
+    checks = [stub.checks for stub in engines]
+    assert all(checks)
+    await asyncio.sleep(0)
+    assert [stub.checks for stub in engines] == checks
@@ -0,0 +1,135 @@
+import asyncio
+from typing import Any
+
+import pytest
+import redis.asyncio as redis
+from sqlalchemy import Select, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.database import session as db_session
+from src.core.repositories import register_write_hook, repository
+from src.libs.redis import cache
+from tests.libs.redis.stubs import StubNode
+from tests.models import Note, NoteCreate, note_repo
+
+
+@pytest.fixture
+def write_hooks(monkeypatch: pytest.MonkeyPatch) -> list[repository.WriteHook]:
+    hooks: list[repository.WriteHook] = []
+    monkeypatch.setattr(repository, "_write_hooks", hooks)
+    return hooks
+
+
+@pytest.fixture
+def cache_node(monkeypatch: pytest.MonkeyPatch) -> StubNode:
+    node = StubNode()
+    client = cache.FastapiCache(
+        connection_pool=redis.ConnectionPool.from_url("redis://127.0.0.1:1"), shards={"a": node}
+    )
+    monkeypatch.setattr(cache, "redis_client", client)
+    return node
+
+
+async def _after_commit_tasks() -> None:
+    await asyncio.gather(*db_session._after_commit_tasks)
+
+
+async def _cache_note_entries(note_id: int) -> None:
+    for name, tags in (
+        ("note", cache.entity_tags(Note.__tablename__, note_id)),
+        ("notes", cache.entity_tags(Note.__tablename__)),
+        ("user", cache.entity_tags("user", note_id)),
+    ):
+        await cache.redis_client.set_ex(name, {}, namespace=cache.CacheNamespace.API_CACHE, tags=tags)
+
+
+def test_app_registers_the_cache_invalidation():
+    from src.app import app  # noqa: F401
+
+    assert cache.invalidate_entities in repository._write_hooks
+
+
+async def test_write_hooks_run_once_the_write_commits(
+    sqlite_sessions: async_sessionmaker[AsyncSession], write_hooks: list[repository.WriteHook]
+):
+    calls: list[tuple[str, tuple]] = []
+
+    async def hook(table: str, pk_ids: tuple) -> None:
+        calls.append((table, pk_ids))
+
+    register_write_hook(hook)
+    register_write_hook(hook)
+    assert write_hooks == [hook]
+    async with sqlite_sessions() as session:
+        note = await note_repo.create(session, NoteCreate(title="a"))
+        await note_repo.update(session, note, NoteCreate(title="b"))
+        await _after_commit_tasks()
+        assert calls == []
+        await session.commit()
+    await _after_commit_tasks()
+    assert calls == [("note", ()), ("note", (note.id,))]
+
+
+@pytest.mark.usefixtures("write_hooks")
+async def test_committed_write_invalidates_tagged_entries(
+    sqlite_sessions: async_sessionmaker[AsyncSession], cache_node: StubNode
+):
+    register_write_hook(cache.invalidate_entities)
+    async with sqlite_sessions() as session:
+        note = await note_repo.create(session, NoteCreate(title="a"), commit=True)
+    await _after_commit_tasks()
+    await _cache_note_entries(note.id)
+
+    async with sqlite_sessions() as session:
+        await note_repo.update(session, await session.get(Note, note.id), NoteCreate(title="b"))
+        await session.commit()
+    await _after_commit_tasks()
+    assert cache.CacheNamespace.API_CACHE + "note" not in cache_node.data
+    assert cache.CacheNamespace.API_CACHE + "notes" not in cache_node.data
+    assert cache.CacheNamespace.API_CACHE + "user" in cache_node.data
+
+
+@pytest.mark.usefixtures("write_hooks")
+async def test_rolled_back_write_keeps_tagged_entries(
+    sqlite_sessions: async_sessionmaker[AsyncSession], cache_node: StubNode
+):
+    register_write_hook(cache.invalidate_entities)
+    async with sqlite_sessions() as session:
+        note = await note_repo.create(session, NoteCreate(title="a"), commit=True)
+    await _after_commit_tasks()
+    await _cache_note_entries(note.id)
+
+    async with sqlite_sessions() as session:
+        await note_repo.delete(session, await session.get(Note, note.id))
+        await session.rollback()
+    await _after_commit_tasks()
+    assert {
+        cache.CacheNamespace.API_CACHE + "note",
+        cache.CacheNamespace.API_CACHE + "notes",
+        cache.CacheNamespace.API_CACHE + "user",
+    } <= cache_node.data.keys()
+
+
+def _bind_params(stmt: Select[Any]) -> dict[str, Any]:
+    return stmt.compile(dialect=postgresql.dialect()).params
+
+
+@pytest.mark.parametrize("values", [[1], [1, 2, 3]])
+def test_in_array_binds_one_array_parameter(values: list[int]):
+    sql = str(select(Note.id).where(repository.in_array(Note.id, values)).compile(dialect=postgresql.dialect()))
+    assert sql.endswith("WHERE note.id = ANY (%(param_1)s::INTEGER[])")
+    assert _bind_params(select(Note.id).where(repository.in_array(Note.id, values))) == {"param_1": values}
+    assert _bind_params(select(Note.id).where(repository.not_in_array(Note.id, values))) == {"param_1": values}
+
+
+def test_list_filters_bind_one_array_parameter():
+    stmt = note_repo._apply_filter(select(Note), {"id": [1, 2, 3]})
+    assert list(_bind_params(stmt).values()) == [[1, 2, 3]]
+
+
+def test_i18n_list_filters_bind_one_array_parameter_per_locale():
+    stmt = note_repo._apply_filter(select(Note), {"label": ["a", "b"]})
+    params = _bind_params(stmt)
+    assert [value for value in params.values() if isinstance(value, list)] == [["a", "b"], ["a", "b"]]
+    assert "IN" not in str(stmt.compile(dialect=postgresql.dialect()))
@@ -0,0 +1,79 @@
+from typing import Any
+
+from redis import exceptions
+from redis.commands import CoreCommands
+
+
+class StubPipeline(CoreCommands):
+    def __init__(self, node: "StubNode") -> None:
+        self.node = node
+        self.commands: list[tuple[Any, ...]] = []
+
+    def execute_command(self, *args: Any, **_: Any) -> "StubPipeline":
+        self.commands.append(args)
+        return self
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        if self.node.down:
+            raise exceptions.ConnectionError
+        self.node.round_trips.append(self.commands)
+        replies: list[Any] = []
+        for command in self.commands:
+            try:
+                replies.append(self.node.reply(*command))
+            except exceptions.ResponseError as e:
+                if raise_on_error:
+                    raise
+                replies.append(e)
+        return replies
+
+
+class StubNode:
+    """In memory node answering GET/MGET/SET/SETEX/DEL and tag set commands through pipelines,
+    every pipeline execution is one round trip. Expiries are ignored.
+    """
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        self.data = data or {}
+        self.down = False
+        self.round_trips: list[list[tuple[Any, ...]]] = []
+
+    def pipeline(self, transaction: bool = True) -> StubPipeline:  # noqa: ARG002
+        return StubPipeline(self)
+
+    async def delete(self, *keys: str) -> int:
+        if self.down:
+            raise exceptions.ConnectionError
+        return self.reply("DEL", *keys)
+
+    def reply(self, command: str, *args: Any) -> Any:
+        if (handler := getattr(self, f"_{command.lower()}", None)) is None:
+            msg = f"unknown command '{command}'"
+            raise exceptions.ResponseError(msg)
+        return handler(*args)
+
+    def _get(self, key: str) -> Any:
+        return self.data.get(key)
+
+    def _mget(self, *keys: str) -> list[Any]:
+        return [self.data.get(key) for key in keys]
+
+    def _set(self, key: str, value: Any) -> bool:
+        self.data[key] = value
+        return True
+
+    def _setex(self, key: str, _: int, value: Any) -> bool:
+        return self._set(key, value)
+
+    def _del(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _sadd(self, key: str, *members: str | bytes) -> int:
+        self.data.setdefault(key, set()).update(m.encode() if isinstance(m, str) else m for m in members)
+        return len(members)
+
+    def _smembers(self, key: str) -> set[bytes]:
+        return self.data.get(key, set())
+
+    def _expire(self, key: str, *_: Any) -> int:
+        return int(key in self.data)
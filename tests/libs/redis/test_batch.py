@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from redis import exceptions
+
+from src.libs.redis.batch import CommandBatcher
+from src.libs.redis.breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from tests.libs.redis.stubs import StubNode
+
+
+async def test_commands_of_one_tick_share_a_round_trip():
+    node = StubNode({"a": b"1", "b": b"2"})
+    batcher = CommandBatcher(node)
+    replies = await asyncio.gather(batcher.execute("GET", "a"), batcher.execute("MGET", "a", "b", "c"))
+    assert replies == [b"1", [b"1", b"2", None]]
+    assert node.round_trips == [[("GET", "a"), ("MGET", "a", "b", "c")]]
+    assert batcher.stats() == {"batches": 1, "commands": 2, "commands_per_batch": 2.0}
+
+
+async def test_commands_of_later_ticks_are_batched_again():
+    node = StubNode({"a": b"1"})
+    batcher = CommandBatcher(node)
+    await batcher.execute("GET", "a")
+    await batcher.execute("GET", "a")
+    assert len(node.round_trips) == 2
+
+
+async def test_error_reply_is_raised_to_its_caller_only():
+    batcher = CommandBatcher(StubNode({"a": b"1"}))
+    ok, failed = await asyncio.gather(batcher.execute("GET", "a"), batcher.execute("HGET"), return_exceptions=True)
+    assert ok == b"1"
+    assert isinstance(failed, exceptions.ResponseError)
+
+
+async def test_pipeline_failure_is_raised_to_every_caller():
+    node = StubNode()
+    node.down = True
+    batcher = CommandBatcher(node)
+    results = await asyncio.gather(batcher.execute("GET", "a"), batcher.execute("GET", "b"), return_exceptions=True)
+    assert all(isinstance(result, exceptions.ConnectionError) for result in results)
+
+
+async def test_cancelled_callers_are_not_sent():
+    node = StubNode({"a": b"1"})
+    batcher = CommandBatcher(node)
+    cancelled = asyncio.ensure_future(batcher.execute("GET", "cancelled"))
+    kept = asyncio.ensure_future(batcher.execute("GET", "a"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await kept == b"1"
+    assert node.round_trips == [[("GET", "a")]]
+
+
+async def test_failed_round_trip_is_recorded_once_for_all_its_callers():
+    node = StubNode()
+    node.down = True
+    breaker = CircuitBreaker(failures=2, slow_call=1, call_timeout=1, reset_timeout=60)
+    batcher = CommandBatcher(node, breaker)
+    await asyncio.gather(*(batcher.execute("GET", key) for key in "abcde"), return_exceptions=True)
+    assert breaker.failures == 1
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_slowness_is_measured_from_the_round_trip():
+    breaker = CircuitBreaker(failures=1, slow_call=0.05, call_timeout=1, reset_timeout=60)
+    batcher = CommandBatcher(StubNode({"a": b"1"}), breaker)
+    waiting = asyncio.ensure_future(batcher.execute("GET", "a"))
+    await asyncio.sleep(0)
+    time.sleep(0.1)  # noqa: ASYNC251 the loop lags before the batch is sent
+    assert await waiting == b"1"
+    assert breaker.slow_calls == 0
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_open_circuit_rejects_the_batch_without_a_round_trip():
+    node = StubNode({"a": b"1"})
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=1, reset_timeout=60)
+    breaker.state, breaker.opened_at = CircuitState.OPEN, time.monotonic()
+    batcher = CommandBatcher(node, breaker)
+    results = await asyncio.gather(batcher.execute("GET", "a"), batcher.execute("GET", "b"), return_exceptions=True)
+    assert all(isinstance(result, CircuitOpenError) for result in results)
+    assert node.round_trips == []
+    assert breaker.rejected == 1
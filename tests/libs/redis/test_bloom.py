@@ -0,0 +1,24 @@
+from src.libs.redis.bloom import BloomFilter
+
+
+def test_added_keys_are_always_found():
+    bloom = BloomFilter(size=1 << 12, hashes=5)
+    keys = [f"jti_{i}" for i in range(200)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_false_positive_rate_is_low():
+    bloom = BloomFilter(size=1 << 14, hashes=7)
+    for i in range(1000):
+        bloom.add(f"jti_{i}")
+    false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+    assert false_positives / 10000 < 0.01
+
+
+def test_clear_drops_every_key():
+    bloom = BloomFilter(size=1024, hashes=3)
+    bloom.add("jti")
+    bloom.clear()
+    assert "jti" not in bloom
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+import redis
+from redis import exceptions
+
+from src.core.utils.context import deadline_ctx
+from src.libs.redis.breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    DeadlineExceededError,
+    within_deadline,
+)
+
+
+async def _fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(exceptions.ConnectionError):
+        async with breaker.guard():
+            raise exceptions.ConnectionError
+
+
+async def test_consecutive_failures_open_the_circuit():
+    breaker = CircuitBreaker(failures=3, slow_call=1, call_timeout=1, reset_timeout=60)
+    for _ in range(2):
+        await _fail(breaker)
+    assert breaker.state is CircuitState.CLOSED
+    await _fail(breaker)
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        async with breaker.guard():
+            pytest.fail("an open circuit must not run the call")
+    assert breaker.stats() == {"state": "open", "failures": 3, "opened": 1, "rejected": 1, "slow_calls": 0}
+
+
+async def test_success_resets_failures():
+    breaker = CircuitBreaker(failures=2, slow_call=1, call_timeout=1, reset_timeout=60)
+    await _fail(breaker)
+    async with breaker.guard():
+        pass
+    await _fail(breaker)
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=1, reset_timeout=0)
+    await _fail(breaker)
+    async with breaker.guard():
+        assert breaker.state is CircuitState.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            async with breaker.guard():
+                pass
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_failed_probe_opens_the_circuit_again():
+    breaker = CircuitBreaker(failures=3, slow_call=1, call_timeout=1, reset_timeout=0)
+    breaker.state = CircuitState.OPEN
+    await _fail(breaker)
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker._probing
+
+
+async def test_call_timeout_is_a_redis_timeout():
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=0.01, reset_timeout=60)
+    with pytest.raises(exceptions.TimeoutError):
+        async with breaker.guard():
+            await asyncio.sleep(1)
+    assert breaker.state is CircuitState.OPEN
+
+
+async def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(failures=1, slow_call=0, call_timeout=1, reset_timeout=60)
+    async with breaker.guard():
+        await asyncio.sleep(0.001)
+    assert breaker.slow_calls == 1
+    assert breaker.state is CircuitState.OPEN
+
+
+async def test_other_timeouts_are_redis_errors_and_not_blamed_on_the_node():
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=1, reset_timeout=60)
+    with pytest.raises(DeadlineExceededError):
+        async with breaker.guard(), asyncio.timeout(0.01):
+            await asyncio.sleep(1)
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_request_deadline_bounds_the_call():
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=1, reset_timeout=60)
+    token = deadline_ctx.set(asyncio.get_running_loop().time() + 0.01)
+    try:
+        with pytest.raises(redis.RedisError):
+            async with breaker.guard():
+                await asyncio.sleep(1)
+    finally:
+        deadline_ctx.reset(token)
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_guard_without_deadline_is_bounded_by_the_call_timeout_only():
+    breaker = CircuitBreaker(failures=1, slow_call=1, call_timeout=1, reset_timeout=60)
+    token = deadline_ctx.set(asyncio.get_running_loop().time() + 0.01)
+    try:
+        async with breaker.guard(deadline=False):
+            await asyncio.sleep(0.02)
+    finally:
+        deadline_ctx.reset(token)
+    assert breaker.state is CircuitState.CLOSED
+
+
+async def test_within_deadline_raises_deadline_exceeded():
+    token = deadline_ctx.set(asyncio.get_running_loop().time() + 0.01)
+    try:
+        with pytest.raises(DeadlineExceededError):
+            async with within_deadline():
+                await asyncio.sleep(1)
+    finally:
+        deadline_ctx.reset(token)
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+import redis.asyncio as redis
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+from src.libs.redis import cache, serializers
+from src.libs.redis.hotkeys import HotKeyDetector
+from src.libs.redis.local_cache import LocalCache
+from src.libs.redis.pubsub import invalidation_bus
+from src.libs.redis.serializers import Compression, SerializerFormat, codec
+from tests.libs.redis.stubs import StubNode
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+@pytest.mark.usefixtures("unreachable_redis")
+async def test_concurrent_refills_recompute_once() -> None:
+    calls = 0
+
+    async def endpoint() -> dict[str, int]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"calls": calls}
+
+    responses = await asyncio.gather(*(cache._refill("k", None, _request(), 60, (), endpoint) for _ in range(3)))
+
+    assert calls == 1
+    assert [response.status_code for response in responses] == [status.HTTP_200_OK] * 3
+    assert len({response.body for response in responses}) == 1
+    assert "k" not in cache._inflight
+
+
+@pytest.mark.usefixtures("unreachable_redis")
+async def test_refill_keeps_inflight_future_of_other_request() -> None:
+    other: asyncio.Future[cache.CachedResponse] = asyncio.get_running_loop().create_future()
+
+    async def endpoint() -> dict[str, int]:
+        cache._inflight["k"] = other
+        return {}
+
+    response = await cache._refill("k", None, _request(), 60, (), endpoint)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert cache._inflight.pop("k") is other
+
+
+@pytest.mark.usefixtures("unreachable_redis")
+async def test_fills_do_not_invalidate_copies_of_other_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    published: list[tuple[str, str]] = []
+
+    async def execute(_: cache.ShardPipelines) -> dict[str, list[object]]:
+        return {}
+
+    async def publish(topic: str, key: str) -> None:
+        published.append((topic, key))
+
+    monkeypatch.setattr(cache.ShardPipelines, "execute", execute)
+    monkeypatch.setattr(invalidation_bus, "publish", publish)
+
+    await cache.redis_client.set_ex("k", {"a": 1}, namespace=cache.CacheNamespace.NORMAL_CACHE)
+    await cache.redis_client.add_to_cache("k", JSONResponse({"a": 1}), 60)
+
+    assert published == []
+
+
+@pytest.mark.usefixtures("unreachable_redis")
+async def test_hot_key_is_served_from_replica_across_reads(monkeypatch: pytest.MonkeyPatch) -> None:
+    fetched: list[list[str]] = []
+
+    async def sharded_mget(_: cache.FastapiCache, keys: list[str]) -> list[bytes]:
+        fetched.append(list(keys))
+        return [b"v" for _ in keys]
+
+    detector = HotKeyDetector(sample_rate=1, top_k=4, min_hits=1, window=60, width=64, depth=2)
+    monkeypatch.setattr(cache, "hot_key_detector", detector)
+    monkeypatch.setattr(cache, "hot_replicas", LocalCache(maxsize=4, ttl=60))
+    monkeypatch.setattr(cache.FastapiCache, "_sharded_mget", sharded_mget)
+
+    values = [await cache.redis_client.batched("GET", "hot") for _ in range(5)]
+
+    assert values == [b"v"] * 5
+    assert fetched == [["hot"]]
+    assert detector.hot_keys() == [("hot", 5)]
+
+
+async def test_values_which_can_not_be_decoded_are_misses(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delitem(serializers.SERIALIZERS, SerializerFormat.MSGPACK, raising=False)
+    monkeypatch.setattr(cache, "cache_stats", cache.CacheStats())
+    node = StubNode(
+        {
+            "ok": codec.dumps({"a": 1}),
+            "foreign": bytes((SerializerFormat.MSGPACK, Compression.NONE)) + b"\x81\xa1a\x01",
+            "corrupted": bytes((SerializerFormat.JSON, Compression.ZLIB)) + b"not zlib",
+        }
+    )
+    client = cache.FastapiCache(
+        connection_pool=redis.ConnectionPool.from_url("redis://127.0.0.1:1"), shards={"a": node}
+    )
+    assert await client.get_many(["ok", "foreign", "corrupted", "missing"]) == [{"a": 1}, None, None, None]
+    assert cache.cache_stats.dict()[""] == {"local_hit": 0, "remote_hit": 1, "miss": 3, "unavailable": 0}
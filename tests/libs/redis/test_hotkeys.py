@@ -0,0 +1,47 @@
+import pytest
+
+from src.libs.redis import hotkeys
+from src.libs.redis.hotkeys import CountMinSketch, HotKeyDetector
+
+
+def _detector(top_k: int = 2, min_hits: int = 3, window: float = 60) -> HotKeyDetector:
+    return HotKeyDetector(sample_rate=1, top_k=top_k, min_hits=min_hits, window=window, width=256, depth=4)
+
+
+def test_sketch_never_undercounts():
+    sketch = CountMinSketch(width=16, depth=4)
+    counts = {f"key_{i}": i % 5 + 1 for i in range(100)}
+    for key, count in counts.items():
+        for _ in range(count):
+            sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in counts.items())
+
+
+def test_keys_read_min_hits_times_are_hot():
+    detector = _detector()
+    for _ in range(3):
+        detector.record("hot")
+    detector.record("cold")
+    assert detector.is_hot("hot")
+    assert not detector.is_hot("cold")
+    assert detector.hot_keys() == [("hot", 3)]
+
+
+def test_hotter_key_evicts_the_coldest_tracked_key():
+    detector = _detector(top_k=2, min_hits=1)
+    for key, reads in (("a", 1), ("b", 3), ("c", 2)):
+        for _ in range(reads):
+            detector.record(key)
+    assert [key for key, _ in detector.hot_keys()] == ["b", "c"]
+
+
+def test_counts_are_dropped_once_the_window_slid_past_them(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr(hotkeys.time, "monotonic", lambda: now)
+    detector = _detector(window=10)
+    for _ in range(3):
+        detector.record("hot")
+    now += 6
+    assert detector.hot_keys() == [("hot", 3)]
+    now += 6
+    assert detector.hot_keys() == []
@@ -0,0 +1,95 @@
+from enum import Enum, IntEnum
+from uuid import UUID
+
+from fastapi import Request
+from pydantic import BaseModel
+
+from src.libs.redis.keys import KeyBuilder, encode_value
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Filters(BaseModel):
+    name: str
+    page: int = 1
+
+
+async def endpoint(request: Request, user_id: int, name: str = "", *, filters: Filters | None = None) -> None:
+    pass
+
+
+def test_equal_values_encode_equally():
+    assert encode_value({"b": 1, "a": [1, 2]}) == encode_value({"a": [1, 2], "b": 1})
+    assert encode_value({3, 1, 2}) == encode_value({2, 3, 1})
+    assert encode_value(Color.RED) == encode_value("red")
+    assert encode_value(1) != encode_value("1.0")
+    assert encode_value(True) != encode_value(1)
+
+
+def test_positional_keyword_and_default_arguments_build_the_same_key():
+    key = KeyBuilder(endpoint, ignore_types=[Request])
+    expected = key((None, 1), {})
+    assert key((None,), {"user_id": 1}) == expected
+    assert key((None, 1, ""), {}) == expected
+    assert key((None, 1), {"name": ""}) == expected
+
+
+def test_ignored_argument_types_do_not_take_part_in_the_key():
+    key = KeyBuilder(endpoint, ignore_types=[Request])
+    assert [name for name, *_ in key.params] == ["user_id", "name", "filters"]
+    assert key(("request a", 1), {}) == key(("request b", 1), {})
+
+
+def test_different_arguments_build_different_keys():
+    key = KeyBuilder(endpoint, ignore_types=[Request])
+    keys = {
+        key((None, 1), {}),
+        key((None, 2), {}),
+        key((None, 1, "a"), {}),
+        key((None, 1), {"filters": Filters(name="a")}),
+        key((None, 1), {"filters": Filters(name="a", page=2)}),
+        key((None, 1), {}, extra="v2"),
+    }
+    assert len(keys) == 6
+
+
+def test_uuid_arguments_are_encoded_by_value():
+    async def by_uuid(item_id: UUID) -> None:
+        pass
+
+    key = KeyBuilder(by_uuid, ignore_types=[])
+    assert key((UUID(int=1),), {}) == key((), {"item_id": UUID(int=1)})
+    assert key((UUID(int=1),), {}) != key((UUID(int=2),), {})
+
+
+def test_container_elements_do_not_collide():
+    assert encode_value(["a,b"]) != encode_value(["a", "b"])
+    assert encode_value({"a": "b,c:d"}) != encode_value({"a": "b", "c": "d"})
+    assert encode_value({"a,b"}) != encode_value({"a", "b"})
+    assert encode_value([["a"], "b"]) != encode_value([["a", "b"]])
+    assert encode_value([]) != encode_value("") != encode_value(None)
+
+
+def test_scalars_of_different_types_do_not_collide():
+    assert encode_value(1) != encode_value("1")
+    assert encode_value(1) != encode_value(1.0)
+    assert encode_value(None) != encode_value("None")
+    assert encode_value(UUID(int=1)) != encode_value(str(UUID(int=1)))
+
+
+def test_parameter_values_can_not_shift_into_other_parameters():
+    async def pair(a: str, b: str = "") -> None:
+        pass
+
+    key = KeyBuilder(pair, ignore_types=[])
+    assert key(("1\x1fb=2",), {}) != key(("1", "2\x1fb="), {})
+    assert key(("1",), {}, extra="x") != key(("1x",), {})
+
+
+def test_int_enums_encode_by_value():
+    class Level(IntEnum):
+        LOW = 1
+
+    assert encode_value(Level.LOW) == encode_value(1)
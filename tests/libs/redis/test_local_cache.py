@@ -0,0 +1,44 @@
+import pytest
+
+from src.libs.redis import local_cache
+from src.libs.redis.local_cache import LocalCache
+
+
+def test_value_loaded_before_an_invalidation_is_not_stored():
+    cache: LocalCache[str, int] = LocalCache(maxsize=8, ttl=60)
+    version = cache.version
+    cache.invalidate("k")
+    assert not cache.set("k", 1, version)
+    assert cache.get("k") is None
+    assert cache.set("k", 2, cache.version)
+    assert cache.get("k") == 2
+
+
+def test_clear_also_bumps_the_version():
+    cache: LocalCache[str, int] = LocalCache(maxsize=8, ttl=60)
+    version = cache.version
+    cache.clear()
+    assert not cache.set("k", 1, version)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: LocalCache[str, int] = LocalCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_entries_expire_after_their_ttl(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr(local_cache.time, "monotonic", lambda: now)
+    cache: LocalCache[str, int] = LocalCache(maxsize=8, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+    now += 5
+    assert (cache.get("a"), cache.get("b")) == (1, None)
+    now += 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
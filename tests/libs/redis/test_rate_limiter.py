@@ -0,0 +1,95 @@
+import time
+from collections.abc import Callable, Iterator
+
+import pytest
+from fastapi import FastAPI
+
+from src.features.admin import cache as admin_cache
+from src.features.admin.signing import key_ring
+from src.libs.redis.rate_limiter import UNMATCHED_ROUTE, RateLimit, RateLimitMiddleware, _client
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}", operation_id="get_item")
+    def get_item(item_id: int) -> int:
+        return item_id
+
+    @app.get("/health", include_in_schema=False)
+    def health() -> None:
+        pass
+
+    return app
+
+
+def _scope(app: FastAPI, method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "root_path": "", "headers": [], "app": app}
+
+
+def test_allowed_requests_carry_ratelimit_headers():
+    headers = RateLimit(limit=20, allowed=True, remaining=19, retry_after=0, reset_after=0.4).headers()
+    assert headers == [(b"ratelimit-limit", b"20"), (b"ratelimit-remaining", b"19"), (b"ratelimit-reset", b"1")]
+
+
+def test_rejected_requests_carry_retry_after():
+    headers = RateLimit(limit=20, allowed=False, remaining=0, retry_after=1.2, reset_after=10).headers()
+    assert (b"retry-after", b"2") in headers
+    assert (b"ratelimit-reset", b"10") in headers
+
+
+def test_route_is_the_operation_id_of_the_matched_route():
+    app = _app()
+    middleware = RateLimitMiddleware(app)
+    assert middleware._route(_scope(app, "GET", "/items/1")) == "get_item"
+    assert middleware._route(_scope(app, "GET", "/items/2")) == "get_item"
+    assert middleware._route(_scope(app, "POST", "/items/1")) == UNMATCHED_ROUTE
+    assert middleware._route(_scope(app, "GET", "/nowhere")) == UNMATCHED_ROUTE
+
+
+def test_routes_hidden_from_the_schema_are_not_limited():
+    app = _app()
+    middleware = RateLimitMiddleware(app)
+    assert middleware._route(_scope(app, "GET", "/health")) is None
+    # the lookup is cached, including for unlimited routes
+    assert middleware._routes.get(("GET", "/health")) == ""
+    assert middleware._route(_scope(app, "GET", "/health")) is None
+
+
+def test_anonymous_clients_are_keyed_by_address():
+    scope = {"headers": [(b"authorization", b"Bearer not-a-jwt")], "client": ("203.0.113.7", 50000)}
+    assert _client(scope) == "ip:203.0.113.7"
+    assert _client({"headers": []}) == "ip:unknown"
+
+
+type Bearer = Callable[..., dict]
+
+
+@pytest.fixture
+def bearer() -> Iterator[Bearer]:
+    """Scope of a client sending a bearer token built from the given payload overrides."""
+
+    def _scope(**claims: int | str) -> dict:
+        now = int(time.time())
+        token = key_ring.encode({"sub": "7", "issued_at": now, "expires_at": now + 60, "jti": "abc", **claims})
+        return {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("203.0.113.7", 50000)}
+
+    yield _scope
+    admin_cache.revoked_tokens.clear()
+
+
+def test_valid_tokens_are_keyed_by_user(bearer: Bearer):
+    assert _client(bearer()) == "user:7"
+
+
+def test_expired_tokens_are_keyed_by_address(bearer: Bearer):
+    now = int(time.time())
+    assert _client(bearer(expires_at=now - 1)) == "ip:203.0.113.7"
+    assert _client(bearer(issued_at=now + 60)) == "ip:203.0.113.7"
+    assert _client(bearer(expires_at="never")) == "ip:203.0.113.7"
+
+
+def test_revoked_tokens_are_keyed_by_address(bearer: Bearer):
+    admin_cache.revoked_tokens.add("abc")
+    assert _client(bearer()) == "ip:203.0.113.7"
+    assert _client(bearer(jti="other")) == "user:7"
@@ -0,0 +1,78 @@
+import pytest
+import redis.asyncio as redis
+
+from src.libs.redis.cache import FastapiCache
+from src.libs.redis.ring import HashRing, hash_key
+from tests.libs.redis.stubs import StubNode
+
+KEYS = [f"key_{i}" for i in range(10000)]
+
+
+def _ring(*names: str) -> HashRing[str]:
+    return HashRing({name: name for name in names}, vnodes=160)
+
+
+def test_hash_key_uses_first_non_empty_tag():
+    assert hash_key("principal_{42}") == "42"
+    assert hash_key("principal_version_{42}") == "42"
+    assert hash_key("a_{}_{7}") == "a_{}_{7}"
+    assert hash_key("plain") == "plain"
+
+
+def test_keys_are_evenly_distributed():
+    ring = _ring("a", "b", "c", "d")
+    counts = {name: 0 for name in ring.nodes}
+    for key in KEYS:
+        counts[ring.name_for(key)] += 1
+    assert all(0.15 < count / len(KEYS) < 0.35 for count in counts.values())
+
+
+def test_adding_a_node_only_moves_keys_onto_it():
+    ring = _ring("a", "b", "c", "d")
+    before = {key: ring.name_for(key) for key in KEYS}
+    ring.add("e", "e")
+    moved = [key for key in KEYS if ring.name_for(key) != before[key]]
+    assert all(ring.name_for(key) == "e" for key in moved)
+    assert 0.1 < len(moved) / len(KEYS) < 0.3
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = _ring("a", "b", "c", "d")
+    before = {key: ring.name_for(key) for key in KEYS}
+    ring.remove("d")
+    assert "d" not in ring.nodes
+    assert all(ring.name_for(key) == before[key] for key in KEYS if before[key] != "d")
+    assert all(ring.name_for(key) != "d" for key in KEYS)
+
+
+def test_group_keeps_positions_of_keys():
+    ring = _ring("a", "b", "c")
+    keys = KEYS[:50]
+    groups = ring.group(keys)
+    assert sorted(i for positions in groups.values() for i in positions) == list(range(len(keys)))
+    assert all(ring.name_for(keys[i]) == name for name, positions in groups.items() for i in positions)
+
+
+@pytest.fixture
+def sharded_cache() -> FastapiCache:
+    shards = {name: StubNode() for name in ("a", "b", "c")}
+    client = FastapiCache(connection_pool=redis.ConnectionPool.from_url("redis://127.0.0.1:1"), shards=shards)
+    for key in KEYS[:30]:
+        client.node(key).data[key] = key.encode()
+    return client
+
+
+async def test_mget_is_split_into_one_round_trip_per_node(sharded_cache: FastapiCache):
+    keys = [*KEYS[:30], "missing"]
+    values = await sharded_cache.batched("MGET", *keys)
+    assert values == [*(key.encode() for key in KEYS[:30]), None]
+    for name, node in sharded_cache.ring.nodes.items():
+        owned = [key for key in keys if sharded_cache.ring.name_for(key) == name]
+        assert node.round_trips == [[("MGET", *owned)]]
+
+
+async def test_removed_shard_drops_its_breaker_and_batcher(sharded_cache: FastapiCache):
+    await sharded_cache.batched("MGET", *KEYS[:30])
+    sharded_cache.remove_shard("c")
+    assert set(sharded_cache.batchers) == set(sharded_cache.breakers) == {"a", "b"}
+    assert all(sharded_cache.ring.name_for(key) != "c" for key in KEYS[:30])
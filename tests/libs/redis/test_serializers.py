@@ -0,0 +1,83 @@
+import json
+from datetime import UTC, datetime
+from uuid import UUID
+
+import pytest
+
+from src.libs.redis.serializers import SERIALIZERS, CacheCodec, CacheDecodeError, Compression, SerializerFormat
+
+VALUE = {"id": 1, "name": "menu", "children": [{"id": 2}], "active": True, "parent": None}
+
+
+@pytest.fixture(params=list(SerializerFormat), ids=lambda serializer: serializer.name.lower())
+def serializer(request: pytest.FixtureRequest) -> SerializerFormat:
+    """Every format, the ones of the `cache` extra are skipped when it is not installed."""
+    if request.param is not SerializerFormat.JSON:
+        pytest.importorskip(request.param.name.lower())
+    return request.param
+
+
+def test_values_round_trip(serializer: SerializerFormat):
+    codec = CacheCodec(serializer, compress_min_size=4096, compress_level=1)
+    data = codec.dumps(VALUE)
+    assert data[:2] == bytes((serializer, Compression.NONE))
+    assert codec.loads(data) == VALUE
+
+
+def test_values_written_with_another_serializer_are_read(serializer: SerializerFormat):
+    writer = CacheCodec(serializer, compress_min_size=16, compress_level=1)
+    reader = CacheCodec(SerializerFormat.JSON, compress_min_size=4096, compress_level=1)
+    assert reader.loads(writer.dumps(VALUE)) == VALUE
+
+
+def test_large_values_are_compressed():
+    codec = CacheCodec(SerializerFormat.JSON, compress_min_size=64, compress_level=1)
+    value = ["x" * 100]
+    data = codec.dumps(value)
+    assert data[1] == Compression.ZLIB
+    assert len(data) < len(json.dumps(value))
+    assert codec.loads(data) == value
+
+
+def test_unmarked_json_values_are_read():
+    codec = CacheCodec(SerializerFormat.JSON, compress_min_size=4096, compress_level=1)
+    assert codec.loads(b'{"a":1}') == {"a": 1}
+    assert codec.loads('{"a":1}') == {"a": 1}
+
+
+def test_uuid_and_datetime_are_encoded_as_strings(serializer: SerializerFormat):
+    codec = CacheCodec(serializer, compress_min_size=4096, compress_level=1)
+    uuid = UUID(int=1)
+    now = datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    assert codec.loads(codec.dumps({"uuid": uuid, "at": now})) == {"uuid": str(uuid), "at": now.isoformat()}
+
+
+def test_compressed_values_round_trip(serializer: SerializerFormat):
+    codec = CacheCodec(serializer, compress_min_size=16, compress_level=1)
+    data = codec.dumps(VALUE)
+    assert data[:2] == bytes((serializer, Compression.ZLIB))
+    assert codec.loads(data) == VALUE
+
+
+def test_serializers_which_are_not_installed_are_refused(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delitem(SERIALIZERS, SerializerFormat.MSGPACK, raising=False)
+    with pytest.raises(ValueError, match="MSGPACK"):
+        CacheCodec(SerializerFormat.MSGPACK, compress_min_size=4096, compress_level=1)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        bytes((SerializerFormat.MSGPACK, Compression.NONE)) + b"\x81\xa1a\x01",
+        bytes((SerializerFormat.JSON, Compression.ZLIB)) + b"not zlib",
+        bytes((SerializerFormat.JSON, Compression.NONE)) + b"{",
+        bytes((SerializerFormat.JSON,)),
+        b"not json",
+    ],
+    ids=["not_installed", "bad_zlib", "truncated", "no_compression_byte", "unmarked"],
+)
+def test_undecodable_values_raise_cache_decode_error(monkeypatch: pytest.MonkeyPatch, data: bytes):
+    monkeypatch.delitem(SERIALIZERS, SerializerFormat.MSGPACK, raising=False)
+    codec = CacheCodec(SerializerFormat.JSON, compress_min_size=4096, compress_level=1)
+    with pytest.raises(CacheDecodeError):
+        codec.loads(data)
@@ -0,0 +1,34 @@
+from typing import ClassVar
+
+from pydantic import BaseModel
+from sqlalchemy import JSON
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from src.core._types import QueryParams, VisibleName
+from src.core.repositories import BaseRepository
+
+
+class SqliteBase(DeclarativeBase):
+    """Models of the tests run against sqlite, kept out of the application metadata."""
+
+
+class Note(SqliteBase):
+    __tablename__ = "note"
+    __visible_name__: ClassVar[VisibleName] = {"en_US": "note", "zh_CN": "note"}
+    __i18n_fields__: ClassVar[set[str]] = {"label"}
+    id: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str]
+    label: Mapped[dict[str, str] | None] = mapped_column(JSON)
+
+
+class NoteCreate(BaseModel):
+    title: str
+
+
+class NoteRepository(BaseRepository[Note, NoteCreate, NoteCreate, QueryParams]):
+    # constraints are reflected from postgres
+    check_nullable = False
+    check_unique_constraints = False
+
+
+note_repo = NoteRepository(Note)
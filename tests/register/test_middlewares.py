@@ -0,0 +1,69 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import Depends, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from starlette.types import Message
+
+from src.deps import deadline
+from src.register.middlewares import CLIENT_CLOSED_REQUEST, DeadlineMiddleware, RequestMiddleware
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow() -> dict[str, str]:
+        await asyncio.sleep(1)
+        return {}
+
+    @app.get("/deadline")
+    async def with_deadline(_: Annotated[None, Depends(deadline(0.05))]) -> dict[str, str]:
+        await asyncio.sleep(1)
+        return {}
+
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(RequestMiddleware)
+    return app
+
+
+async def test_deadline_exceeded_returns_504() -> None:
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as client:
+        response = await client.get("/deadline")
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+
+async def test_client_disconnect_ends_request_without_error() -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/slow",
+        "raw_path": b"/slow",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 1),
+        "server": ("test", 80),
+    }
+    received = False
+    sent: list[Message] = []
+
+    async def receive() -> Message:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    await asyncio.wait_for(_app()(scope, receive, send), timeout=0.5)
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == CLIENT_CLOSED_REQUEST
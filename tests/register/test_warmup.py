@@ -0,0 +1,81 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import ClassVar
+
+import pytest
+
+from src.core.config import settings
+from src.core.database.session import DatabasePool
+from src.register import warmup
+
+
+async def _count(n: int) -> int:
+    return n
+
+
+async def _slow() -> int:
+    await asyncio.sleep(10)
+    return 1
+
+
+async def _broken() -> int:
+    raise RuntimeError
+
+
+async def test_slow_steps_are_cut_off_at_the_budget(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "CACHE_WARMUP_BUDGET", 0.05)
+    monkeypatch.setattr(warmup, "WARMUP_STEPS", {"fast": lambda: _count(3), "slow": _slow, "broken": _broken})
+    start = time.perf_counter()
+    report = await warmup.warm_up()
+    assert time.perf_counter() - start < 1
+    assert report is warmup.warmup_report
+    assert {name: (step["status"], step["count"]) for name, step in report.items()} == {
+        "fast": ("ok", 3),
+        "slow": ("timeout", 0),
+        "broken": ("failed", 0),
+    }
+    assert report["slow"]["elapsed_ms"] >= 50
+
+
+class StubSession:
+    role_ids: ClassVar[list[int]] = list(range(6))
+
+    async def __aenter__(self) -> "StubSession":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def scalars(self, _: object) -> SimpleNamespace:
+        return SimpleNamespace(all=lambda: self.role_ids)
+
+
+async def test_roles_are_warmed_concurrently_within_the_auth_pool(monkeypatch: pytest.MonkeyPatch):
+    running, peak, warmed = 0, 0, []
+
+    async def get_role_grant(_: StubSession, role_id: int) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        warmed.append(role_id)
+
+    monkeypatch.setitem(warmup.async_sessions, DatabasePool.AUTH, StubSession)
+    monkeypatch.setattr(warmup, "get_role_grant", get_role_grant)
+    monkeypatch.setattr(settings, "DATABASE_AUTH_POOL_SIZE", 3)
+    assert await warmup._warm_roles() == len(StubSession.role_ids)
+    assert sorted(warmed) == StubSession.role_ids
+    assert peak == 3
+
+
+async def test_role_failure_fails_the_step(monkeypatch: pytest.MonkeyPatch):
+    async def get_role_grant(_: StubSession, role_id: int) -> None:
+        if role_id == 2:
+            raise RuntimeError
+
+    monkeypatch.setitem(warmup.async_sessions, DatabasePool.AUTH, StubSession)
+    monkeypatch.setattr(warmup, "get_role_grant", get_role_grant)
+    with pytest.raises(RuntimeError):
+        await warmup._warm_roles()
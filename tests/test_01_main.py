@@ -1,6 +1,17 @@
 from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
+import httpx
+import pytest
+import redis.asyncio as aioredis
 from fastapi import status
+from fastapi.routing import APIRoute
+
+from src import app as main
+from src.app import app
+from src.core.config import settings
+from src.features.admin.security import RouteAccess, password_hasher, route_access
+from src.libs.redis import cache
 
 if TYPE_CHECKING:
     from httpx import AsyncClient
@@ -9,3 +20,42 @@ if TYPE_CHECKING:
 async def test_main(client: "AsyncClient") -> None:
     response = await client.get("/api/docs")
     assert response.status_code == status.HTTP_200_OK
+
+
+async def test_metrics_require_authentication() -> None:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=settings.BASE_URL) as anonymous:
+        response = await anonymous.get("/api/metrics")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = await anonymous.get("/api/metrics", headers={"Authorization": "Bearer forged"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert "hot_keys" not in response.text
+
+
+def test_metrics_need_a_role_permission() -> None:
+    (metrics,) = (route for route in app.routes if isinstance(route, APIRoute) and route.path == "/api/metrics")
+    assert route_access.get(metrics.operation_id) is RouteAccess.PERMISSION
+
+
+async def test_lifespan_releases_pools_when_startup_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    released: list[str] = []
+
+    async def disconnect(self: aioredis.ConnectionPool, inuse_connections: bool = True) -> None:  # noqa: ARG001
+        released.append(f"{self.connection_kwargs['host']}/{self.connection_kwargs['db']}")
+
+    async def unavailable() -> None:
+        raise ConnectionError
+
+    monkeypatch.setattr(aioredis.ConnectionPool, "disconnect", disconnect)
+    monkeypatch.setattr(password_hasher, "shutdown", lambda: released.append("hasher"))
+    monkeypatch.setattr(main, "load_revoked_tokens", unavailable)
+    monkeypatch.setattr(settings, "REDIS_CACHE_NODES", ["redis://:secret@cache-1:6379"])
+    with pytest.raises(ConnectionError):
+        async with app.router.lifespan_context(app):
+            pass
+    host = urlsplit(settings.REDIS_DSN).hostname
+    assert released == [
+        f"cache-1/{cache.RedisDBType.DEFAULT}",
+        f"{host}/{cache.RedisDBType.PUBSUB}",
+        f"{host}/{cache.RedisDBType.DEFAULT}",
+        "hasher",
+    ]
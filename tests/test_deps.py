@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src import deps
+from src.core.database import session as db_session
+from src.core.database.session import DatabasePool, after_commit
+from src.deps import UowSession
+from src.register.middlewares import DeadlineMiddleware
+from tests.models import Note, NoteCreate, note_repo
+
+
+class WriteFailedError(Exception):
+    pass
+
+
+def _app(events: list[str], deadline: float | None = None) -> FastAPI:
+    app = FastAPI(dependencies=[Depends(deps.deadline(deadline))] if deadline else None)
+    app.add_middleware(DeadlineMiddleware)
+
+    async def committed() -> None:
+        events.append("after_commit")
+
+    @app.post("/notes")
+    async def create_notes(session: UowSession, fail: bool = False, delay: float = 0) -> list[int]:
+        notes = [await note_repo.create(session, NoteCreate(title=title)) for title in ("a", "b")]
+        after_commit(session, committed)
+        await asyncio.sleep(delay)
+        events.append("endpoint")
+        if fail:
+            raise WriteFailedError
+        return [note.id for note in notes]
+
+    return app
+
+
+@pytest.fixture
+def uow_sessions(
+    monkeypatch: pytest.MonkeyPatch, sqlite_sessions: async_sessionmaker[AsyncSession]
+) -> async_sessionmaker[AsyncSession]:
+    monkeypatch.setitem(deps.async_sessions, DatabasePool.OLTP, sqlite_sessions)
+    return sqlite_sessions
+
+
+async def _count_notes(sessions: async_sessionmaker[AsyncSession]) -> int:
+    async with sessions() as session:
+        return await session.scalar(select(func.count()).select_from(Note))
+
+
+async def test_request_commits_its_writes_once_it_returns(uow_sessions: async_sessionmaker[AsyncSession]):
+    events: list[str] = []
+    async with AsyncClient(transport=ASGITransport(app=_app(events)), base_url="http://test") as client:
+        response = await client.post("/notes")
+    await asyncio.gather(*db_session._after_commit_tasks)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+    assert await _count_notes(uow_sessions) == 2
+    assert events == ["endpoint", "after_commit"]
+
+
+async def test_request_that_raises_rolls_back_all_its_writes(uow_sessions: async_sessionmaker[AsyncSession]):
+    events: list[str] = []
+    transport = ASGITransport(app=_app(events), raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/notes", params={"fail": True})
+    await asyncio.gather(*db_session._after_commit_tasks)
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert await _count_notes(uow_sessions) == 0
+    assert events == ["endpoint"]
+
+
+@pytest.fixture
+def sqlite_deadlines(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Deadlines bound the transaction with postgres `set_config`, sqlite only gets the round trip."""
+    monkeypatch.setattr(db_session, "SET_TIMEOUTS_STMT", text("SELECT :timeout"))
+
+
+@pytest.mark.usefixtures("sqlite_deadlines")
+async def test_deadline_expiring_in_the_endpoint_rolls_back(uow_sessions: async_sessionmaker[AsyncSession]):
+    events: list[str] = []
+    async with AsyncClient(transport=ASGITransport(app=_app(events, deadline=0.05)), base_url="http://test") as client:
+        response = await client.post("/notes", params={"delay": 1})
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert await _count_notes(uow_sessions) == 0
+    assert events == []
+
+
+@pytest.mark.usefixtures("sqlite_deadlines")
+async def test_deadline_expiring_during_the_commit_does_not_cancel_it(
+    monkeypatch: pytest.MonkeyPatch, uow_sessions: async_sessionmaker[AsyncSession]
+):
+    commit = AsyncSession.commit
+
+    async def slow_commit(session: AsyncSession) -> None:
+        await asyncio.sleep(0.1)
+        await commit(session)
+
+    monkeypatch.setattr(AsyncSession, "commit", slow_commit)
+    events: list[str] = []
+    async with AsyncClient(transport=ASGITransport(app=_app(events, deadline=0.05)), base_url="http://test") as client:
+        response = await client.post("/notes")
+    await asyncio.gather(*db_session._after_commit_tasks)
+    assert response.status_code == status.HTTP_200_OK
+    assert await _count_notes(uow_sessions) == 2
+    assert events == ["endpoint", "after_commit"]